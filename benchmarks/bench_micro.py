@@ -0,0 +1,134 @@
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BENCH_DIR)
+
+from benchutil import UTILS_DIR, environment, peak_rss_mb, rate, write_report
+
+"""
+Table Transform Microbenchmarks
+
+Times the in-memory transforms the notebooks and scripts share on synthetic inputs
+of growing size (see benchmarks/synthetic.py):
+
+    explode   row_explode.process_dataframe on a 04_scrap-bindingdb.py result table
+    explode-lists  the same on the table as read from Parquet (list cells, some empty)
+    fasta     fasta.read_fasta over the lines of a multi-chain FASTA file
+    cluster   cluster.assign_compound_clusters joining compounds to sequence clusters
+
+Every (case, size) pair runs in a fresh process, so its peak RSS is its own. The
+time reported is the best of --repeat runs; input generation is not timed. Before
+timing, the explode cases are checked to give the same rows for every table shape.
+
+    python benchmarks/bench_micro.py --sizes 10000 100000 1000000 --output micro.json
+"""
+
+CASES = ('explode', 'explode-lists', 'fasta', 'cluster')
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+
+def _setup(case, size):
+    # Returns (work, rows_in); work() returns the number of output rows
+    import synthetic
+
+    if case == 'explode':
+        from row_explode import process_dataframe
+        df = synthetic.bindingdb_table(size)
+        return lambda: len(process_dataframe(df)), size
+    if case == 'explode-lists':
+        from row_explode import process_dataframe
+        df = synthetic.bindingdb_table(size, lists=True)
+        return lambda: len(process_dataframe(df)), size
+    if case == 'fasta':
+        from fasta import read_fasta
+        lines = synthetic.fasta_lines(size)
+        return lambda: sum(1 for _ in read_fasta(lines)), len(lines)
+    if case == 'cluster':
+        from cluster import assign_compound_clusters
+        df_all, membership = synthetic.cluster_tables(size)
+        return lambda: int(assign_compound_clusters(df_all, membership)['cluster'].notna().sum()), size
+    raise ValueError(f"Unknown case {case!r}; choose one of {CASES}")
+
+def check_explode(size=100):
+    """Whether process_dataframe gives the same rows for list cells as for joined strings
+
+    An empty hit list must explode like a missing cell: one row of NaN hits.
+    The joined strings are also parsed the way write_table stores them in
+    Parquet (table_io.to_list), which must not split names on a bare comma.
+    """
+    import numpy as np
+    import pandas as pd
+    import synthetic
+    from row_explode import LIST_COLUMNS, process_dataframe
+    from table_io import to_list
+
+    lists = synthetic.bindingdb_table(size, lists=True)
+    joined = synthetic.bindingdb_table(size)
+    joined.loc[lists['target_name'].map(lambda v: v == []), LIST_COLUMNS] = np.nan
+    parsed = joined.copy()
+    for c in LIST_COLUMNS:
+        parsed[c] = parsed[c].map(to_list)
+    try:
+        expected = process_dataframe(joined)
+        pd.testing.assert_frame_equal(process_dataframe(lists), expected)
+        pd.testing.assert_frame_equal(process_dataframe(parsed), expected)
+    except (AssertionError, ValueError) as e:
+        print(f"explode: list, parsed and joined tables disagree: {e}", file=sys.stderr)
+        return False
+    return True
+
+def run_case(case, size, repeat):
+    """Time one case in the current process; runs in a fresh worker process"""
+    sys.path.extend([BENCH_DIR, UTILS_DIR])
+    work, rows_in = _setup(case, size)
+    setup_rss = peak_rss_mb()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows_out = work()
+        times.append(time.perf_counter() - start)
+    best = min(times)
+    return {
+        'case': case,
+        'size': size,
+        'rows_in': rows_in,
+        'rows_out': rows_out,
+        'best_s': round(best, 4),
+        'mean_s': round(sum(times) / len(times), 4),
+        'rows_per_s': rate(rows_in, best),
+        'setup_rss_mb': setup_rss,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Microbenchmark the shared table transforms on synthetic data.')
+    parser.add_argument('--cases', nargs='+', choices=CASES, default=list(CASES), help='Cases to run')
+    parser.add_argument('--sizes', nargs='+', type=int, default=list(DEFAULT_SIZES),
+                        help='Input rows (FASTA records for the fasta case)')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per case (best is kept)')
+    parser.add_argument('--output', default=None, help='Also write the JSON report here')
+    args = parser.parse_args()
+
+    if any(case.startswith('explode') for case in args.cases):
+        sys.path.extend([BENCH_DIR, UTILS_DIR])
+        if not check_explode():
+            sys.exit("row_explode.process_dataframe disagrees between table shapes")
+
+    results = []
+    # spawn: a fresh interpreter per case, whatever the platform default is
+    context = multiprocessing.get_context('spawn')
+    for case in args.cases:
+        for size in args.sizes:
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                result = pool.submit(run_case, case, size, args.repeat).result()
+            print(f"{case} {size}: {result['best_s']} s", file=sys.stderr)
+            results.append(result)
+
+    write_report({'benchmark': 'micro', **environment(), 'repeat': args.repeat, 'cases': results}, args.output)
+
+if __name__ == "__main__":
+    main()
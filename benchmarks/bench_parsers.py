@@ -0,0 +1,118 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(BENCH_DIR, 'fixtures')
+sys.path.append(os.path.join(BENCH_DIR, '..', 'scripts', 'utils'))
+
+from bdb_scraper import parse_results_page
+from html_parsers import BACKENDS, etree, parse_pool
+from knapsack_scraper import parse_cids, parse_details
+
+"""
+HTML Parser Microbenchmark
+
+Parses the saved KNApSAcK and BindingDB pages in benchmarks/fixtures with every
+available parser backend, checks that each backend returns exactly what the
+BeautifulSoup reference returns, and reports the time per page. It also times a
+batch of BindingDB pages parsed serially and on the process pool the scrapers use.
+
+    python benchmarks/bench_parsers.py --output parsers.json
+"""
+
+CASES = [
+    ('knapsack_result.html', parse_cids),
+    ('knapsack_detail.html', parse_details),
+    ('bindingdb_results.html', parse_results_page),
+    ('bindingdb_no_matches.html', parse_results_page),
+    # Empty cells, links and buttons: present but without text
+    ('knapsack_detail_empty.html', parse_details),
+    ('bindingdb_empty_tags.html', parse_results_page),
+]
+
+def best_time(func, repeat, number):
+    """Best per-call time in seconds over `repeat` rounds of `number` calls"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+def bench_pages(backends, repeat, number):
+    results = []
+    for fixture, parse in CASES:
+        with open(os.path.join(FIXTURES_DIR, fixture), encoding='utf-8') as f:
+            html = f.read()
+        reference = parse(html, 'bs4')
+        entry = {'fixture': fixture, 'parser': parse.__name__, 'bytes': len(html.encode('utf-8'))}
+        for backend in backends:
+            seconds = best_time(lambda: parse(html, backend), repeat, number)
+            entry[backend] = {
+                'ms_per_page': round(seconds * 1000, 3),
+                'identical': parse(html, backend) == reference,
+            }
+        if 'lxml' in entry:
+            entry['speedup'] = round(entry['bs4']['ms_per_page'] / entry['lxml']['ms_per_page'], 2)
+        results.append(entry)
+    return results
+
+def bench_pool(backend, pages, workers):
+    with open(os.path.join(FIXTURES_DIR, 'bindingdb_results.html'), encoding='utf-8') as f:
+        html = f.read()
+    batch = [html] * pages
+
+    start = time.perf_counter()
+    serial = [parse_results_page(page, backend) for page in batch]
+    serial_seconds = time.perf_counter() - start
+
+    with parse_pool(workers) as pool:
+        list(pool.map(parse_results_page, batch[:workers or os.cpu_count()], [backend] * pages))  # warm up
+        start = time.perf_counter()
+        pooled = list(pool.map(parse_results_page, batch, [backend] * pages, chunksize=8))
+        pool_seconds = time.perf_counter() - start
+
+    return {
+        'backend': backend,
+        'pages': pages,
+        'workers': workers or os.cpu_count(),
+        'serial_pages_per_s': round(pages / serial_seconds, 1),
+        'pool_pages_per_s': round(pages / pool_seconds, 1),
+        'identical': pooled == serial,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the HTML parser backends on saved fixture pages.')
+    parser.add_argument('--repeat', type=int, default=5, help='Timing rounds per fixture (best is kept)')
+    parser.add_argument('--number', type=int, default=20, help='Parses per timing round')
+    parser.add_argument('--pool-pages', type=int, default=400, help='Pages in the process-pool batch (0 skips it)')
+    parser.add_argument('--workers', type=int, default=None, help='Process pool size (default: one per CPU)')
+    parser.add_argument('--output', default=None, help='Write the JSON report here instead of stdout')
+    args = parser.parse_args()
+
+    backends = [b for b in BACKENDS if b != 'lxml' or etree is not None]
+    report = {
+        'benchmark': 'parsers',
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+        'pages': bench_pages(backends, args.repeat, args.number),
+    }
+    if args.pool_pages:
+        report['pool'] = bench_pool(backends[-1], args.pool_pages, args.workers)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    print(text)
+
+    if not all(entry[b]['identical'] for entry in report['pages'] for b in backends):
+        sys.exit("Parser backends disagree on at least one fixture")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+import argparse
+import importlib
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(BENCH_DIR)
+
+from benchutil import SCRIPTS_DIR, UTILS_DIR, environment, rate, rss_mb, write_report
+from stub_server import StubServer
+import synthetic
+
+sys.path.append(UTILS_DIR)
+sys.path.append(SCRIPTS_DIR)
+from table_io import read_table, write_table
+
+extract_protein_codes = importlib.import_module('08_pdbj-codes').extract_protein_codes
+
+"""
+End-to-End Stage Benchmark
+
+Runs the scraping stages of the pipeline against the stub server in
+benchmarks/stub_server.py, which replays recorded KNApSAcK, BindingDB and PDBj
+responses, so the numbers measure the scripts and not the remote services:
+
+    02_scrap-knapsack   --plants synthetic plant names
+    04_scrap-bindingdb  --compounds synthetic SMILES
+    08_pdbj-codes       --queries synthetic PDBj query rows
+    09_pdbj-title       the protein codes written by 08 (needs selenium and webdriver-manager installed)
+    10_pdbj-fasta       the protein codes written by 08
+
+Each stage is started as its own process with the HTTP cache disabled and is
+timed from start to exit. The report gives the wall time, rows in and out,
+requests served by the stub, and the peak RSS of the largest process of the
+stage (null where the platform cannot report it). 07_scrap-pdbj.py only
+drives a browser and is not covered. Before timing 08, its CSV and Parquet
+inputs are checked to give the same protein codes.
+
+    python benchmarks/bench_stages.py --output stages.json
+    python benchmarks/bench_stages.py --stages 02_scrap-knapsack --plants 200 --latency 0.05
+"""
+
+STAGES = ('02_scrap-knapsack', '04_scrap-bindingdb', '08_pdbj-codes', '09_pdbj-title', '10_pdbj-fasta')
+
+def script(name):
+    return os.path.join(SCRIPTS_DIR, f"{name}.py")
+
+def count_rows(path, columns=None):
+    return len(read_table(path, columns=columns)) if os.path.exists(path) else None
+
+def count_lines(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return sum(1 for _ in f)
+
+def plan_stages(args, workdir, url):
+    """{stage: (command, rows in, function counting the rows out)}"""
+    def path(name):
+        return os.path.join(workdir, name)
+
+    plants = path('plants.csv')
+    write_table(synthetic.plants_table(args.plants), plants, index=True)
+    compounds = path('compounds.csv')
+    write_table(synthetic.compounds_table(args.compounds), compounds, index=True)
+    queries = path('pdbj-queries.csv')
+    query_table = synthetic.query_table(args.queries, max(args.queries // 2, 1))
+    write_table(query_table, queries, index=True)
+    # 08 rewrites this with the same codes; it is seeded so 09 and 10 also run on their own
+    codes = path('protein-codes.csv')
+    write_table(extract_protein_codes(query_table), codes, index=True)
+
+    scraper_args = ['--workers', str(args.workers), '--no-cache']
+    if args.parse_workers is not None:
+        scraper_args += ['--parse-workers', str(args.parse_workers)]
+
+    return {
+        '02_scrap-knapsack': (
+            [script('02_scrap-knapsack'), '--file', plants, '--output', path('02'),
+             '--base-url', f"{url}/knapsack_core", *scraper_args],
+            args.plants,
+            lambda: count_rows(path('02/ayurvedic-formula-knapsack.csv')),
+        ),
+        '04_scrap-bindingdb': (
+            [script('04_scrap-bindingdb'), '--file', compounds, '--output', path('04'),
+             '--base-url', f"{url}/rwd/bind/searchby_smiles.jsp", *scraper_args],
+            args.compounds,
+            lambda: count_rows(path('04/ayurvedic-bindingdb-results.csv')),
+        ),
+        '08_pdbj-codes': (
+            [script('08_pdbj-codes'), '--file', queries, '--cleaned', path('pdbj-cleaned.csv'), '--output', codes],
+            args.queries,
+            lambda: count_rows(codes),
+        ),
+        '09_pdbj-title': (
+            [script('09_pdbj-title'), '--file', codes, '--output', path('09/pdbj-titled.csv'),
+             '--errors', path('09/errors.csv'), '--api-url', f"{url}/rest/newweb/search/sql", '--no-cache'],
+            lambda: count_rows(codes),
+            lambda: count_rows(path('09/pdbj-titled.csv')),
+        ),
+        '10_pdbj-fasta': (
+            [script('10_pdbj-fasta'), '--file', codes, '--output', path('10'), '--packed', path('10/pdbj.fasta'),
+             '--fasta-url', f"{url}/rest/newweb/fetch/file?cat=pdb&type=fasta&id={{}}",
+             '--workers', str(args.workers), '--no-cache'],
+            lambda: count_rows(codes),
+            lambda: count_lines(path('10/pdbj.fasta.fai')),
+        ),
+    }
+
+def check_protein_codes(workdir, size=200):
+    """Whether 08_pdbj-codes.py finds the same codes in the CSV and the Parquet output of 07"""
+    query_table = synthetic.query_table(size, size // 2, lists=True)
+    codes = {}
+    for ext in ('csv', 'parquet'):
+        queries = os.path.join(workdir, f"check-queries.{ext}")
+        output = os.path.join(workdir, f"check-codes.{ext}")
+        write_table(query_table, queries, index=True)
+        subprocess.run([sys.executable, script('08_pdbj-codes'), '--file', queries,
+                        '--cleaned', os.path.join(workdir, f"check-cleaned.{ext}"), '--output', output],
+                       check=True, stdout=subprocess.DEVNULL)
+        codes[ext] = read_table(output)['protein_code'].tolist()
+    if codes['csv'] != codes['parquet']:
+        print(f"08_pdbj-codes: CSV and Parquet inputs give different codes "
+              f"({len(codes['csv'])} and {len(codes['parquet'])})", file=sys.stderr)
+        return False
+    return True
+
+def run_timed(command, log_path):
+    """Run a command to completion; returns (exit code, seconds, peak RSS in MB or None)"""
+    with open(log_path, 'w') as log:
+        start = time.perf_counter()
+        process = subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT)
+        if hasattr(os, 'wait4'):
+            _, status, usage = os.wait4(process.pid, 0)
+            seconds = time.perf_counter() - start
+            process.returncode = os.waitstatus_to_exitcode(status)
+            return process.returncode, seconds, rss_mb(usage.ru_maxrss)
+        process.wait()
+        return process.returncode, time.perf_counter() - start, None
+
+def tail(path, lines=5):
+    with open(path, errors='replace') as f:
+        return f.read().splitlines()[-lines:]
+
+def run_stage(name, plan, server, workdir):
+    command, rows_in, rows_out = plan
+    os.makedirs(os.path.join(workdir, name[:2]), exist_ok=True)
+    log_path = os.path.join(workdir, f"{name}.log")
+    before = server.total_requests
+    exit_code, seconds, peak_rss = run_timed([sys.executable, *command], log_path)
+    requests = server.total_requests - before
+    rows_in = rows_in() if callable(rows_in) else rows_in
+    ok = exit_code == 0
+    result = {
+        'stage': name,
+        'status': 'ok' if ok else 'failed',
+        'exit_code': exit_code,
+        'seconds': round(seconds, 3),
+        'rows_in': rows_in,
+        'rows_out': rows_out() if ok else None,
+        'rows_per_s': rate(rows_in, seconds) if ok else None,
+        'requests': requests,
+        'requests_per_s': rate(requests, seconds) if ok else None,
+        'peak_rss_mb': peak_rss,
+    }
+    if not ok:
+        result['log_tail'] = tail(log_path)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description='Time the scraping stages end to end against recorded responses.')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=list(STAGES), help='Stages to run, in order')
+    parser.add_argument('--plants', type=int, default=20, help='Plant names searched by 02')
+    parser.add_argument('--compounds', type=int, default=200, help='SMILES searched by 04')
+    parser.add_argument('--queries', type=int, default=2000, help='PDBj query rows read by 08')
+    parser.add_argument('--workers', type=int, default=8, help='--workers passed to the scrapers')
+    parser.add_argument('--parse-workers', type=int, default=None, help='--parse-workers passed to 02 and 04')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='Seconds the stub server waits before every response')
+    parser.add_argument('--workdir', default=None,
+                        help='Directory for inputs, outputs and stage logs (default: a temporary one)')
+    parser.add_argument('--output', default=None, help='Also write the JSON report here')
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='stage-bench-')
+    os.makedirs(workdir, exist_ok=True)
+    results = []
+    try:
+        if '08_pdbj-codes' in args.stages and not check_protein_codes(workdir):
+            sys.exit("08_pdbj-codes.py disagrees between the CSV and Parquet tables of 07")
+        with StubServer(latency=args.latency) as server:
+            plans = plan_stages(args, workdir, server.url)
+            for name in args.stages:
+                result = run_stage(name, plans[name], server, workdir)
+                print(f"{name}: {result['status']} in {result['seconds']} s", file=sys.stderr)
+                results.append(result)
+    finally:
+        if args.workdir is None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    write_report({
+        'benchmark': 'stages',
+        **environment(),
+        'latency': args.latency,
+        'workers': args.workers,
+        'stages': results,
+    }, args.output)
+
+if __name__ == "__main__":
+    main()
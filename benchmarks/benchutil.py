@@ -0,0 +1,50 @@
+import json
+import os
+import platform
+import sys
+
+try:
+    import resource
+except ImportError:  # Windows has no getrusage; peak RSS is then reported as null
+    resource = None
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+SCRIPTS_DIR = os.path.join(REPO_DIR, 'scripts')
+UTILS_DIR = os.path.join(SCRIPTS_DIR, 'utils')
+
+
+def environment():
+    """Fields identifying the machine a report was produced on"""
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def rss_mb(maxrss):
+    """ru_maxrss in MB (Linux reports kilobytes, macOS bytes)"""
+    if maxrss is None:
+        return None
+    return round(maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB"""
+    if resource is None:
+        return None
+    return rss_mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def rate(count, seconds):
+    return round(count / seconds, 1) if seconds and count is not None else None
+
+
+def write_report(report, path=None):
+    """Print the JSON report and also write it to path if given"""
+    text = json.dumps(report, indent=2)
+    if path:
+        with open(path, 'w') as f:
+            f.write(text + '\n')
+    print(text)
@@ -0,0 +1,84 @@
+import argparse
+import json
+import sys
+
+"""
+Benchmark Report Comparison
+
+Compares two JSON reports written by the same benchmark (bench_stages.py,
+bench_micro.py or bench_parsers.py) entry by entry and prints the change of every
+timing, throughput and memory figure. Changes for the worse beyond --threshold
+are flagged as regressions, and the exit status is 1 if there are any, so the
+comparison can gate a change.
+
+    python benchmarks/compare.py baseline.json candidate.json --threshold 0.1
+"""
+
+# The report lists and the fields that identify one entry in them
+ENTRY_KEYS = {
+    'stages': ('stage',),
+    'cases': ('case', 'size'),
+    'pages': ('fixture',),
+}
+HIGHER_IS_BETTER = ('rows_per_s', 'requests_per_s', 'pool_pages_per_s', 'serial_pages_per_s', 'speedup')
+LOWER_IS_BETTER = ('seconds', 'best_s', 'mean_s', 'ms_per_page', 'peak_rss_mb')
+
+def metrics(entry, prefix=''):
+    """{metric path: value} for the comparable numbers of one report entry"""
+    found = {}
+    for key, value in entry.items():
+        if isinstance(value, dict):
+            found.update(metrics(value, f"{prefix}{key}."))
+        elif key in HIGHER_IS_BETTER + LOWER_IS_BETTER and isinstance(value, (int, float)):
+            found[prefix + key] = value
+    return found
+
+def entries(report):
+    """{(list name, entry id): metrics} for every entry of a report"""
+    found = {}
+    for name, keys in ENTRY_KEYS.items():
+        for entry in report.get(name, []):
+            found[(name, ' '.join(str(entry[k]) for k in keys))] = metrics(entry)
+    if isinstance(report.get('pool'), dict):
+        found[('pool', report['pool'].get('backend', ''))] = metrics(report['pool'])
+    return found
+
+def compare(baseline, candidate, threshold):
+    """Rows of (entry, metric, baseline, candidate, relative change, regression?)"""
+    rows = []
+    old, new = entries(baseline), entries(candidate)
+    for key in old.keys() & new.keys():
+        for metric in sorted(old[key].keys() & new[key].keys()):
+            before, after = old[key][metric], new[key][metric]
+            if not before:
+                continue
+            change = (after - before) / before
+            worse = -change if metric.split('.')[-1] in HIGHER_IS_BETTER else change
+            rows.append((' '.join(key), metric, before, after, change, worse > threshold))
+    return sorted(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare two benchmark JSON reports.')
+    parser.add_argument('baseline', help='Report of the reference run')
+    parser.add_argument('candidate', help='Report of the run to check')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='Relative change for the worse that counts as a regression (default: 0.1)')
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+    if baseline.get('benchmark') != candidate.get('benchmark'):
+        sys.exit(f"Cannot compare a {baseline.get('benchmark')!r} report with a {candidate.get('benchmark')!r} report")
+
+    rows = compare(baseline, candidate, args.threshold)
+    for entry, metric, before, after, change, regressed in rows:
+        flag = '  REGRESSION' if regressed else ''
+        print(f"{entry:<32} {metric:<24} {before:>12} -> {after:<12} {change:+7.1%}{flag}")
+    regressions = sum(row[-1] for row in rows)
+    print(f"{len(rows)} figures compared, {regressions} regressions beyond {args.threshold:.0%}")
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
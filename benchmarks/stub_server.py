@@ -0,0 +1,178 @@
+import argparse
+import json
+import os
+import re
+import threading
+import time
+import zlib
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(BENCH_DIR, 'fixtures')
+
+"""
+Offline Stub Server
+
+Replays the recorded KNApSAcK, BindingDB and PDBj responses in benchmarks/fixtures
+on localhost, so every scraping stage can be run and timed without the network:
+
+    /knapsack_core/result.php          recorded plant search (the same 120 C_IDs for every plant)
+    /knapsack_core/information.php     recorded metabolite page, with the requested C_ID filled in
+    /rwd/bind/searchby_smiles.jsp      recorded 50-hit results page; one SMILES in four gets
+                                       the "No Similarity Matches" page instead
+    /rest/newweb/search/sql            recorded title query, answering every requested PDB ID
+    /rest/newweb/fetch/file            recorded FASTA entry, renamed to the requested PDB ID
+
+The answer for a key only depends on the key, so repeated runs see the same data.
+Requests are counted per route; --latency adds a fixed delay to every response.
+
+    python benchmarks/stub_server.py --port 8790
+    python scripts/02_scrap-knapsack.py --base-url http://127.0.0.1:8790/knapsack_core ...
+"""
+
+# Strings of the recordings that are replaced by the requested key
+RECORDED_CID = 'C00,002,965'
+RECORDED_PDB_ID = '1hsg'
+SQL_IDS = re.compile(r"'([0-9a-z]+)'")
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), encoding='utf-8') as f:
+        return f.read()
+
+def _bucket(key, n):
+    # Stable across processes, unlike hash()
+    return zlib.crc32(key.encode('utf-8')) % n
+
+class StubServer:
+    """Threaded HTTP server replaying the recorded responses; use as a context manager
+
+    `port=0` picks a free port; `url` is the root to point the scripts at.
+    `requests` counts served requests per route.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0):
+        self.latency = latency
+        self.requests = Counter()
+        self._lock = threading.Lock()
+        self._fixtures = {
+            'knapsack_result': load_fixture('knapsack_result.html'),
+            'knapsack_detail': load_fixture('knapsack_detail.html'),
+            'bindingdb_results': load_fixture('bindingdb_results.html'),
+            'bindingdb_no_matches': load_fixture('bindingdb_no_matches.html'),
+            'pdbj_fasta': load_fixture('pdbj_fasta.txt'),
+            'pdbj_titles': [title for _, title in json.loads(load_fixture('pdbj_sql.json'))['resultset']['records']],
+        }
+        self._routes = {
+            '/knapsack_core/result.php': self._knapsack_result,
+            '/knapsack_core/information.php': self._knapsack_detail,
+            '/rwd/bind/searchby_smiles.jsp': self._bindingdb,
+            '/rest/newweb/search/sql': self._pdbj_sql,
+            '/rest/newweb/fetch/file': self._pdbj_fasta,
+        }
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def total_requests(self):
+        with self._lock:
+            return sum(self.requests.values())
+
+    def serve_forever(self):
+        """Serve in the calling thread until interrupted"""
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'   # keep-alive, like the real servers
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                route = stub._routes.get(parts.path)
+                with stub._lock:
+                    stub.requests[parts.path if route else 'unknown'] += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+                if route is None:
+                    status, content_type, body = 404, 'text/plain', 'not recorded'
+                else:
+                    status, content_type, body = route({k: v[0] for k, v in parse_qs(parts.query).items()})
+                data = body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', f"{content_type}; charset=utf-8")
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def _knapsack_result(self, params):
+        return 200, 'text/html', self._fixtures['knapsack_result']
+
+    def _knapsack_detail(self, params):
+        cid = params.get('word', '')
+        return 200, 'text/html', self._fixtures['knapsack_detail'].replace(RECORDED_CID, cid)
+
+    def _bindingdb(self, params):
+        if _bucket(params.get('smilesStr', ''), 4) == 0:
+            return 200, 'text/html', self._fixtures['bindingdb_no_matches']
+        # Every page repeats the recording, so the scraper stops after the second one
+        return 200, 'text/html', self._fixtures['bindingdb_results']
+
+    def _pdbj_sql(self, params):
+        titles = self._fixtures['pdbj_titles']
+        records = [[pdbid, titles[_bucket(pdbid, len(titles))]] for pdbid in SQL_IDS.findall(params.get('q', ''))]
+        return 200, 'application/json', json.dumps({'resultset': {'columns': ['pdbid', 'title'], 'records': records}})
+
+    def _pdbj_fasta(self, params):
+        pdb_id = params.get('id', '').lower()
+        return 200, 'text/plain', self._fixtures['pdbj_fasta'].replace(RECORDED_PDB_ID, pdb_id)
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve the recorded responses in benchmarks/fixtures.')
+    parser.add_argument('--host', default='127.0.0.1', help='Interface to listen on')
+    parser.add_argument('--port', type=int, default=8790, help='Port to listen on (0 picks a free one)')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every response')
+    args = parser.parse_args()
+
+    server = StubServer(args.host, args.port, latency=args.latency)
+    print(f"Serving recorded responses on {server.url} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"Requests: {dict(server.requests)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import numpy as np
+import pandas as pd
+
+"""
+Synthetic Benchmark Inputs
+
+Deterministic tables shaped like the pipeline's stage inputs, at any size. The
+values are made up but unique where the real keys are unique (plant names,
+SMILES, PDB IDs), so the scrapers do the same amount of work per row as on
+real data.
+"""
+
+BASE36 = '0123456789abcdefghijklmnopqrstuvwxyz'
+# PDB IDs are a digit 1-9 followed by three alphanumerics
+MAX_PDB_IDS = 9 * 36 ** 3
+SEQUENCE = 'PQITLWQRPLVTIKIGGQLKEALLDTGADDTVLEEMSLPGRWKPKMIGGIGGFIKVRQYDQILIEICGHKAIGTVLVGPTPVNIIGRNLLTQIGCTLNF'
+
+def pdb_ids(n):
+    """n distinct PDB-style IDs ('1000', '1001', ...), upper-cased like BindingDB links"""
+    if n > MAX_PDB_IDS:
+        raise ValueError(f"At most {MAX_PDB_IDS} distinct PDB IDs")
+    ids = []
+    for i in range(n):
+        rest, code = divmod(i, 36 ** 3)
+        ids.append(str(rest + 1) + BASE36[code // 1296] + BASE36[code // 36 % 36] + BASE36[code % 36])
+    return [code.upper() for code in ids]
+
+def smiles(n):
+    """n distinct, valid SMILES of four short C/N/O/S chains (the chain lengths spell i in base 32)"""
+    return ['.'.join(atom * (1 + (i >> shift if atom == 'S' else i >> shift & 31))
+                     for atom, shift in (('C', 0), ('N', 5), ('O', 10), ('S', 15)))
+            for i in range(n)]
+
+def plants_table(n):
+    """Input of 02_scrap-knapsack.py"""
+    return pd.DataFrame({'Scientific Name': [f"Plantago species {i}" for i in range(n)]})
+
+def compounds_table(n):
+    """Input of 04_scrap-bindingdb.py"""
+    return pd.DataFrame({'C_ID': [f"C{i:08d}" for i in range(n)], 'SMILES': smiles(n)})
+
+def query_table(n, distinct_ids, seed=0, lists=False):
+    """Input of 08_pdbj-codes.py: 1-3 of `distinct_ids` PDB IDs per row, as stringified lists
+
+    With `lists` the cells are lists, as 07_scrap-pdbj.py stores them: every
+    seventh row holds one search box value of comma-separated IDs and every
+    eleventh row is an empty list (a link that failed).
+    """
+    rng = np.random.default_rng(seed)
+    ids = np.array(pdb_ids(distinct_ids))
+    counts = rng.integers(1, 4, size=n)
+    picks = rng.integers(0, distinct_ids, size=counts.sum())
+    bounds = np.concatenate([[0], np.cumsum(counts)])
+    queries = [ids[picks[a:b]].tolist() for a, b in zip(bounds[:-1], bounds[1:])]
+    if lists:
+        queries = [[] if i % 11 == 0 else [','.join(value)] if i % 7 == 0 else value
+                   for i, value in enumerate(queries)]
+    else:
+        queries = [str(value) for value in queries]
+    return pd.DataFrame({'C_ID': [f"C{i:08d}" for i in range(n)], 'queries': queries})
+
+def bindingdb_table(n, seed=0, lists=False):
+    """Output of 04_scrap-bindingdb.py: 1-5 ', '-joined hits per row, every tenth row missing
+
+    With `lists` the hit cells are lists, as read back from Parquet, and
+    every tenth row from the fifth on is an empty list (a search without hits).
+    """
+    rng = np.random.default_rng(seed)
+    counts = rng.integers(1, 6, size=n)
+    ids = np.array(pdb_ids(min(n, MAX_PDB_IDS)))
+
+    def joined(make):
+        values = [[make(i, k) for k in range(count)] for i, count in enumerate(counts)]
+        if lists:
+            values = [[] if i % 10 == 5 else value for i, value in enumerate(values)]
+        else:
+            values = [', '.join(value) for value in values]
+        return [value if i % 10 else np.nan for i, value in enumerate(values)]
+
+    return pd.DataFrame({
+        'C_ID': [f"C{i:08d}" for i in range(n)],
+        'SMILES': smiles(n),
+        # Some target names hold a bare comma, as real ones do ("2,4-dienoyl-CoA reductase")
+        'target_name': joined(lambda i, k: f"Protease {k}" if k % 2 else f"{k + 2},4-Dienoyl-CoA reductase"),
+        'species': joined(lambda i, k: 'Human immunodeficiency virus 1'),
+        'bdb_id': joined(lambda i, k: f"BDBM{i * 5 + k}"),
+        'ligand_smiles': joined(lambda i, k: 'CC(=O)N' + 'C' * k),
+        'pdb_link': joined(lambda i, k: f"https://www.rcsb.org/structure/{ids[(i + k) % len(ids)]}"),
+    })
+
+def fasta_lines(n, line_width=80):
+    """FASTA text of n chains, as a list of lines"""
+    wrapped = [SEQUENCE[i:i + line_width] for i in range(0, len(SEQUENCE), line_width)]
+    ids = pdb_ids(min((n + 1) // 2, MAX_PDB_IDS))
+    lines = []
+    for i in range(n):
+        lines.append(f">{ids[i // 2 % len(ids)].lower()}_{'AB'[i % 2]}: HIV-1 PROTEASE\n")
+        lines.extend(line + '\n' for line in wrapped)
+    return lines
+
+def cluster_tables(n, seed=0):
+    """(df_all, membership) for cluster.assign_compound_clusters with n compound rows
+
+    The compounds query n // 10 distinct PDB IDs; every chain of those
+    entries belongs to one of n // 50 clusters.
+    """
+    distinct = max(n // 10, 1)
+    df_all = query_table(n, distinct, seed)
+    ids = pdb_ids(distinct)
+    rng = np.random.default_rng(seed + 1)
+    membership = pd.DataFrame({
+        'seq_code': [f"{code.lower()}_{chain}" for code in ids for chain in 'AB'],
+        'cluster': rng.integers(1, max(n // 50, 1) + 1, size=2 * distinct),
+    })
+    return df_all, membership
@@ -1,9 +1,9 @@
-import requests
-from bs4 import BeautifulSoup
+import sys
 import pandas as pd
 from tqdm import tqdm
 import argparse
 import os
+from contextlib import nullcontext
 
 """
 KNApSAcK Secondary Metabolite Scraper
@@ -28,14 +28,74 @@ For each plant species, the script:
 
 The input CSV file should contain a column named 'Scientific Name' with the plant 
 scientific names to search for.
+
+Search pages and detail pages are fetched concurrently over a pooled keep-alive
+session (see utils/fetcher.py). Use --workers to bound the number of requests
+in flight and --rate to cap the requests per second sent to KNApSAcK. The output
+is identical to a serial run regardless of these settings.
+
+Responses are kept in an on-disk HTTP cache (utils/http_cache.py), so reruns only
+download pages that are not cached yet; --cache-only replays the cache offline.
+Completed searches and compounds are appended to a run journal in batches, so an
+interrupted run picks up where it stopped and the CSV is written from the journal.
+The journal is also the manifest of resolved names and C_IDs with their fetch
+times (see manifest.py): a rerun on a grown input only searches the new names,
+and --refresh DAYS also re-fetches entries older than DAYS.
+
+--metrics writes request latency, cache, parse and join timings while the script
+runs (utils/metrics.py); per-plant messages are sampled according to --log-every.
+
+A sweep can be split by scientific name (utils/shard.py): --shard i/N processes
+only the names that hash to shard i of N, e.g. one shard per machine, and
+--queue lets several processes share a SQLite work queue, leasing batches of
+names. Each process writes its own output, journal and error file
+(ayurvedic-formula-knapsack.shard-0-of-4.csv, ...); merge_shards.py combines the
+outputs into the table a single run would have written.
 """
 
+def setup_paths():
+    """Set up the system path to include the modules from the utils directory"""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    utils_path = os.path.join(script_dir, 'utils')
+    sys.path.append(utils_path)
+
 def main():
+    setup_paths()
+    from fetcher import Fetcher, error_kind
+    from http_cache import add_cache_arguments, cache_from_args
+    from metrics import add_metrics_arguments, exporter_from_args, log_from_args, timed
+    from run_journal import RunJournal, add_refresh_arguments, journal_path, refresh_from_args
+    from shard import ROW_COLUMN, add_shard_arguments, sharding_from_args
+    from table_io import read_table, write_table
+    from html_parsers import BACKENDS, parse_pool
+    from knapsack_scraper import (BASE_URL, METABOLITE_COLUMNS, search_knapsack,
+                                  fetch_knapsack_details, metabolite_record)
+
     # Set up argument parser
     parser = argparse.ArgumentParser(description='Scrape KNApSAcK for metabolite information.')
-    parser.add_argument('--file', required=True, help='Path to the input CSV file')
+    parser.add_argument('--file', required=True, help='Path to the input table (.csv or .parquet)')
     parser.add_argument('--output', required=True, help='Directory to save the output file')
+    parser.add_argument('--output-name', default='ayurvedic-formula-knapsack.csv',
+                        help='File name of the results table inside the output directory '
+                             '(a .parquet name writes Parquet instead of CSV)')
+    parser.add_argument('--workers', type=int, default=8, help='Maximum number of concurrent requests')
+    parser.add_argument('--rate', type=float, default=None,
+                        help='Maximum requests per second per host (default: unlimited)')
+    parser.add_argument('--parser', choices=('auto',) + BACKENDS, default='auto',
+                        help='HTML parser backend (auto: lxml when installed)')
+    parser.add_argument('--parse-workers', type=int, default=None,
+                        help='Processes parsing pages (default: one per CPU; 0 parses in the I/O threads)')
+    parser.add_argument('--base-url', default=None,
+                        help='Override the KNApSAcK base URL, e.g. to point at a local stub server')
+    parser.add_argument('--journal', default=None,
+                        help='Run journal used to resume interrupted runs '
+                             '(default: next to the output file)')
+    add_cache_arguments(parser)
+    add_metrics_arguments(parser)
+    add_shard_arguments(parser)
+    add_refresh_arguments(parser)
     args = parser.parse_args()
+    max_age = refresh_from_args(args)
 
     # Validate input file
     if not os.path.exists(args.file):
@@ -47,82 +107,119 @@ def main():
         print(f"Creating output directory: {args.output}")
         os.makedirs(args.output)
 
-    # Construct output file path
-    output_file = os.path.join(args.output, "ayurvedic-formula-knapsack.csv")
+    base_url = args.base_url or BASE_URL
+
+    # Construct output file path (one per shard or queue worker)
+    sharding = sharding_from_args(args)
+    output_file = sharding.path(os.path.join(args.output, args.output_name))
 
     # Load the input data
-    df = pd.read_csv(args.file, index_col=0)
-
-    # Base URLs for search and details
-    search_url = "http://www.knapsackfamily.com/knapsack_core/result.php"
-    detail_url = "http://www.knapsackfamily.com/knapsack_core/information.php"
-
-    rows_to_append = []
-
-    for idx, row in tqdm(df.iterrows(), total=df.shape[0], desc="Processing Scientific Names"):
-        print(f"Processing row {idx + 1}/{df.shape[0]}: {row['Scientific Name']}")
-        scientific_name = row['Scientific Name']
-        if pd.isna(scientific_name):
-            continue  # Skip rows without a valid scientific name
-
-        # Search for the metabolites
-        params = {"sname": "all", "word": scientific_name}
-        search_response = requests.get(search_url, params=params)
-        search_soup = BeautifulSoup(search_response.text, 'html.parser')
-
-        # Extract CIDs from the search result
-        cid_links = search_soup.find_all('a', href=True, string=lambda t: t and t.startswith('C'))
-        total_cids = len(cid_links)
-        print(f"Found {total_cids} CIDs for '{scientific_name}'")
-        if not cid_links:
-            continue  # Skip if no CIDs are found
-
-        # Iterate over all found CIDs and extract details
-        for cid_link in cid_links:
-            print(f"Processing CID {cid_links.index(cid_link) + 1}/{total_cids} for index {idx}")
-            cid = cid_link['href'].split('=')[-1]
-            detail_response = requests.get(f"{detail_url}?word={cid}")
-            detail_soup = BeautifulSoup(detail_response.text, 'html.parser')
-
-            # Extract relevant information from the detail page
-            details = {
-                "Name": None,
-                "Formula": None,
-                "Mw": None,
-                "CAS RN": None,
-                "C_ID": None,
-                "InChIKey": None,
-                "InChICode": None,
-                "SMILES": None,
-            }
-
-            # Map table rows to the details dictionary
-            for tr in detail_soup.find_all('tr'):
-                th = tr.find('th')
-                td = tr.find('td')
-                if th and td:
-                    key = th.get_text(strip=True)
-                    value = td.get_text(strip=True)
-                    if key in details:
-                        details[key] = value
-
-            # Create a new row with the original data and add the metabolite information
-            new_row = row.copy()
-            new_row['Metabolite Name'] = details['Name']
-            new_row['Formula'] = details['Formula']
-            new_row['Mw'] = details['Mw']
-            new_row['CAS RN'] = details['CAS RN']
-            new_row['C_ID'] = details['C_ID'].replace(',', '') if details['C_ID'] else None  # Remove comma from C_ID
-            new_row['InChIKey'] = details['InChIKey']
-            new_row['InChICode'] = details['InChICode']
-            new_row['SMILES'] = details['SMILES']
-
-            # Add the new row to the rows_to_append list
-            rows_to_append.append(new_row)
-            
-    rows_to_append_df = pd.DataFrame(rows_to_append)
-    rows_to_append_df.to_csv(output_file, index=False)
+    df = read_table(args.file, index_col=0)
+    df = df[df['Scientific Name'].notna()]  # Skip rows without a valid scientific name
+
+    # Completed searches and detail pages are journaled, so an interrupted run resumes
+    journal = RunJournal(args.journal or journal_path(output_file))
+    errors = []
+    if max_age is not None:
+        new, stale, fresh = journal.delta((f"search:{name}" for name in df['Scientific Name']), max_age)
+        print(f"Refresh: {new} new and {stale} stale scientific names to search, {fresh} up to date")
+
+    def attempt(func, key):
+        # A failed request is reported and left out of the journal, so the next run retries it
+        try:
+            return func(key), None
+        except Exception as e:
+            return None, e
+
+    parsers = parse_pool(args.parse_workers) if args.parse_workers != 0 else nullcontext()
+    log = log_from_args(args)
+    exporter = exporter_from_args(args).start()
+
+    with journal, parsers, log, Fetcher(workers=args.workers, rate=args.rate, cache=cache_from_args(args)) as fetcher:
+        parse = {'backend': args.parser, 'parse_pool': parsers if args.parse_workers != 0 else None}
+
+        def process(batch):
+            """Search a batch of scientific names and fetch their compounds; returns the names that failed"""
+            # Stage 1: search every scientific name concurrently
+            names = [name for name in batch if journal.needs(f"search:{name}", max_age)]
+            search_results = fetcher.map(
+                lambda name: attempt(lambda key: search_knapsack(fetcher, key, base_url, **parse), name),
+                names
+            )
+            failed = set()
+            for name, (cids, e) in tqdm(zip(names, search_results), total=len(names),
+                                        desc="Processing Scientific Names"):
+                if e is not None:
+                    log(f"Error searching '{name}': [{error_kind(e)}] {e}", kind='error')
+                    errors.append((f"search:{name}", error_kind(e), str(e)))
+                    failed.add(name)
+                    continue
+                log(f"Found {len(cids)} CIDs for '{name}'", kind='search')
+                journal.record(f"search:{name}", cids)
+
+            # Stage 2: fetch each distinct C_ID detail page exactly once, however many
+            # plants list it (repeat runs are served by the on-disk HTTP cache)
+            unique_cids = list(dict.fromkeys(cid for name in batch for cid in journal.get(f"search:{name}") or []))
+            pending_cids = [cid for cid in unique_cids if journal.needs(f"cid:{cid}", max_age)]
+            print(f"Fetching {len(pending_cids)} of {len(unique_cids)} distinct CIDs "
+                  f"for {len(batch)} scientific names")
+            detail_results = fetcher.map(
+                lambda cid: attempt(lambda key: fetch_knapsack_details(fetcher, key, base_url, **parse), cid),
+                pending_cids
+            )
+            for cid, (details, e) in tqdm(zip(pending_cids, detail_results), total=len(pending_cids),
+                                          desc="Processing CIDs"):
+                if e is not None:
+                    log(f"Error fetching {cid}: [{error_kind(e)}] {e}", kind='error')
+                    errors.append((f"cid:{cid}", error_kind(e), str(e)))
+                    continue
+                journal.record(f"cid:{cid}", metabolite_record(details))
+            journal.flush()
+            return failed
+
+        # One batch of every name (or of this shard's names), or leased batches of a --queue
+        for batch in sharding.batches(df['Scientific Name'], limit=args.workers * 4):
+            failed = process(batch)
+            sharding.finish([name for name in batch if name not in failed], failed)
+
+        print(f"Requests: {fetcher.summary()}")
+
+    # The plant rows this process writes, keyed by their position in the input
+    plants = df.reset_index(drop=True)
+    plants = plants[sharding.rows(plants['Scientific Name'])]
+    plant_cids = []
+    for position, name in zip(plants.index, plants['Scientific Name']):
+        plant_cids.extend((position, cid) for cid in journal.get(f"search:{name}") or [])
+    unique_cids = list(dict.fromkeys(cid for _, cid in plant_cids))
+    metabolites = {cid: journal.get(f"cid:{cid}") for cid in unique_cids if f"cid:{cid}" in journal}
+
+    # Join the plant rows with their metabolite information, keeping the plant/CID order
+    # (pairs whose detail page failed are left out until a rerun fetches it)
+    with timed('join'):
+        metabolites_df = pd.DataFrame.from_dict(metabolites, orient='index', columns=METABOLITE_COLUMNS)
+        pairs = pd.DataFrame(plant_cids, columns=['_plant', '_cid'])
+        pairs = pairs[pairs['_cid'].isin(metabolites_df.index)]
+        rows_to_append_df = (
+            pairs
+            .join(plants.drop(columns=METABOLITE_COLUMNS, errors='ignore'), on='_plant')
+            .join(metabolites_df, on='_cid')
+        )
+        columns = list(plants.columns) + [c for c in METABOLITE_COLUMNS if c not in plants.columns]
+        if sharding.active:
+            # Lets merge_shards.py restore the order of a single run
+            rows_to_append_df[ROW_COLUMN] = pairs['_plant']
+            columns.append(ROW_COLUMN)
+        rows_to_append_df = rows_to_append_df[columns]
+    with timed('write'):
+        write_table(rows_to_append_df, output_file)
+
+    error_file = sharding.path(os.path.join(args.output, 'ayurvedic-knapsack-errors.csv'))
+    pd.DataFrame(errors, columns=['key', 'kind', 'error']).to_csv(error_file, index=False)
+    if errors:
+        print(f"{len(errors)} requests failed; rerun to retry them. Errors saved to {error_file}")
     print(f"Data extraction complete. Results saved to '{output_file}'.")
+    sharding.close()
+    exporter.stop()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
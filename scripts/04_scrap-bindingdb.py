@@ -1,6 +1,8 @@
 import sys
 import os
 import argparse
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 import pandas as pd
 from tqdm import tqdm
 
@@ -23,9 +25,36 @@ For each compound, the script:
 
 The input CSV file should contain a column named 'SMILES' with the chemical structure
 notation for each compound.
+
+Rendered result pages are stored in the shared HTTP cache (utils/http_cache.py),
+so reruns skip compounds whose page is already cached; --cache-only replays the
+cache without starting a browser.
+
+Result pages are server-rendered, so they are fetched over plain HTTP by --workers
+parallel workers and every result page (startPg/Increment) is collected. Only when
+a plain request fails does the script fall back to a pool of long-lived headless
+browsers (utils/driver_pool.py); at most --browsers run at once, and each one is
+restarted after --pages-per-browser pages or after a crash. --selenium-only skips
+the HTTP fast path.
+
+Completed compounds are appended to a run journal in batches; a restarted run skips
+every SMILES already in the journal and the final CSV is written from it. The
+journal is also the manifest of searched SMILES with their fetch times (see
+manifest.py): a rerun on a grown input only searches the new SMILES, and
+--refresh DAYS also searches again the ones older than DAYS.
+
+--metrics writes request latency, cache, parse and browser timings while the script
+runs (utils/metrics.py); per-compound errors are sampled according to --log-every.
+
+A sweep can be split by SMILES (utils/shard.py): --shard i/N searches only the
+SMILES that hash to shard i of N, e.g. one shard per machine, and --queue lets
+several processes share a SQLite work queue, leasing batches of SMILES. Each
+process writes its own output, journal and error file
+(ayurvedic-bindingdb-results.shard-0-of-4.csv, ...); merge_shards.py combines the
+outputs into the table a single run would have written.
 """
 
-def setup_paths(file_path):
+def setup_paths():
     """Set up the system path to include the bdb_scraper module from the utils directory"""
     # Get the directory of the current script
     script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -41,17 +70,84 @@ def setup_paths(file_path):
         print("Please ensure the module exists in the utils directory.")
         sys.exit(1)
 
+def screen_similar(pending, index, threshold):
+    """Split pending SMILES into ones to search and {smiles: source} reusing a similar search
+
+    The index holds the SMILES already searched successfully (seeded once
+    from the journal); the pending SMILES join it one by one as they are
+    searched, so each group of near-duplicates is searched once, through
+    its first member.
+    """
+    to_search, reused = [], {}
+    for smiles in pending:
+        match = index.best(smiles)
+        if match is not None and match[1] >= threshold:
+            reused[smiles] = match[0]
+        else:
+            to_search.append(smiles)
+            index.add(smiles)
+    return to_search, reused
+
 def main():
+    # Import the scrape_bindingdb function
+    scrape_bindingdb = setup_paths()
+    from http_cache import add_cache_arguments, cache_from_args
+    from bdb_scraper import BASE_URL, create_chrome_driver
+    from driver_pool import DriverPool
+    from table_io import BINDINGDB_LIST_COLUMNS, read_table, write_table
+    from fetcher import Fetcher, error_kind
+    from html_parsers import BACKENDS, parse_pool
+    from metrics import REGISTRY, add_metrics_arguments, exporter_from_args, log_from_args, timed
+    from run_journal import RunJournal, add_refresh_arguments, journal_path, refresh_from_args
+    from shard import ROW_COLUMN, add_shard_arguments, sharding_from_args
+
     # Set up argument parser
     parser = argparse.ArgumentParser(
         description='Scrape BindingDB for protein binding information based on SMILES notations',
         epilog='Example: python 04_scrap-bindingdb.py --file compounds.csv --output results'
     )
     parser.add_argument('--file', required=True, 
-                        help='Path to the input CSV file containing SMILES notations')
+                        help='Path to the input table (.csv or .parquet) containing SMILES notations')
     parser.add_argument('--output', required=True, 
                         help='Directory to save the output CSV files')
+    parser.add_argument('--output-name', default='ayurvedic-bindingdb-results.csv',
+                        help='File name of the results table inside the output directory '
+                             '(a .parquet name stores the hit columns as real lists)')
+    parser.add_argument('--workers', type=int, default=8,
+                        help='Number of compounds processed in parallel')
+    parser.add_argument('--rate', type=float, default=None,
+                        help='Maximum requests per second to BindingDB (default: unlimited, '
+                             'concurrency still backs off when the server throttles)')
+    parser.add_argument('--parser', choices=('auto',) + BACKENDS, default='auto',
+                        help='HTML parser backend (auto: lxml when installed)')
+    parser.add_argument('--parse-workers', type=int, default=None,
+                        help='Processes parsing result pages (default: one per CPU; 0 parses in the I/O threads)')
+    parser.add_argument('--browsers', type=int, default=2,
+                        help='Maximum number of fallback browser instances running at once')
+    parser.add_argument('--pages-per-browser', type=int, default=200,
+                        help='Restart each browser after this many pages')
+    parser.add_argument('--selenium-only', action='store_true',
+                        help='Always render pages in a browser instead of trying plain HTTP first')
+    parser.add_argument('--base-url', default=None,
+                        help='Override the BindingDB search URL, e.g. to point at a local stub server')
+    parser.add_argument('--reuse-similar', type=float, default=None, metavar='TANIMOTO',
+                        help='Skip the BindingDB search for compounds at least this similar to one already '
+                             'searched and reuse its hits (e.g. 0.95; needs RDKit; default: search every compound)')
+    parser.add_argument('--journal', default=None,
+                        help='Run journal used to resume interrupted runs '
+                             '(default: next to the output file)')
+    add_cache_arguments(parser)
+    add_metrics_arguments(parser)
+    add_shard_arguments(parser)
+    add_refresh_arguments(parser)
     args = parser.parse_args()
+    max_age = refresh_from_args(args)
+    if args.reuse_similar is not None:
+        from similarity import MORGAN_KIND, fingerprint_kind
+        # Reused hits are journaled for good; SMILES n-grams rate different compounds as identical
+        if fingerprint_kind() != MORGAN_KIND:
+            parser.error("--reuse-similar needs RDKit Morgan fingerprints; install rdkit "
+                         f"(this environment only computes {fingerprint_kind()} fingerprints)")
 
     # Validate input file
     if not os.path.exists(args.file):
@@ -63,41 +159,117 @@ def main():
         print(f"Creating output directory: {args.output}")
         os.makedirs(args.output)
 
-    # Import the scrape_bindingdb function
-    scrape_bindingdb = setup_paths(args.file)
+    cache = cache_from_args(args)
 
     # Load the input data
-    df = pd.read_csv(args.file, index_col=0)
+    df = read_table(args.file, index_col=0)
     
-    # Prepare output file paths
-    output_file = os.path.join(args.output, "ayurvedic-bindingdb-results.csv")
-    error_file = os.path.join(args.output, "ayurvedic-bindingdb-errors.csv")
+    # Prepare output file paths (one set per shard or queue worker)
+    sharding = sharding_from_args(args)
+    output_file = sharding.path(os.path.join(args.output, args.output_name))
+    error_file = sharding.path(os.path.join(args.output, "ayurvedic-bindingdb-errors.csv"))
     
     error = []
 
-    for idx, row in tqdm(df.iterrows(), total=df.shape[0], desc="Processing SMILES"):
-        smiles = row['SMILES']
-        if pd.notna(smiles):
-            try:
-                print(f"Processing SMILES: {smiles} from CID: {row['C_ID']}")
-                target_names, specieses, bdb_ids, ligand_smiles, pdb_links = scrape_bindingdb(smiles)
-                df.at[idx, 'target_name'] = target_names
-                df.at[idx, 'species'] = specieses
-                df.at[idx, 'bdb_id'] = bdb_ids
-                df.at[idx, 'ligand_smiles'] = ligand_smiles
-                df.at[idx, 'pdb_link'] = pdb_links
-            except Exception as e:
-                print(f"Error processing {idx} from C_ID {row['C_ID']}: {e}")
-                error.append((idx, row['C_ID'], str(e)))
+    pool = DriverPool(create_chrome_driver, size=args.browsers, max_pages=args.pages_per_browser)
+    fetcher = None if args.selenium_only else Fetcher(workers=args.workers, rate=args.rate)
+    parsers = parse_pool(args.parse_workers) if args.parse_workers != 0 else None
+    log = log_from_args(args)
+    exporter = exporter_from_args(args).start()
+
+    def scrape(smiles):
+        try:
+            return scrape_bindingdb(smiles, cache=cache, pool=pool, fetcher=fetcher,
+                                    backend=args.parser, parse_pool=parsers,
+                                    base_url=args.base_url or BASE_URL), None
+        except Exception as e:
+            return None, e
+
+    # Completed compounds are journaled by SMILES, so an interrupted run resumes
+    # and identical SMILES are only searched once
+    journal = RunJournal(args.journal or journal_path(output_file))
+    rows = df[df['SMILES'].notna()]
+    failed = {}
+    if max_age is not None:
+        new, stale, fresh = journal.delta(rows['SMILES'], max_age)
+        print(f"Refresh: {new} new and {stale} stale SMILES to search, {fresh} up to date")
+    index = None
+    if args.reuse_similar is not None:
+        from similarity import SimilarityIndex
+        index = SimilarityIndex()
+        # Stale entries are searched again under --refresh, so they must not match themselves
+        index.update(smiles for smiles, result in journal.items()
+                     if 'ERROR' not in result and not journal.needs(smiles, max_age))
+
+    def process(batch):
+        # Older runs journaled BindingDB failures as an "ERROR" row; search those again
+        pending = [smiles for smiles in batch
+                   if journal.needs(smiles, max_age) or journal.get(smiles) == ['ERROR'] * 5]
+
+        # Pre-screen near-duplicate compounds against the ones already searched
+        reused = {}
+        if index is not None:
+            pending, reused = screen_similar(pending, index, args.reuse_similar)
+            REGISTRY.inc('bindingdb_reused_total', len(reused))
+            log(f"Searching {len(pending)} compounds, reusing hits for {len(reused)} near-duplicates", kind='batch')
+
+        results = executor.map(scrape, pending)
+        for smiles, (result, e) in tqdm(zip(pending, results), total=len(pending),
+                                        desc="Processing SMILES"):
+            if e is not None:
+                log(f"Error processing SMILES {smiles}: [{error_kind(e)}] {e}", kind='error')
+                failed[smiles] = (error_kind(e), str(e))
+                continue
+            journal.record(smiles, list(result))
+
+        for smiles, source in reused.items():
+            if source in journal:
+                journal.record(smiles, journal.get(source))
+        journal.flush()
+
+    # The HTTP session and the parse processes are closed even if a batch raises
+    with journal, pool, log, nullcontext() if fetcher is None else fetcher, \
+            nullcontext() if parsers is None else parsers, ThreadPoolExecutor(max_workers=args.workers) as executor:
+        # One batch of every SMILES (or of this shard's), or leased batches of a --queue
+        for batch in sharding.batches(rows['SMILES'], limit=args.workers * 4):
+            process(batch)
+            sharding.finish([smiles for smiles in batch if smiles in journal],
+                            [smiles for smiles in batch if smiles not in journal])
+
+        if fetcher is not None:
+            print(f"Requests: {fetcher.summary()}")
+
+    # Keep the rows this process writes, with their input position for merge_shards.py
+    if sharding.active:
+        df[ROW_COLUMN] = range(len(df))
+        df = df[sharding.rows(df['SMILES'])].copy()
+        rows = df[df['SMILES'].notna()]
+
+    # Fill the output table from the journal
+    with timed('fill'):
+        for idx, row in rows.iterrows():
+            result = journal.get(row['SMILES'])
+            if result is None:
+                error.append((idx, row['C_ID'], *failed.get(row['SMILES'], ('skipped', 'not processed'))))
+                continue
+            target_names, specieses, bdb_ids, ligand_smiles, pdb_links = result
+            df.at[idx, 'target_name'] = target_names
+            df.at[idx, 'species'] = specieses
+            df.at[idx, 'bdb_id'] = bdb_ids
+            df.at[idx, 'ligand_smiles'] = ligand_smiles
+            df.at[idx, 'pdb_link'] = pdb_links
 
     # Save errors to file
-    error_df = pd.DataFrame(error, columns=['Index', 'C_ID', 'Error'])
+    error_df = pd.DataFrame(error, columns=['Index', 'C_ID', 'Kind', 'Error'])
     error_df.to_csv(error_file, index=False)
     print(f"Errors saved to {error_file}")
 
     # Save results to file
-    df.to_csv(output_file, index=True)
+    with timed('write'):
+        write_table(df, output_file, index=True, list_columns=BINDINGDB_LIST_COLUMNS)
     print(f"Data saved to {output_file}")
+    sharding.close()
+    exporter.stop()
 
 if __name__ == "__main__":
     main()
@@ -1,65 +1,115 @@
+import argparse
 import os
-import time
+import sys
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 from tqdm import tqdm
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'utils'))
+from driver_pool import DriverPool
+from pdbj_resolver import browser_query, link_query
+from metrics import add_metrics_arguments, exporter_from_args, log_from_args
+from run_journal import RunJournal, add_refresh_arguments, journal_path, refresh_from_args
+from table_io import read_table, write_table
+
 # --- Paths ---
 INPUT_CSV  = r'E:\research\ayurvedic-hiv\data\processed\09_ayurvedic-knapsack-bindingdb-hiv-targets.csv'
 OUTPUT_CSV = r'E:\research\ayurvedic-hiv\data\processed\10_ayurvedic-knapsack-bindingdb-pdbj.csv'
 ERROR_CSV  = r'E:\research\ayurvedic-hiv\data\error\10_ayurvedic-knapsack-bindingdb-pdbj.csv'
 
+# --- Arguments (default: paths di atas) ---
+parser = argparse.ArgumentParser()
+parser.add_argument('--file', default=INPUT_CSV, help='Input table (.csv or .parquet)')
+parser.add_argument('--output', default=OUTPUT_CSV, help='Output table (.csv or .parquet)')
+parser.add_argument('--errors', default=ERROR_CSV, help='Error CSV')
+parser.add_argument('--show-browser', action='store_true', help='Open visible Chrome windows instead of headless ones')
+add_metrics_arguments(parser)
+add_refresh_arguments(parser)
+args = parser.parse_args()
+MAX_AGE = refresh_from_args(args)   # --refresh: link yang lebih tua dari ini diambil ulang
+JOURNAL = journal_path(args.output)   # progress per link, dipakai untuk resume
+
+# --- Browser pool ---
+BROWSERS = 4               # jumlah Chrome yang berjalan paralel
+PAGES_PER_BROWSER = 200    # restart Chrome setelah sekian halaman
+
 # --- Load data & init kolom baru ---
-df = pd.read_csv(INPUT_CSV)
+df = read_table(args.file)
 df['queries'] = None   # akan kita isi list of values
 
 # --- Setup Chrome ---
 opts = Options()
-# opts.add_argument("--headless")    # bisa di‐uncomment nanti
+if not args.show_browser:
+    opts.add_argument("--headless=new")
+opts.page_load_strategy = 'eager'   # tidak menunggu semua resource, kita tunggu elemennya saja
 opts.add_argument("--no-sandbox")
 opts.add_argument("--disable-dev-shm-usage")
 opts.add_argument("--disable-gpu")
 
-driver = webdriver.Chrome(
-    service=Service(ChromeDriverManager().install()),
-    options=opts
-)
-wait = WebDriverWait(driver, 30)
+service_path = None
+
+def create_driver():
+    # ChromeDriver baru di-install saat browser pertama benar-benar dibutuhkan
+    global service_path
+    if service_path is None:
+        service_path = ChromeDriverManager().install()
+    return webdriver.Chrome(service=Service(service_path), options=opts)
+
+pool = DriverPool(create_driver, size=BROWSERS, max_pages=PAGES_PER_BROWSER)
 
-# --- Loop per baris ---
-for idx, link_str in tqdm(df['pdb_link'].items(),
-                          total=len(df),
-                          desc="Extracting all queries",
-                          unit="row"):
-    # split dan bersihkan
-    # urls = [u.strip() for u in link_str.split(',') if u.strip()]
-    values = []
-    error = []
-    
+def extract_queries(link_str):
+    # ID sudah ada di query string link -> tidak perlu buka browser
+    query = link_query(link_str)
+    if query is None:
+        # tunggu sampai React mengisi kotak pencarian (tanpa sleep tetap)
+        query = browser_query(pool, link_str)
+    return [query]
+
+def safe_extract(link_str):
     try:
-        driver.get(link_str)
-        time.sleep(5)   # beri waktu React mount
-        inp = wait.until(EC.visibility_of_element_located((
-            By.CSS_SELECTOR,
-            "input[type='text'][placeholder='Enter one or more search terms.']"
-        )))
-        values.append(inp.get_attribute('value'))
+        return extract_queries(link_str), None
     except Exception as e:
-        print(f"[{idx}] ERROR on {link_str}: {e}")
-        error.append(idx, e)
-        
+        return [], e
+
+# --- Loop per link (yang sudah ada di journal dilewati, kecuali yang sudah basi) ---
+error = []
+journal = RunJournal(JOURNAL)
+pending = journal.pending(df['pdb_link'].dropna(), MAX_AGE)
+if MAX_AGE is not None:
+    new, stale, fresh = journal.delta(df['pdb_link'].dropna(), MAX_AGE)
+    print(f"Refresh: {new} new and {stale} stale links, {fresh} up to date")
+failed = {}
+log = log_from_args(args)            # pesan per baris di-sampling (--log-every)
+exporter = exporter_from_args(args).start()
+
+with journal, pool, log, ThreadPoolExecutor(max_workers=BROWSERS) as executor:
+    results = executor.map(safe_extract, pending)
+    for link_str, (values, e) in tqdm(zip(pending, results),
+                                      total=len(pending),
+                                      desc="Extracting all queries",
+                                      unit="link"):
+        if e is not None:
+            log(f"ERROR on {link_str}: {e}", kind='error')
+            failed[link_str] = str(e)
+            continue
+        journal.record(link_str, values)
+
+# --- Isi hasil dari journal ---
+for idx, link_str in df['pdb_link'].items():
+    values = journal.get(link_str)
+    if values is None:
+        error.append((idx, failed.get(link_str, f"no result for {link_str}")))
+        values = []
     df.at[idx, 'queries'] = values
 
 # --- Simpan & cleanup ---
-driver.quit()
-df.to_csv(OUTPUT_CSV, index=True)
+write_table(df, args.output, index=True)
 error_df = pd.DataFrame(error, columns=['idx', 'error'])
-error_df.to_csv(ERROR_CSV, index=False)
-print(f"Done! Errors saved to {ERROR_CSV}")
-print(f"Done! Results with all queries saved to {OUTPUT_CSV}")
+error_df.to_csv(args.errors, index=False)
+print(f"Done! Errors saved to {args.errors}")
+print(f"Done! Results with all queries saved to {args.output}")
+exporter.stop()
@@ -0,0 +1,56 @@
+import argparse
+import os
+import sys
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'utils'))
+from table_io import read_table, to_list, write_table
+
+"""
+PDBj Protein Code Extraction
+
+Script version of section 5.1 of notebooks/data-processing/08_pdbj.ipynb, so the
+pipeline can run it before the PDBj title and FASTA scrapers (the rest of the
+notebook needs their output).
+
+It drops duplicate rows from the PDBj query table written by 07_scrap-pdbj.py,
+saves the cleaned table, and writes the sorted list of unique PDB IDs found in the
+`queries` column to a CSV with a single `protein_code` column.
+"""
+
+def extract_protein_codes(df):
+    # Each query value may itself hold several comma-separated IDs
+    protein_code = (
+        df['queries'].dropna()
+        .map(to_list)
+        .explode()
+        .dropna()
+        .str.split(',')
+        .explode()
+        .str.strip()
+    )
+    protein_code = protein_code[protein_code != '']
+    return pd.DataFrame(sorted(protein_code.unique()), columns=['protein_code'])
+
+def main():
+    parser = argparse.ArgumentParser(description='Extract unique PDB IDs from the PDBj query table.')
+    parser.add_argument('--file', required=True, help='Table written by 07_scrap-pdbj.py (.csv or .parquet)')
+    parser.add_argument('--cleaned', required=True, help='Where to save the de-duplicated query table')
+    parser.add_argument('--output', required=True, help='Where to save the unique protein codes')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.file):
+        print(f"Error: Input file {args.file} does not exist.")
+        return
+
+    df = read_table(args.file, index_col=0)
+    df.drop(columns=['Unnamed: 0'], inplace=True, errors='ignore')
+    df = df[~df.astype(str).duplicated()]   # list cells (Parquet) are not hashable
+    write_table(df, args.cleaned, index=True)
+
+    df_protein_unique = extract_protein_codes(df)
+    write_table(df_protein_unique, args.output, index=True)
+    print(f"Saved {len(df_protein_unique)} unique protein codes to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -1,62 +1,118 @@
-import time
+import argparse
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 from tqdm import tqdm
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from webdriver_manager.chrome import ChromeDriverManager
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'utils'))
+from driver_pool import DriverPool
+from fetcher import Fetcher, error_kind
+from http_cache import add_cache_arguments, cache_from_args
+from pdbj_resolver import SQL_URL, browser_title, fetch_titles
+from metrics import add_metrics_arguments, exporter_from_args, log_from_args
+from run_journal import RunJournal, add_refresh_arguments, journal_path, refresh_from_args
+from table_io import read_table, write_table
+
 # --- Paths ---
 INPUT_CSV  = r'E:\research\ayurvedic-hiv\data\processed\11_pdbj.csv'
 OUTPUT_CSV = r'E:\research\ayurvedic-hiv\data\processed\12_pdbj-titled.csv'
 ERROR_CSV  = r'E:\research\ayurvedic-hiv\data\error\12_pdbj-titled.csv'
 
+# --- Arguments (default: paths di atas) ---
+parser = argparse.ArgumentParser()
+parser.add_argument('--file', default=INPUT_CSV, help='Input table (.csv or .parquet)')
+parser.add_argument('--output', default=OUTPUT_CSV, help='Output table (.csv or .parquet)')
+parser.add_argument('--errors', default=ERROR_CSV, help='Error CSV')
+parser.add_argument('--api-url', default=SQL_URL, help='PDBj SQL endpoint, e.g. a local stub server')
+parser.add_argument('--no-api', action='store_true', help='Read every title from the structure page in a browser')
+parser.add_argument('--show-browser', action='store_true', help='Open visible Chrome windows instead of headless ones')
+add_metrics_arguments(parser)
+add_cache_arguments(parser)
+add_refresh_arguments(parser)
+args = parser.parse_args()
+MAX_AGE = refresh_from_args(args)   # --refresh: judul yang lebih tua dari ini diambil ulang
+JOURNAL = journal_path(args.output)   # progress per protein_code, dipakai untuk resume
+
+# --- Browser pool ---
+BROWSERS = 4               # jumlah Chrome yang berjalan paralel
+PAGES_PER_BROWSER = 200    # restart Chrome setelah sekian halaman
+
 # --- Load data & init kolom baru ---
-df = pd.read_csv(INPUT_CSV)
+df = read_table(args.file)
 df['title'] = None   # akan kita isi list of values
 
 # --- Setup Chrome ---
 opts = Options()
-# opts.add_argument("--headless")    # bisa di‐uncomment nanti
+if not args.show_browser:
+    opts.add_argument("--headless=new")
+opts.page_load_strategy = 'eager'   # tidak menunggu semua resource, kita tunggu elemennya saja
 opts.add_argument("--no-sandbox")
 opts.add_argument("--disable-dev-shm-usage")
 opts.add_argument("--disable-gpu")
 
-driver = webdriver.Chrome(
-    service=Service(ChromeDriverManager().install()),
-    options=opts
-)
-wait = WebDriverWait(driver, 30)
+service_path = None
 
-# --- Loop per baris ---
-error = []
+def create_driver():
+    # ChromeDriver baru di-install saat browser pertama benar-benar dibutuhkan
+    global service_path
+    if service_path is None:
+        service_path = ChromeDriverManager().install()
+    return webdriver.Chrome(service=Service(service_path), options=opts)
+
+pool = DriverPool(create_driver, size=BROWSERS, max_pages=PAGES_PER_BROWSER)
 
-for idx, row in tqdm(df.iterrows(), total=df.shape[0], desc="Extracting titles", unit="row"):
-    link = f'https://pdbj.org/mine/structural_details/{row["protein_code"]}'
-    
+def extract_title(code):
     try:
-        driver.get(link)
-        time.sleep(5)
-        title_element = wait.until(EC.visibility_of_element_located((
-            By.CSS_SELECTOR,
-            "#PDBExplorerPlane h2"
-        )))
-        title_value = title_element.text
-        df.at[idx, 'title'] = title_value
-        
+        return browser_title(pool, code), None
     except Exception as e:
-        print(f"[{idx}] ERROR on {link}: {e}")
-        error.append((idx, str(e)))
-    
-    # print(df.head(5))  # Debug: print first 5 rows to check progress
+        return None, e
+
+# --- Loop per protein_code (yang sudah ada di journal dilewati, kecuali yang sudah basi) ---
+error = []
+journal = RunJournal(JOURNAL)
+pending = journal.pending(df['protein_code'].dropna(), MAX_AGE)
+if MAX_AGE is not None:
+    new, stale, fresh = journal.delta(df['protein_code'].dropna(), MAX_AGE)
+    print(f"Refresh: {new} new and {stale} stale protein codes, {fresh} up to date")
+log = log_from_args(args)            # pesan per baris di-sampling (--log-every)
+exporter = exporter_from_args(args).start()
+
+with journal, log:
+    # 1) Judul diambil per batch lewat PDBj SQL REST (di-cache di HttpCache)
+    if not args.no_api and pending:
+        with Fetcher(workers=BROWSERS, cache=cache_from_args(args), retries=3) as fetcher:
+            titles, api_errors = fetch_titles(fetcher, pending, api_url=args.api_url)
+            print(f"Requests: {fetcher.summary()}")
+        for code, title_value in titles.items():
+            journal.record(code, title_value)
+        print(f"{len(titles)} of {len(pending)} titles resolved through {args.api_url}")
+        for code, message in api_errors.items():
+            log(f"[{code}] API ERROR, falling back to the browser: {message}", kind='api error')
+
+    # 2) Sisanya lewat halaman structural_details di browser headless
+    remaining = journal.pending(pending, MAX_AGE)
+    with pool, ThreadPoolExecutor(max_workers=BROWSERS) as executor:
+        results = executor.map(extract_title, remaining)
+        for code, (title_value, e) in tqdm(zip(remaining, results), total=len(remaining),
+                                           desc="Extracting titles", unit="row"):
+            if e is not None:
+                log(f"[{code}] ERROR: {e}", kind='error')
+                error.append((code, error_kind(e), str(e)))
+                continue
+            journal.record(code, title_value)
+
+# --- Isi hasil dari journal ---
+df['title'] = df['protein_code'].map(lambda code: journal.get(code))
 
 # --- Simpan & cleanup ---
-driver.quit()
-df.to_csv(OUTPUT_CSV, index=True)
-error_df = pd.DataFrame(error, columns=['idx', 'error'])
-error_df.to_csv(ERROR_CSV, index=False)
-print(f"Done! Errors saved to {ERROR_CSV}")
-print(f"Done! Results with all queries saved to {OUTPUT_CSV}")
+write_table(df, args.output, index=True)
+error_df = pd.DataFrame(error, columns=['protein_code', 'kind', 'error'])
+error_df.to_csv(args.errors, index=False)
+print(f"Done! Errors saved to {args.errors}")
+print(f"Done! Results with all queries saved to {args.output}")
+exporter.stop()
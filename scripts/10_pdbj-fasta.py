@@ -1,46 +1,119 @@
-import requests
+import argparse
 import os
+import sys
 from tqdm import tqdm
 
 import pandas as pd
+import requests
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'utils'))
+from fasta import PackedFastaWriter, read_fasta
+from fetcher import Fetcher, error_kind
+from http_cache import CacheMiss, add_cache_arguments, cache_from_args
+from metrics import add_metrics_arguments, exporter_from_args, log_from_args
+from run_journal import RunJournal, add_refresh_arguments, refresh_from_args
+from table_io import read_table
+
+"""
+PDBj FASTA Downloader
+
+Downloads the FASTA file of every `protein_code` in the titled PDBj table from the
+PDBj REST API. Downloads run in parallel over a pooled keep-alive session, throttled
+and failed requests are retried with exponential backoff, and responses are served
+from the shared HTTP cache. Codes that were already downloaded (recorded in the run
+journal, which is also the manifest of downloaded codes with their fetch times) are
+skipped; --refresh DAYS downloads the ones older than DAYS again.
+
+By default each entry is written to its own `{protein_code}.tsv` file. With --packed
+all chains are appended to one FASTA file with a samtools-style `.fai` offset index
+instead, which avoids thousands of small files. A refreshed entry only adds chains
+the packed file does not hold yet.
+"""
+
+SAVE_FOLDER = r'E:\research\ayurvedic-hiv\data\fasta'
+INPUT_CSV = r'E:\research\ayurvedic-hiv\data\processed\12_pdbj-titled.csv'
+FASTA_URL = 'https://pdbj.org/rest/newweb/fetch/file?cat=pdb&type=fasta&id={}'
 
-save_folder = r'E:\research\ayurvedic-hiv\data\fasta'
-os.makedirs(save_folder, exist_ok=True)
+def main():
+    parser = argparse.ArgumentParser(description='Download PDBj FASTA files for every protein_code.')
+    parser.add_argument('--file', default=INPUT_CSV, help='Table (.csv or .parquet) with a protein_code column')
+    parser.add_argument('--output', default=SAVE_FOLDER, help='Directory to save the FASTA files')
+    parser.add_argument('--packed', default=None,
+                        help='Write all sequences to this single indexed FASTA file instead of one file per code')
+    parser.add_argument('--workers', type=int, default=8, help='Number of parallel downloads')
+    parser.add_argument('--retries', type=int, default=3, help='Retries per file for throttled or failed requests')
+    parser.add_argument('--fasta-url', default=FASTA_URL,
+                        help='FASTA download URL with {} for the PDB ID, e.g. on a local stub server')
+    add_cache_arguments(parser)
+    add_metrics_arguments(parser)
+    add_refresh_arguments(parser)
+    args = parser.parse_args()
+    max_age = refresh_from_args(args)
 
-file_path = r'E:\research\ayurvedic-hiv\data\processed\12_pdbj-titled.csv'
+    os.makedirs(args.output, exist_ok=True)
 
-counter = 0
+    df = read_table(args.file, columns=['protein_code'])
 
-ERROR = []
+    # Completed downloads are journaled, so a restarted run skips them
+    journal = RunJournal(os.path.join(args.output, 'download.journal.jsonl'))
+    packed = PackedFastaWriter(args.packed) if args.packed else None
 
-df = pd.read_csv(file_path)
+    def is_done(code):
+        entry = journal.get(code)
+        if entry is None or journal.is_stale(code, max_age):
+            return False
+        if packed is not None:
+            return entry['path'] == args.packed and all(name in packed for name in entry['records'])
+        return os.path.exists(entry['path'])
 
-for idx, row in tqdm(df.iterrows(), total=df.shape[0], desc="Downloading FASTA files", unit="row"):
-    hiv_protein = row['protein_code']
-    fasta_url = f'https://pdbj.org/rest/newweb/fetch/file?cat=pdb&type=fasta&id={hiv_protein}'
-    
-    file_path = os.path.join(save_folder, f"{hiv_protein}.tsv")
-    
-    try:
-        response = requests.get(fasta_url, stream=True)
-        # response.raise_for_status()  # Raise an error for bad responses
-        
-        if response.status_code == 200:
-            with open(file_path, 'wb') as file:
-                for chunk in response.iter_content(chunk_size=1024):
-                    file.write(chunk)
-            print(f"Downloaded {hiv_protein} to {file_path}")
+    codes = [code for code in dict.fromkeys(df['protein_code']) if not is_done(code)]
+    if max_age is not None:
+        new, stale, fresh = journal.delta(df['protein_code'], max_age)
+        print(f"Refresh: {new} new and {stale} stale protein codes to download, {fresh} up to date")
+
+    def download(code):
+        try:
+            return fetcher.get_content(args.fasta_url.format(code)), None
+        except (requests.RequestException, CacheMiss) as e:   # CacheMiss: not cached under --cache-only
+            return None, e
+
+    counter = 0
+    ERROR = []
+    log = log_from_args(args)
+    exporter = exporter_from_args(args).start()
+
+    with journal, log, Fetcher(workers=args.workers, cache=cache_from_args(args), retries=args.retries) as fetcher:
+        results = fetcher.map(download, codes)
+        for hiv_protein, (content, e) in tqdm(zip(codes, results), total=len(codes),
+                                              desc="Downloading FASTA files", unit="file"):
+            if e is not None:
+                log(f"Error downloading {hiv_protein}: [{error_kind(e)}] {e}", kind='error')
+                ERROR.append((hiv_protein, error_kind(e), str(e)))
+                continue
+
+            if packed is not None:
+                records = [packed.add(header, seq) for header, seq in read_fasta(content.splitlines())]
+                packed.flush()
+                file_path = args.packed
+            else:
+                file_path = os.path.join(args.output, f"{hiv_protein}.tsv")
+                with open(file_path, 'wb') as file:
+                    file.write(content)
+                records = []
+            journal.record(hiv_protein, {'path': file_path, 'records': records})
             counter += 1
-        else:
-            print(f"Failed to download {hiv_protein} at index {idx}: HTTP {response.status_code}")
-
-    except requests.RequestException as e:
-        print(f"Error downloading {hiv_protein}: {e}")
-        ERROR.append((idx, str(e)))
-        
-# Save errors to a CSV file
-error_df = pd.DataFrame(ERROR, columns=['idx', 'error'])
-error_file_path = os.path.join(save_folder, 'download_errors.csv')
-error_df.to_csv(error_file_path, index=False)
-print(f"Total files downloaded: {counter}")
-print(f"Errors saved to {error_file_path}")
+        print(f"Requests: {fetcher.summary()}")
+
+    if packed is not None:
+        packed.close()
+
+    # Save errors to a CSV file
+    error_df = pd.DataFrame(ERROR, columns=['protein_code', 'kind', 'error'])
+    error_file_path = os.path.join(args.output, 'download_errors.csv')
+    error_df.to_csv(error_file_path, index=False)
+    print(f"Total files downloaded: {counter}")
+    print(f"Errors saved to {error_file_path}")
+    exporter.stop()
+
+if __name__ == "__main__":
+    main()
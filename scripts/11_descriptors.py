@@ -0,0 +1,84 @@
+import argparse
+import os
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'utils'))
+from descriptors import CHUNK_SIZE, TOOLS_DIR, compute_matrix, find_configs, read_config
+from table_io import read_table, write_table
+
+"""
+Molecular Fingerprints from the PaDEL Configs
+
+Computes, for every distinct compound SMILES, each fingerprint enabled by the
+PaDEL descriptor-type configs in tools/ (one descriptor per XML file). Every
+fingerprint is stored as a uint8 matrix `<output>/<name>.u8` with one row per
+compound and a `<name>.json` sidecar, and can be opened with
+descriptors.load_matrix as a read-only memory map. Row i belongs to the compound
+in row i of `<output>/compounds.csv`.
+
+MACCS and EState keys are computed with RDKit when it is installed; the other
+fingerprints need PaDEL-Descriptor through padelpy (and a Java runtime). Work is
+split into chunks that run on a process pool. A fingerprint is skipped when its
+matrix already matches the current compound list. The script exits with an error
+if a backend fails or if no fingerprint can be computed at all.
+"""
+
+def main():
+    parser = argparse.ArgumentParser(description='Compute PaDEL fingerprints for every compound SMILES.')
+    parser.add_argument('--file', required=True, help='Table (.csv or .parquet) with a SMILES column')
+    parser.add_argument('--output', required=True, help='Directory for the fingerprint matrices')
+    parser.add_argument('--config', nargs='+', default=None,
+                        help=f'PaDEL descriptor-type XML files (default: every config in {TOOLS_DIR})')
+    parser.add_argument('--backend', choices=['auto', 'rdkit', 'padel'], default='auto',
+                        help='auto uses RDKit for MACCS/EState keys when available and PaDEL otherwise')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: one per CPU)')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Compounds per task')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.file):
+        print(f"Error: Input file {args.file} does not exist.")
+        return
+    os.makedirs(args.output, exist_ok=True)
+
+    if args.config:
+        configs = {name: path for path in args.config for name in read_config(path)}
+    else:
+        configs = find_configs()
+
+    df = read_table(args.file, columns=['SMILES'])
+    smiles = list(dict.fromkeys(df['SMILES'].dropna()))
+    if not smiles:
+        print("No SMILES to featurize.")
+        return
+    compounds = pd.DataFrame({'SMILES': smiles})
+    write_table(compounds, os.path.join(args.output, 'compounds.csv'), index=True)
+    print(f"Featurizing {len(smiles)} distinct compounds with {len(configs)} fingerprints")
+
+    computed, failed = [], []
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        for name, config in configs.items():
+            try:
+                path = compute_matrix(smiles, name, config, args.output, backend=args.backend,
+                                      chunk_size=args.chunk_size, executor=executor)
+            except (ImportError, ValueError) as e:
+                print(f"Skipping {name}: {e}")
+                continue
+            except (RuntimeError, subprocess.CalledProcessError) as e:
+                print(f"Error computing {name}: {e}")
+                failed.append(name)
+                continue
+            computed.append(name)
+            print(f"{name} saved to {path}")
+
+    # A non-zero exit keeps pipeline.py from recording the stage as done
+    if failed:
+        sys.exit(f"Error: the fingerprint backend failed for {', '.join(failed)}.")
+    if not computed:
+        sys.exit("Error: no fingerprint could be computed; install rdkit, or padelpy and a Java runtime.")
+
+if __name__ == "__main__":
+    main()
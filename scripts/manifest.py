@@ -0,0 +1,92 @@
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'utils'))
+from run_journal import RunJournal
+from table_io import read_table, write_table
+
+"""
+Stage Manifests
+
+Every scraping stage journals the keys it has resolved (utils/run_journal.py),
+and the journal records when each key was fetched. This script reads those
+journals as manifests: how many keys of each kind a stage holds, how old they
+are, and - for an input table - which keys a `--refresh` run would fetch.
+
+    02_scrap-knapsack   ayurvedic-formula-knapsack.journal.jsonl   scientific names (search:) and C_IDs (cid:)
+    04_scrap-bindingdb  ayurvedic-bindingdb-results.journal.jsonl  SMILES
+    07_scrap-pdbj       <output>.journal.jsonl                     PDB links
+    09_pdbj-title       <output>.journal.jsonl                     protein codes
+    10_pdbj-fasta       <output dir>/download.journal.jsonl        protein codes
+
+    python manifest.py data/processed/06_ayurvedic-knapsack-bindingdb.journal.jsonl --max-age 30
+    python manifest.py data/original/03_ayurvedic-knapsack.journal.jsonl --file 02_formula-cleaned-split.csv --column "Scientific Name" --prefix search:
+    python manifest.py 12_pdbj-titled.journal.jsonl --output 12_pdbj-titled.manifest.csv
+"""
+
+# Key prefixes used by 02_scrap-knapsack.py; other journals key by the value itself
+KINDS = {'search': 'scientific name', 'cid': 'C_ID'}
+
+def split_key(key):
+    """(kind, key without its prefix)"""
+    prefix, _, rest = key.partition(':')
+    if rest and prefix in KINDS:
+        return KINDS[prefix], rest
+    return 'key', key
+
+def manifest(journal):
+    """One row per resolved key: kind, key and fetch time (NaT where the journal predates fetch times)"""
+    rows = [(*split_key(key), journal.fetched_at(key)) for key, _ in journal.items()]
+    df = pd.DataFrame(rows, columns=['kind', 'key', 'fetched_at'])
+    df['fetched_at'] = pd.to_datetime(df['fetched_at'], unit='s', utc=True)
+    return df
+
+def iso(timestamp):
+    return 'unknown' if pd.isna(timestamp) else timestamp.strftime('%Y-%m-%d %H:%M')
+
+def main():
+    parser = argparse.ArgumentParser(description='Summarize the resolved-key manifest (run journal) of a stage.')
+    parser.add_argument('journal', help='Run journal of a stage (.journal.jsonl)')
+    parser.add_argument('--max-age', type=float, default=None, metavar='DAYS',
+                        help='Count keys fetched more than DAYS ago as stale, as --refresh DAYS would')
+    parser.add_argument('--file', default=None, help='Input table of the stage, to compute the refresh delta')
+    parser.add_argument('--column', default=None, help='Key column of --file (e.g. "Scientific Name", SMILES)')
+    parser.add_argument('--prefix', default='', help='Journal key prefix of the column values (search: for 02)')
+    parser.add_argument('--output', default=None, help='Write the manifest (kind, key, fetched_at) to this table')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.journal):
+        sys.exit(f"Error: journal {args.journal} does not exist.")
+    if args.file and not args.column:
+        parser.error('--file needs --column')
+
+    journal = RunJournal(args.journal)
+    df = manifest(journal)
+    cutoff = pd.Timestamp(time.time() - args.max_age * 86400, unit='s', tz='UTC') if args.max_age else None
+
+    print(f"{args.journal}: {len(df)} resolved keys")
+    for kind, keys in df.groupby('kind'):
+        line = (f"  {kind}: {len(keys)}, fetched {iso(keys['fetched_at'].min())} .. {iso(keys['fetched_at'].max())}"
+                f" UTC, {keys['fetched_at'].isna().sum()} without a fetch time")
+        if cutoff is not None:
+            stale = (keys['fetched_at'].isna() | (keys['fetched_at'] < cutoff)).sum()
+            line += f", {stale} older than {args.max_age:g} days"
+        print(line)
+
+    if args.file:
+        values = read_table(args.file, columns=[args.column])[args.column].dropna()
+        max_age = args.max_age * 86400 if args.max_age else None
+        new, stale, fresh = journal.delta((f"{args.prefix}{value}" for value in values), max_age)
+        print(f"{args.file}: {new} new and {stale} stale keys to fetch, {fresh} up to date")
+
+    if args.output:
+        df['fetched_at'] = df['fetched_at'].map(lambda t: None if pd.isna(t) else t.strftime('%Y-%m-%dT%H:%M:%SZ'))
+        write_table(df, args.output)
+        print(f"Manifest saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import argparse
+import os
+import re
+import sys
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'utils'))
+from shard import ROW_COLUMN
+from table_io import BINDINGDB_LIST_COLUMNS, read_table, write_table
+
+"""
+Shard Merge
+
+Combines the outputs written by 02_scrap-knapsack.py or 04_scrap-bindingdb.py
+under --shard or --queue into the table a single run would have written: the
+rows are put back in input order (by the _row column the shards carry), which
+is then dropped. Inputs and output may be CSV or Parquet.
+
+    python merge_shards.py --output ayurvedic-formula-knapsack.csv out/ayurvedic-formula-knapsack.shard-*.csv
+    python merge_shards.py --index --output ayurvedic-bindingdb-results.csv out/ayurvedic-bindingdb-results.shard-*.csv
+
+With --shard outputs, every shard i of N must be present.
+"""
+
+SHARD_LABEL = re.compile(r'\.shard-(\d+)-of-(\d+)\.[^.]+$')
+
+def check_complete(paths):
+    """Exit if the files are --shard outputs and some shard of the run is missing"""
+    labels = [SHARD_LABEL.search(path) for path in paths]
+    found = {(int(m.group(1)), int(m.group(2))) for m in labels if m}
+    if not found:
+        return
+    counts = {count for _, count in found}
+    if len(counts) > 1:
+        sys.exit(f"Shards of different runs: {sorted(counts)} shards")
+    count = counts.pop()
+    missing = sorted(set(range(count)) - {index for index, _ in found})
+    if missing:
+        sys.exit(f"Missing shards {missing} of {count}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Merge the shard outputs of a sharded scraping run.')
+    parser.add_argument('shards', nargs='+', help='Shard output tables (.csv or .parquet)')
+    parser.add_argument('--output', required=True, help='Merged table to write (.csv or .parquet)')
+    parser.add_argument('--index', action='store_true',
+                        help='The shards start with an index column, as the outputs of 04_scrap-bindingdb.py do')
+    args = parser.parse_args()
+
+    check_complete(args.shards)
+    tables = [read_table(path, index_col=0 if args.index else None) for path in args.shards]
+    for path, table in zip(args.shards, tables):
+        if ROW_COLUMN not in table.columns:
+            sys.exit(f"{path} has no {ROW_COLUMN} column; was it written with --shard or --queue?")
+
+    merged = pd.concat(tables)
+    merged = merged.sort_values(ROW_COLUMN, kind='stable').drop(columns=ROW_COLUMN)
+    if os.path.dirname(args.output):
+        os.makedirs(os.path.dirname(args.output), exist_ok=True)
+    write_table(merged, args.output, index=args.index, list_columns=BINDINGDB_LIST_COLUMNS)
+    print(f"Merged {len(merged)} rows from {len(tables)} shards into {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+import argparse
+import os
+import sys
+
+"""
+Ayurvedic-HIV Pipeline Runner
+
+Single entry point for the numbered scripts and notebooks. Each step is declared
+below as a stage with its inputs, outputs and code; the stages form a DAG through
+the files they exchange:
+
+    01_ayurvedic -> 02_scrap-knapsack -> 03 -> 04_scrap-bindingdb -> 05 -> 06_hiv-1
+    -> 07_scrap-pdbj -> 08_pdbj-codes -> 09_pdbj-title -> 10_pdbj-fasta -> 08_pdbj
+    -> 09_cluster
+
+`run` only reruns stages whose code or input files changed (by content hash) or
+whose outputs are missing, and runs independent stages concurrently. Editing, for
+example, the HIV target keywords in 06_hiv-1 reruns 06 and then only those
+downstream stages whose inputs actually changed; the scrapers themselves resume
+from their journals and HTTP cache. Notebooks are executed by run_notebook.py
+(nbconvert) into <data-root>/.pipeline/executed, leaving the committed notebooks
+untouched; their DATA_ROOT and UTILS_DIR parameters are set to --data-root and
+scripts/utils, so every stage reads and writes under the same data root.
+
+Examples:
+    python pipeline.py status
+    python pipeline.py run --jobs 2
+    python pipeline.py run 06_hiv-1 --force 06_hiv-1
+    python pipeline.py run --refresh 30
+
+`--refresh DAYS` reruns the scraping stages even when their inputs are unchanged,
+passing `--refresh DAYS` on: each one fetches only the keys missing from its
+journal (the stage's manifest of resolved keys) or fetched more than DAYS ago,
+and merges them into its existing output.
+"""
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(SCRIPTS_DIR)
+NOTEBOOKS_DIR = os.path.join(REPO_DIR, 'notebooks', 'data-processing')
+UTILS_DIR = os.path.join(SCRIPTS_DIR, 'utils')
+TOOLS_DIR = os.path.join(REPO_DIR, 'tools')
+# The data directory next to scripts/ (E:\research\ayurvedic-hiv\data on the original machine)
+DATA_ROOT = os.path.join(REPO_DIR, 'data')
+
+sys.path.append(UTILS_DIR)
+from dag import Pipeline, Stage
+
+def script(name):
+    return os.path.join(SCRIPTS_DIR, name)
+
+def notebook(name):
+    return os.path.join(NOTEBOOKS_DIR, name)
+
+def utils(*names):
+    return [os.path.join(UTILS_DIR, f"{name}.py") for name in names]
+
+def build_stages(data_root, executed_dir, refresh=None):
+    """Declare every stage with every file it writes; all paths are under data_root"""
+    def data(*parts):
+        return os.path.join(data_root, *parts)
+
+    def run_script(name, *args):
+        return [sys.executable, script(name), *args]
+
+    def run_scraper(name, *args):
+        refresh_args = ['--refresh', str(refresh)] if refresh is not None else []
+        return run_script(name, *args, *refresh_args)
+
+    def run_notebook(name):
+        return run_script('run_notebook.py', notebook(name), '--output-dir', executed_dir,
+                          '--param', f"DATA_ROOT={data_root}", '--param', f"UTILS_DIR={UTILS_DIR}")
+
+    formula_split = data('processed', '02_formula-cleaned-split.csv')
+    knapsack = data('original', '03_ayurvedic-knapsack.csv')
+    knapsack_grouped = data('processed', '05_ayurvedic-knapsack-clean-grouped.csv')
+    bindingdb = data('processed', '06_ayurvedic-knapsack-bindingdb.csv')
+    exploded = data('cleaned', '08_ayurvedic-knapsack-bindingdb-exploded-cleaned.csv')
+    hiv_targets = data('processed', '09_ayurvedic-knapsack-bindingdb-hiv-targets.csv')
+    pdbj = data('processed', '10_ayurvedic-knapsack-bindingdb-pdbj.csv')
+    pdbj_codes = data('processed', '11_pdbj.csv')
+    pdbj_cleaned = data('processed', '16_ayurvedic-knapsack-bindingdb-pdbj-cleaned.csv')
+    pdbj_titled = data('processed', '12_pdbj-titled.csv')
+    fasta_dir = data('fasta')
+    fasta_filtered = data('processed', '17_pdbj-fasta-filtered.csv')
+
+    return [
+        Stage('01_ayurvedic', run_notebook('01_ayurvedic.ipynb'),
+              inputs=[data('original', 'AyurvedicFormula.xls')],
+              outputs=[data('processed', '01_formula-coded.csv'), data('cleaned', '01_formula-cleaned.csv'),
+                       formula_split],
+              code=[notebook('01_ayurvedic.ipynb')]),
+        Stage('02_scrap-knapsack',
+              run_scraper('02_scrap-knapsack.py', '--file', formula_split,
+                         '--output', os.path.dirname(knapsack), '--output-name', os.path.basename(knapsack)),
+              inputs=[formula_split],
+              outputs=[knapsack, data('original', 'ayurvedic-knapsack-errors.csv')],
+              code=[script('02_scrap-knapsack.py')] + utils('fetcher', 'html_parsers', 'http_cache', 'knapsack_scraper',
+                                                        'metrics', 'run_journal', 'shard', 'table_io')),
+        Stage('03_ayurvedic-knapsack', run_notebook('03_ayurvedic-knapsack.ipynb'),
+              inputs=[knapsack],
+              outputs=[data('cleaned', '04_ayurvedic-knapsack-clean.csv'), knapsack_grouped],
+              code=[notebook('03_ayurvedic-knapsack.ipynb')] + utils('row_explode', 'table_io', 'table_stream')),
+        Stage('11_descriptors',
+              run_script('11_descriptors.py', '--file', knapsack_grouped, '--output', data('descriptors')),
+              inputs=[knapsack_grouped],
+              outputs=[data('descriptors')],
+              code=[script('11_descriptors.py'), TOOLS_DIR] + utils('descriptors', 'table_io')),
+        Stage('04_scrap-bindingdb',
+              run_scraper('04_scrap-bindingdb.py', '--file', knapsack_grouped,
+                         '--output', os.path.dirname(bindingdb), '--output-name', os.path.basename(bindingdb)),
+              inputs=[knapsack_grouped],
+              outputs=[bindingdb, data('processed', 'ayurvedic-bindingdb-errors.csv')],
+              code=[script('04_scrap-bindingdb.py')] + utils('bdb_scraper', 'driver_pool', 'fetcher', 'html_parsers',
+                                                         'http_cache', 'metrics', 'run_journal', 'shard',
+                                                         'similarity', 'table_io')),
+        Stage('05_ayurvedic-kanpsack-bdb', run_notebook('05_ayurvedic-kanpsack-bdb.ipynb'),
+              inputs=[bindingdb],
+              outputs=[data('cleaned', '07_ayurvedic-knapsack-bindingdb-cleaned.csv'), exploded],
+              code=[notebook('05_ayurvedic-kanpsack-bdb.ipynb')] + utils('row_explode')),
+        Stage('06_hiv-1', run_notebook('06_hiv-1.ipynb'),
+              inputs=[exploded],
+              outputs=[data('processed', '09_ayurvedic-knapsack-bindingdb-hiv.csv'), hiv_targets],
+              code=[notebook('06_hiv-1.ipynb')] + utils('row_explode', 'table_io', 'table_stream')),
+        Stage('07_scrap-pdbj',
+              run_scraper('07_scrap-pdbj.py', '--file', hiv_targets, '--output', pdbj,
+                         '--errors', data('error', '10_ayurvedic-knapsack-bindingdb-pdbj.csv')),
+              inputs=[hiv_targets],
+              outputs=[pdbj, data('error', '10_ayurvedic-knapsack-bindingdb-pdbj.csv')],
+              code=[script('07_scrap-pdbj.py')] + utils('driver_pool', 'metrics', 'pdbj_resolver', 'run_journal',
+                                                      'table_io')),
+        Stage('08_pdbj-codes',
+              run_script('08_pdbj-codes.py', '--file', pdbj, '--cleaned', pdbj_cleaned, '--output', pdbj_codes),
+              inputs=[pdbj],
+              outputs=[pdbj_cleaned, pdbj_codes],
+              code=[script('08_pdbj-codes.py')] + utils('table_io')),
+        Stage('09_pdbj-title',
+              run_scraper('09_pdbj-title.py', '--file', pdbj_codes, '--output', pdbj_titled,
+                         '--errors', data('error', '12_pdbj-titled.csv')),
+              inputs=[pdbj_codes],
+              outputs=[pdbj_titled, data('error', '12_pdbj-titled.csv')],
+              code=[script('09_pdbj-title.py')] + utils('driver_pool', 'fetcher', 'http_cache', 'metrics',
+                                                      'pdbj_resolver', 'run_journal', 'table_io')),
+        Stage('10_pdbj-fasta',
+              run_scraper('10_pdbj-fasta.py', '--file', pdbj_titled, '--output', fasta_dir),
+              inputs=[pdbj_titled],
+              outputs=[fasta_dir],
+              code=[script('10_pdbj-fasta.py')] + utils('fasta', 'fetcher', 'http_cache', 'metrics', 'run_journal',
+                                                      'table_io')),
+        Stage('08_pdbj', run_notebook('08_pdbj.ipynb'),
+              inputs=[pdbj, pdbj_titled, fasta_dir],
+              outputs=[data('processed', '12_pdbj-sequences.sqlite'), fasta_filtered,
+                       data('processed', '13_pdbj-similarity.csv'), data('processed', '14_pdbj-similarity-50.csv'),
+                       data('processed', '15_pdbj-similarity-50-cluster-sample-fix.tsv')],
+              code=[notebook('08_pdbj.ipynb')] + utils('fasta')),
+        Stage('09_cluster', run_notebook('09_cluster.ipynb'),
+              inputs=[fasta_filtered, pdbj, data('clustering', 'cluster.xlsx')],
+              outputs=[data('clustering', 'cluster-info.csv'), data('clustering', 'clustered-sequences-sample.csv'),
+                       data('clustering', 'clustered-cek.csv'), data('clustering', 'clustered-sequences.csv')],
+              code=[notebook('09_cluster.ipynb')] + utils('cluster')),
+    ]
+
+# Stages that fetch from remote services and keep a journal of resolved keys
+SCRAPERS = ('02_scrap-knapsack', '04_scrap-bindingdb', '07_scrap-pdbj', '09_pdbj-title', '10_pdbj-fasta')
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the ayurvedic-hiv pipeline incrementally.')
+    parser.add_argument('command', choices=['run', 'status'], help='Run stale stages or only report them')
+    parser.add_argument('stages', nargs='*', help='Target stages (default: all); upstream stages are included')
+    parser.add_argument('--data-root', default=DATA_ROOT, help='Root directory of the data files')
+    parser.add_argument('--jobs', type=int, default=1, help='Maximum number of stages running at once')
+    parser.add_argument('--force', nargs='+', default=[], metavar='STAGE', help='Rerun these stages even if up to date')
+    parser.add_argument('--refresh', type=float, default=None, metavar='DAYS',
+                        help='Rerun the scraping stages to fetch new keys and keys resolved more than DAYS ago')
+    args = parser.parse_args()
+
+    state_dir = os.path.join(args.data_root, '.pipeline')
+    os.makedirs(state_dir, exist_ok=True)
+    pipeline = Pipeline(
+        build_stages(args.data_root, os.path.join(state_dir, 'executed'), refresh=args.refresh),
+        os.path.join(state_dir, 'state.json'),
+    )
+
+    force = set(args.force) | (set(SCRAPERS) if args.refresh is not None else set())
+    status = pipeline.run(args.stages, jobs=args.jobs, force=force, dry_run=args.command == 'status')
+    if 'failed' in status.values():
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import argparse
+import os
+import sys
+
+import nbformat
+from nbconvert.preprocessors import ExecutePreprocessor
+
+"""
+Parameterized Notebook Runner
+
+Executes a notebook the way `jupyter nbconvert --to notebook --execute` does, but
+first overrides its parameters: the values given with --param are assigned in a
+new cell placed right after the cell tagged `parameters` (the papermill
+convention), so the notebook reads and writes under the given data root instead
+of the paths it was written with. The executed copy goes to --output-dir and the
+committed notebook is left untouched.
+
+    python run_notebook.py ../notebooks/data-processing/06_hiv-1.ipynb --output-dir executed \
+        --param DATA_ROOT=/srv/ayurvedic-hiv/data --param UTILS_DIR=/srv/ayurvedic-hiv/scripts/utils
+"""
+
+PARAMETERS_TAG = 'parameters'
+INJECTED_TAG = 'injected-parameters'
+
+def parse_param(text):
+    name, sep, value = text.partition('=')
+    if not sep or not name.isidentifier():
+        raise argparse.ArgumentTypeError(f"Parameter must look like NAME=VALUE, got {text!r}")
+    return name, value
+
+def inject_parameters(nb, parameters):
+    """Insert a cell assigning `parameters` (name -> str) after the notebook's parameters cell"""
+    tagged = [i for i, cell in enumerate(nb.cells) if PARAMETERS_TAG in cell.get('metadata', {}).get('tags', [])]
+    if not tagged:
+        raise ValueError(f"The notebook has no cell tagged {PARAMETERS_TAG!r}")
+    source = '# Injected parameters\n' + '\n'.join(f"{name} = {value!r}" for name, value in parameters.items())
+    cell = nbformat.v4.new_code_cell(source, metadata={'tags': [INJECTED_TAG]})
+    nb.cells.insert(tagged[0] + 1, cell)
+    return nb
+
+def main():
+    parser = argparse.ArgumentParser(description='Execute a notebook with its parameters overridden.')
+    parser.add_argument('notebook', help='Notebook to execute (.ipynb)')
+    parser.add_argument('--output-dir', required=True, help='Directory for the executed copy')
+    parser.add_argument('--param', type=parse_param, action='append', default=[], metavar='NAME=VALUE',
+                        help='Parameter to override (repeatable); the value is passed as a string')
+    parser.add_argument('--timeout', type=int, default=None, help='Seconds a cell may run (default: no limit)')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.notebook):
+        sys.exit(f"Error: notebook {args.notebook} does not exist.")
+
+    nb = nbformat.read(args.notebook, as_version=4)
+    if args.param:
+        inject_parameters(nb, dict(args.param))
+    # Cells run in the notebook's own directory, as with nbconvert
+    ExecutePreprocessor(timeout=args.timeout).preprocess(
+        nb, {'metadata': {'path': os.path.dirname(os.path.abspath(args.notebook))}}
+    )
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    output = os.path.join(args.output_dir, os.path.basename(args.notebook))
+    nbformat.write(nb, output)
+    print(f"Executed {args.notebook} -> {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'utils'))
+from similarity import SimilarityIndex, fingerprint_kind
+from table_io import read_table
+
+"""
+Local Compound Similarity Index
+
+Builds a Tanimoto index over every SMILES the pipeline has already collected
+(the `SMILES` column of the KNApSAcK tables and the `ligand_smiles` hits of the
+BindingDB results) and answers "which known compounds are at least X similar to
+this one" without asking BindingDB.
+
+    python similarity_index.py build --file 06_ayurvedic-knapsack-bindingdb.csv --index ligands.npz
+    python similarity_index.py query --index ligands.npz --threshold 0.8 "CC(=O)Oc1ccccc1C(=O)O"
+
+Fingerprints are RDKit Morgan fingerprints when RDKit is installed and hashed
+SMILES n-grams otherwise; an index only loads in an environment that computes
+the same kind.
+"""
+
+SMILES_COLUMNS = ['SMILES', 'ligand_smiles']
+# Placeholders written by the BindingDB scraper instead of a SMILES
+NOT_SMILES = {'No Similarity Matches', 'ERROR', 'NaN', ''}
+
+def collect_smiles(df):
+    """Every distinct SMILES in the SMILES columns of df, in first-seen order"""
+    found = {}
+    for column in SMILES_COLUMNS:
+        if column not in df.columns:
+            continue
+        for value in df[column].dropna():
+            for smiles in value if isinstance(value, list) else [value]:
+                smiles = str(smiles).strip()
+                if smiles not in NOT_SMILES:
+                    found[smiles] = None
+    return list(found)
+
+def main():
+    parser = argparse.ArgumentParser(description='Build or query a local compound similarity index.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build', help='Index the SMILES of one or more pipeline tables')
+    build.add_argument('--file', required=True, nargs='+', help='Tables (.csv or .parquet) with SMILES columns')
+    build.add_argument('--index', required=True, help='Index file to write (.npz)')
+    build.add_argument('--update', action='store_true', help='Add to an existing index instead of replacing it')
+
+    query = commands.add_parser('query', help='Find indexed compounds similar to the given SMILES')
+    query.add_argument('smiles', nargs='+', help='Query SMILES')
+    query.add_argument('--index', required=True, help='Index file written by build')
+    query.add_argument('--threshold', type=float, default=0.8, help='Minimum Tanimoto similarity')
+    query.add_argument('--limit', type=int, default=10, help='Maximum hits per query')
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        index = SimilarityIndex.load(args.index) if args.update and os.path.exists(args.index) else SimilarityIndex()
+        for path in args.file:
+            df = read_table(path, list_columns=['ligand_smiles'])
+            added = index.update(collect_smiles(df))
+            print(f"Added {added} compounds from {path}")
+        index.save(args.index)
+        print(f"Saved {len(index)} {fingerprint_kind()} fingerprints to {args.index}")
+    else:
+        index = SimilarityIndex.load(args.index)
+        for smiles in args.smiles:
+            start = time.perf_counter()
+            hits = index.search(smiles, threshold=args.threshold, limit=args.limit)
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"{smiles}: {len(hits)} hits in {elapsed:.1f} ms")
+            for hit, score in hits:
+                print(f"  {score:.3f}  {hit}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'utils'))
+from table_io import CHUNK_SIZE
+from table_stream import PARTITIONS, stream_explode, stream_group_compounds, stream_hiv
+
+"""
+Streaming Table Transforms
+
+The table steps of notebooks 03, 05 and 06_hiv-1 for tables too large to load
+at once. Inputs are read in chunks of --chunksize rows and outputs are written
+chunk by chunk, so memory stays bounded by the chunk size (and, for `group`, by
+the number of distinct compounds):
+
+    python stream_tables.py group --file 03_ayurvedic-knapsack.csv --cleaned 04_ayurvedic-knapsack-clean.csv \
+        --output 05_ayurvedic-knapsack-clean-grouped.csv
+    python stream_tables.py explode --file 06_ayurvedic-knapsack-bindingdb.csv \
+        --cleaned 07_ayurvedic-knapsack-bindingdb-cleaned.csv --output 08_ayurvedic-knapsack-bindingdb-exploded-cleaned.csv
+    python stream_tables.py hiv --file 08_ayurvedic-knapsack-bindingdb-exploded-cleaned.csv \
+        --output 09_ayurvedic-knapsack-bindingdb-hiv.csv --targets 09_ayurvedic-knapsack-bindingdb-hiv-targets.csv
+
+Inputs and outputs may be CSV or Parquet (by extension).
+"""
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the notebook table steps on tables of any size.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    group = commands.add_parser('group', help='Notebook 03: drop incomplete compounds, number rows, group per C_ID')
+    group.add_argument('--cleaned', default=None, help='Also write the numbered rows here')
+    group.add_argument('--partitions', type=int, default=PARTITIONS,
+                       help='Temporary hash partitions of the input (more = less memory per partition)')
+    group.add_argument('--tmp-dir', default=None, help='Directory for the temporary partitions')
+
+    explode = commands.add_parser('explode', help='Notebook 05: keep compounds with hits, one row per hit')
+    explode.add_argument('--cleaned', default=None, help='Also write the kept compounds (before exploding) here')
+
+    hiv = commands.add_parser('hiv', help='Notebook 06_hiv-1: HIV-1 hits without duplicates')
+    hiv.add_argument('--targets', default=None, help='Also write the protease/transcriptase/integrase/glycoprotein hits here')
+
+    for command in (group, explode, hiv):
+        command.add_argument('--file', required=True, help='Input table (.csv or .parquet)')
+        command.add_argument('--output', required=True, help='Output table (.csv or .parquet)')
+        command.add_argument('--chunksize', type=int, default=CHUNK_SIZE, help='Rows read at a time')
+    args = parser.parse_args()
+
+    for path in (args.output, getattr(args, 'cleaned', None), getattr(args, 'targets', None)):
+        if path and os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    start = time.perf_counter()
+    if args.command == 'group':
+        rows = stream_group_compounds(args.file, args.output, cleaned=args.cleaned, chunksize=args.chunksize,
+                                      partitions=args.partitions, tmp_dir=args.tmp_dir)
+        what = 'compounds'
+    elif args.command == 'explode':
+        rows = stream_explode(args.file, args.output, cleaned=args.cleaned, chunksize=args.chunksize)
+        what = 'hits'
+    else:
+        rows = stream_hiv(args.file, args.output, targets=args.targets, chunksize=args.chunksize)
+        what = 'HIV-1 hits'
+    print(f"Wrote {rows} {what} to {args.output} in {time.perf_counter() - start:.1f} s")
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,4 @@
 import os
-import time
 
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
@@ -9,45 +8,24 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from bs4 import BeautifulSoup
 from urllib.parse import quote
+import requests
 
-def test_function():
-    return "Hello World!"
+import html_parsers
+from fetcher import RETRY_STATUSES, ServerError, raise_for_status
+from http_cache import CacheMiss
+from metrics import REGISTRY
 
-def test_selenium():
-    print("Testing Selenium...")
-    ## Setup chrome options
-    chrome_options = Options()
-    chrome_options.add_argument("--headless") # Ensure GUI is off
-    chrome_options.add_argument("--no-sandbox")
+BASE_URL = "https://www.bindingdb.org/rwd/bind/searchby_smiles.jsp"
+PAGE_SIZE = 50
+MAX_PAGES = 100  # safety cap on result pages per compound
+NO_MATCHES = "No Similarity Matches"
+SERVER_ERROR = "Error: java.lang.NullPointerException"
 
-    # Set path to chrome/chromedriver as per your configuration
-    print("Executing part 1")
-    homedir = os.path.expanduser("~")
-    chrome_options.binary_location = f"{homedir}/chrome-linux64/chrome"
-    webdriver_service = Service(f"{homedir}/chromedriver-linux64/chromedriver")
-
-    print("Executing part 2")
-    # Choose Chrome Browser
-    browser = webdriver.Chrome(service=webdriver_service, options=chrome_options)
+class BindingDBServerError(ServerError):
+    """BindingDB answered the search with its Java error page"""
+    kind = 'bindingdb_error'
 
-    print("Executing part 3")
-    # Get page
-    browser.get("https://cloudbytes.dev")
-
-    print("Executing part 4")
-    # Extract description from page and print
-    description = browser.find_element(By.NAME, "description").get_attribute("content")
-    print(f"{description}")
-
-    #Wait for 10 seconds
-    time.sleep(3)
-    browser.quit()
-
-def scrape_bindingdb(smiles):
-    encoded_smiles = quote(smiles)
-    base_url = "https://www.bindingdb.org/rwd/bind/searchby_smiles.jsp"
-    query_url = f"{base_url}?submit=Search&startPg=0&Increment=50&SearchType=3&smilesStr={encoded_smiles}&Similarity=0.8"
-    
+def create_chrome_driver():
     options = Options()
     options.add_argument('--headless')
     options.add_argument('--disable-gpu')
@@ -58,47 +36,133 @@ def scrape_bindingdb(smiles):
     options.binary_location = f"{homedir}/chrome-linux64/chrome"
     webdriver_service = Service(f"{homedir}/chromedriver-linux64/chromedriver")
     
-    driver = webdriver.Chrome(service=webdriver_service, options=options)
-    driver.get(query_url)
+    return webdriver.Chrome(service=webdriver_service, options=options)
+
+def render_page(url, pool=None):
+    """Load url in a browser and return the page source, borrowing a driver from pool if given"""
+    if pool is not None:
+        with pool.driver() as driver:
+            return _load_page(driver, url)
+    driver = create_chrome_driver()
+    try:
+        return _load_page(driver, url)
+    finally:
+        driver.quit()
+
+def _load_page(driver, url):
+    driver.get(url)
     WebDriverWait(driver, 30).until(
         EC.presence_of_element_located((By.TAG_NAME, "body"))
     )
-    soup = BeautifulSoup(driver.page_source, 'html.parser')
-    
-    # Check if the page contains "No Similarity Matches"
-    if "No Similarity Matches" in soup.body.get_text():
-        driver.quit()
-        return "No Similarity Matches", "No Similarity Matches", "No Similarity Matches", "No Similarity Matches", "No Similarity Matches"
-    elif "Error: java.lang.NullPointerException" in soup.body.get_text():
-        driver.quit()
-        return "ERROR", "ERROR", "ERROR", "ERROR", "ERROR"
-    
-    target_names = []
-    specieses = []
-    bdb_ids = []
-    ligand_smiles = []
-    pdb_links = []
-    
-    # Extract the data from the page
+    return driver.page_source
+
+def build_query_url(smiles, page=0, increment=PAGE_SIZE, base_url=BASE_URL):
+    encoded_smiles = quote(smiles)
+    return f"{base_url}?submit=Search&startPg={page}&Increment={increment}&SearchType=3&smilesStr={encoded_smiles}&Similarity=0.8"
+
+def is_result_page(page_source):
+    """True if the HTML is a complete, server-rendered results page"""
+    return "index_table" in page_source or NO_MATCHES in page_source or SERVER_ERROR in page_source
+
+def fetch_page_source(url, cache=None, fetcher=None, pool=None):
+    """Return the results page HTML for url
+
+    Tries the HTTP cache first, then a plain HTTP request through fetcher and
+    finally a Selenium browser (borrowed from pool if given) when the plain
+    request fails or does not return a complete results page. A host that is
+    still throttling after the fetcher's retries raises ThrottledError instead
+    of being hammered through the browser.
+    """
+    page_source = cache.get(url) if cache is not None else None
+    if page_source is not None:
+        return page_source.decode('utf-8')
+    if cache is not None and cache.offline:
+        raise CacheMiss(url)
+
+    page_source = None
+    if fetcher is not None:
+        try:
+            response = fetcher.get(url)
+        except requests.RequestException:
+            response = None
+        if response is not None:
+            if response.status_code in RETRY_STATUSES:
+                raise_for_status(response)
+            if response.status_code == 200 and is_result_page(response.text):
+                page_source = response.text
+    if page_source is None:
+        page_source = render_page(url, pool=pool)
+
+    if cache is not None and SERVER_ERROR not in page_source:
+        cache.put(url, page_source)
+    return page_source
+
+def parse_rows(soup):
+    """Extract (target, species, bdb_id, ligand_smiles, pdb_link) tuples from a results page"""
+    hits = []
     rows = soup.select(".index_table > div")
     for row in rows:
         target = row.select_one("span.header + a.big").text.strip() if row.select_one("span.header + a.big") else "NaN"
-        target_names.append(target)
         
         species = row.select_one("span.header + a.big + span + span").text.strip() if row.select_one("span.header + a.big + span + span") else "NaN"
-        specieses.append(species)
         
         bdb_id = row.select_one("span.header + a + a.big").text.strip() if row.select_one("span.header + a + a.big") else "NaN"
-        bdb_ids.append(bdb_id)
         
         smiles_button = row.select_one("span.header + a + a.big + button")
-        # print('SMILES_BUTTON', smiles_button)
         smiles_str = smiles_button["onclick"].split("'")[1] if smiles_button and "onclick" in smiles_button.attrs else "NaN"
-        ligand_smiles.append(smiles_str)
         
         pdb_link = row.select_one("span.header + a[href^='https://www.rcsb.org']")
         pdb_link = pdb_link["href"] if pdb_link else "NaN"
-        pdb_links.append(pdb_link)
+        
+        hits.append((target, species, bdb_id, smiles_str, pdb_link))
+    return hits
+
+def parse_results_page(page_source, backend=None):
+    """(status, rows) of a results page; status is NO_MATCHES, SERVER_ERROR or None"""
+    if html_parsers.resolve_backend(backend) == 'lxml':
+        text, rows = html_parsers.bindingdb_page(page_source)
+    else:
+        soup = BeautifulSoup(page_source, 'html.parser')
+        text = soup.body.get_text() if soup.body else ""
+        rows = parse_rows(soup)
+    status = next((marker for marker in (NO_MATCHES, SERVER_ERROR) if marker in text), None)
+    return status, rows
+
+def scrape_bindingdb(smiles, cache=None, pool=None, fetcher=None, max_pages=MAX_PAGES,
+                     backend=None, parse_pool=None, base_url=BASE_URL):
+    """Search BindingDB for ligands similar to smiles and join every hit across all result pages
+
+    Pages are fetched over plain HTTP when a fetcher is given, falling back to
+    Selenium otherwise, and parsed with the given parser backend (in
+    parse_pool, a process pool, if one is given). Returns five comma-joined
+    strings (targets, species, BindingDB IDs, ligand SMILES, PDB links).
+    Raises BindingDBServerError when BindingDB fails the search, so the
+    compound is retried on the next run.
+    """
+    hits = []
+    previous_rows = None
+    for page in range(max_pages):
+        url = build_query_url(smiles, page, base_url=base_url)
+        page_source = fetch_page_source(url, cache=cache, fetcher=fetcher, pool=pool)
+        with REGISTRY.timer('parse_duration_seconds', parser='parse_results_page'):
+            if parse_pool is None:
+                status, rows = parse_results_page(page_source, backend)
+            else:
+                status, rows = parse_pool.submit(parse_results_page, page_source, backend).result()
+        
+        # Check if the page contains "No Similarity Matches"
+        if page == 0 and status == NO_MATCHES:
+            return NO_MATCHES, NO_MATCHES, NO_MATCHES, NO_MATCHES, NO_MATCHES
+        elif page == 0 and status == SERVER_ERROR:
+            raise BindingDBServerError(f"BindingDB error page for {smiles}", url=url)
+        
+        # Stop on a short page, or if the server ignored startPg and repeated a page
+        if rows == previous_rows:
+            break
+        hits.extend(rows)
+        if len(rows) < PAGE_SIZE:
+            break
+        previous_rows = rows
     
-    driver.quit()
-    return ", ".join(target_names), ", ".join(specieses), ", ".join(bdb_ids), ", ".join(ligand_smiles), ", ".join(pdb_links)
\ No newline at end of file
+    columns = list(zip(*hits)) if hits else [()] * 5
+    return tuple(", ".join(column) for column in columns)
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+
+def strip_list_chars(series):
+    """Turn stringified Python lists such as "['1ajx_A', '1ajx_B']" into "1ajx_A, 1ajx_B" """
+    return (
+        series.astype('string')
+        .str.replace("'", "", regex=False)
+        .str.replace("[", "", regex=False)
+        .str.replace("]", "", regex=False)
+    )
+
+
+def split_list_column(series, sep=','):
+    """Parse a stringified list column into Python lists of stripped, non-empty items"""
+    return strip_list_chars(series).map(
+        lambda value: [item.strip() for item in value.split(sep) if item.strip()]
+        if isinstance(value, str) else []
+    )
+
+
+def load_cluster_membership(raw, cluster_column=1, members_column=2):
+    """Normalize a cluster export into one (seq_code, cluster) row per member
+
+    `raw` is the export as read with `pd.read_excel(..., header=None)`: one row
+    per cluster, with the cluster number in `cluster_column` and its members as
+    a stringified list in `members_column`.
+    """
+    members = split_list_column(raw[members_column])
+    membership = pd.DataFrame({
+        'seq_code': members.explode(),
+        'cluster': raw[cluster_column],
+    }).dropna(subset=['seq_code'])
+    return membership.reset_index(drop=True)
+
+
+def annotate_membership(membership, df_fasta):
+    """Add the seq_title of each member from the FASTA table (hash join on seq_code)"""
+    titles = df_fasta.drop_duplicates('seq_code', keep='last').set_index('seq_code')['seq_title']
+    return membership.assign(seq_title=membership['seq_code'].map(titles))
+
+
+def group_clusters(membership):
+    """One row per cluster with its member seq_codes as a list and the first seq_title"""
+    return membership.groupby('cluster').agg({
+        'seq_code': list,
+        'seq_title': 'first',
+    })
+
+
+def assign_compound_clusters(df_all, membership, queries_column='queries', cluster_column='cluster'):
+    """Map clusters back to compounds through the PDB IDs in `queries_column`
+
+    A compound belongs to a cluster when any of its queried PDB IDs matches
+    the PDB ID (first four characters, upper-cased) of a cluster member. The
+    clusters are stored as a ', '-joined string in ascending order, or missing
+    when there is no match. Runs in time linear in the number of queries and members.
+    """
+    pdb_clusters = pd.DataFrame({
+        'pdb': membership['seq_code'].str[:4].str.upper(),
+        'cluster': membership['cluster'],
+    }).drop_duplicates()
+
+    queries = split_list_column(df_all[queries_column])
+    exploded = (
+        pd.DataFrame({'row': np.arange(len(queries)), 'pdb': queries.to_numpy()})
+        .explode('pdb')
+        .dropna(subset=['pdb'])
+    )
+
+    hits = (
+        exploded.merge(pdb_clusters, on='pdb')
+        .drop_duplicates(['row', 'cluster'])
+        .sort_values(['row', 'cluster'])
+    )
+    joined = hits['cluster'].astype(str).groupby(hits['row']).agg(', '.join)
+
+    result = df_all.copy()
+    result[cluster_column] = joined.reindex(np.arange(len(df_all))).to_numpy()
+    return result
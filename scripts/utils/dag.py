@@ -0,0 +1,211 @@
+import hashlib
+import json
+import os
+import subprocess
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+
+class Stage:
+    """One pipeline step with declared inputs, outputs and code files
+
+    `command` is the argv to run (a list of strings). `code` lists the files
+    whose contents define the step (the script or notebook and the utils
+    modules it imports); changing any of them makes the stage stale.
+    """
+
+    def __init__(self, name, command, inputs=(), outputs=(), code=()):
+        self.name = name
+        self.command = list(command)
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.code = list(code)
+
+    def __repr__(self):
+        return f"Stage({self.name!r})"
+
+
+def hash_file(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    if path.endswith('.ipynb'):
+        # Only the code cells define a notebook; outputs change on every run
+        with open(path, 'r', encoding='utf-8') as f:
+            cells = json.load(f).get('cells', [])
+        for cell in cells:
+            if cell.get('cell_type') == 'code':
+                digest.update(''.join(cell.get('source', [])).encode('utf-8'))
+        return digest.hexdigest()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_path(path):
+    """Content hash of a file or a whole directory tree; None if it does not exist"""
+    if os.path.isfile(path):
+        return hash_file(path)
+    if not os.path.isdir(path):
+        return None
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            full = os.path.join(root, name)
+            digest.update(os.path.relpath(full, path).encode('utf-8'))
+            digest.update(hash_file(full).encode('ascii'))
+    return digest.hexdigest()
+
+
+class Pipeline:
+    """Runs a DAG of stages, skipping stages whose inputs and code are unchanged
+
+    Dependencies are derived from the declared paths: a stage depends on every
+    stage that produces one of its inputs. The hashes of each stage's code and
+    inputs are recorded in a JSON state file after it succeeds; a stage reruns
+    only when one of them changed or one of its outputs is missing.
+    Independent stages run concurrently on up to `jobs` workers.
+    """
+
+    def __init__(self, stages, state_path):
+        self.stages = {stage.name: stage for stage in stages}
+        self.state_path = state_path
+        self._lock = threading.Lock()
+
+        producers = {}
+        for stage in stages:
+            for output in stage.outputs:
+                if output in producers:
+                    raise ValueError(f"{output} is an output of both {producers[output]!r} and {stage.name!r}")
+                producers[output] = stage.name
+        self.upstream = {
+            stage.name: sorted({producers[path] for path in stage.inputs if path in producers} - {stage.name})
+            for stage in stages
+        }
+        self.order = self._topological_order()
+
+        self.state = {}
+        if os.path.exists(state_path):
+            with open(state_path, 'r', encoding='utf-8') as f:
+                self.state = json.load(f)
+
+    def _topological_order(self):
+        order, visiting, done = [], set(), set()
+
+        def visit(name):
+            if name in done:
+                return
+            if name in visiting:
+                raise ValueError(f"Pipeline has a cycle through stage {name!r}")
+            visiting.add(name)
+            for dep in self.upstream[name]:
+                visit(dep)
+            visiting.discard(name)
+            done.add(name)
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    def select(self, targets=None):
+        """Names of the target stages and everything upstream of them, in run order"""
+        if not targets:
+            return list(self.order)
+        unknown = set(targets) - set(self.stages)
+        if unknown:
+            raise ValueError(f"Unknown stages: {sorted(unknown)}")
+        needed = set()
+        stack = list(targets)
+        while stack:
+            name = stack.pop()
+            if name not in needed:
+                needed.add(name)
+                stack.extend(self.upstream[name])
+        return [name for name in self.order if name in needed]
+
+    def fingerprint(self, stage):
+        return {
+            'code': {path: hash_path(path) for path in stage.code},
+            'inputs': {path: hash_path(path) for path in stage.inputs},
+        }
+
+    def stale_reason(self, stage):
+        """Why the stage has to run, or None if it is up to date"""
+        missing = [path for path in stage.outputs if not os.path.exists(path)]
+        if missing:
+            return f"missing output {missing[0]}"
+        recorded = self.state.get(stage.name)
+        if recorded is None:
+            return "never run"
+        current = self.fingerprint(stage)
+        for kind in ('code', 'inputs'):
+            for path, digest in current[kind].items():
+                if recorded.get(kind, {}).get(path) != digest:
+                    return f"{kind} changed: {path}"
+        return None
+
+    def _save_state(self):
+        tmp = self.state_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.state_path)
+
+    def _execute(self, stage):
+        for output in stage.outputs:
+            parent = os.path.dirname(output)
+            if parent:
+                os.makedirs(parent, exist_ok=True)
+        print(f"[{stage.name}] running: {' '.join(stage.command)}")
+        start = time.monotonic()
+        subprocess.run(stage.command, check=True)
+        with self._lock:
+            self.state[stage.name] = dict(self.fingerprint(stage), finished_at=time.time())
+            self._save_state()
+        print(f"[{stage.name}] done in {time.monotonic() - start:.1f}s")
+
+    def run(self, targets=None, jobs=1, force=(), dry_run=False):
+        """Run the selected stages; returns {stage: 'ran' | 'skipped' | 'failed' | 'blocked'}"""
+        selected = self.select(targets)
+        status = {}
+        pending = list(selected)
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            while pending or running:
+                for name in list(pending):
+                    deps = [dep for dep in self.upstream[name] if dep in selected]
+                    if any(status.get(dep) in ('failed', 'blocked') for dep in deps):
+                        status[name] = 'blocked'
+                        pending.remove(name)
+                        print(f"[{name}] blocked by a failed upstream stage")
+                        continue
+                    if not all(dep in status for dep in deps):
+                        continue
+                    pending.remove(name)
+                    reason = "forced" if name in force else self.stale_reason(self.stages[name])
+                    if dry_run and any(status.get(dep) == 'ran' for dep in deps):
+                        reason = reason or "upstream would rerun"
+                    if reason is None:
+                        status[name] = 'skipped'
+                        print(f"[{name}] up to date")
+                    elif dry_run:
+                        status[name] = 'ran'
+                        print(f"[{name}] would run ({reason})")
+                    else:
+                        print(f"[{name}] stale: {reason}")
+                        running[executor.submit(self._execute, self.stages[name])] = name
+
+                if not running:
+                    continue
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    try:
+                        future.result()
+                        status[name] = 'ran'
+                    except Exception as e:
+                        status[name] = 'failed'
+                        print(f"[{name}] FAILED: {e}")
+        return status
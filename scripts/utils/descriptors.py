@@ -0,0 +1,180 @@
+import glob
+import hashlib
+import importlib.util
+import json
+import os
+import tempfile
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+try:
+    from rdkit import Chem, DataStructs, RDLogger
+    from rdkit.Chem import MACCSkeys
+    from rdkit.Chem.EState import Fingerprinter as EStateFingerprinter
+    RDLogger.DisableLog('rdApp.*')
+except ImportError:  # RDKit is optional; the PaDEL backend covers every fingerprint
+    Chem = None
+
+TOOLS_DIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'tools'))
+CHUNK_SIZE = 1000
+
+# Length of every PaDEL fingerprint the tools/*.xml configs can enable
+PADEL_BITS = {
+    'AtomPairs2DFingerprintCount': 780,
+    'AtomPairs2DFingerprinter': 780,
+    'EStateFingerprinter': 79,
+    'ExtendedFingerprinter': 1024,
+    'Fingerprinter': 1024,
+    'GraphOnlyFingerprinter': 1024,
+    'KlekotaRothFingerprintCount': 4860,
+    'KlekotaRothFingerprinter': 4860,
+    'MACCSFingerprinter': 166,
+    'PubchemFingerprinter': 881,
+    'SubstructureFingerprintCount': 307,
+    'SubstructureFingerprinter': 307,
+}
+
+def read_config(path):
+    """Names of the descriptors a PaDEL descriptor-types XML file enables"""
+    root = ET.parse(path).getroot()
+    return [d.get('name') for d in root.iter('Descriptor') if d.get('value', '').lower() == 'true']
+
+def find_configs(tools_dir=TOOLS_DIR):
+    """{descriptor name: config path} for the one-descriptor configs in tools_dir"""
+    configs = {}
+    for path in sorted(glob.glob(os.path.join(tools_dir, '*.xml'))):
+        for name in read_config(path):
+            configs.setdefault(name, path)
+    return configs
+
+def _maccs(mol):
+    bits = np.zeros(167, dtype=np.uint8)
+    DataStructs.ConvertToNumpyArray(MACCSkeys.GenMACCSKeys(mol), bits)
+    return bits[1:]   # RDKit keeps an unused bit 0; PaDEL numbers keys 1-166
+
+def _estate(mol):
+    counts, _ = EStateFingerprinter.FingerprintMol(mol)
+    return (counts > 0).astype(np.uint8)
+
+# PaDEL fingerprints that RDKit computes with the same key definitions
+RDKIT_FINGERPRINTS = {
+    'MACCSFingerprinter': _maccs,
+    'EStateFingerprinter': _estate,
+}
+
+def choose_backend(name, backend='auto'):
+    """'rdkit' or 'padel' for one fingerprint; raises if that backend cannot compute it"""
+    if backend == 'auto':
+        backend = 'rdkit' if Chem is not None and name in RDKIT_FINGERPRINTS else 'padel'
+    if backend == 'rdkit' and (Chem is None or name not in RDKIT_FINGERPRINTS):
+        raise ValueError(f"{name} has no RDKit implementation (or RDKit is not installed)")
+    if backend == 'padel' and importlib.util.find_spec('padelpy') is None:
+        raise ImportError(f"{name} needs PaDEL-Descriptor through padelpy (pip install padelpy)")
+    return backend
+
+def _rdkit_chunk(name, smiles):
+    out = np.zeros((len(smiles), PADEL_BITS[name]), dtype=np.uint8)
+    invalid = []
+    for i, s in enumerate(smiles):
+        mol = Chem.MolFromSmiles(s) if isinstance(s, str) else None
+        if mol is None:
+            invalid.append(i)
+            continue
+        out[i] = RDKIT_FINGERPRINTS[name](mol)
+    return out, invalid
+
+def _padel_chunk(name, config, smiles):
+    from padelpy import padeldescriptor
+
+    out = np.zeros((len(smiles), PADEL_BITS[name]), dtype=np.uint8)
+    with tempfile.TemporaryDirectory() as tmp:
+        smi = os.path.join(tmp, 'chunk.smi')
+        csv = os.path.join(tmp, 'chunk.csv')
+        with open(smi, 'w') as f:
+            for i, s in enumerate(smiles):
+                f.write(f"{s if isinstance(s, str) else ''}\tm{i}\n")
+        # A failed run (no Java, a PaDEL crash) raises: its rows are unknown, not unparsable
+        padeldescriptor(mol_dir=smi, d_file=csv, descriptortypes=config, fingerprints=True,
+                        retainorder=True, threads=1)
+        values = pd.read_csv(csv).set_index('Name').reindex([f"m{i}" for i in range(len(smiles))])
+    invalid = list(np.flatnonzero(values.isna().all(axis=1).to_numpy()))
+    out[:] = np.clip(values.fillna(0).to_numpy(), 0, 255).astype(np.uint8)
+    return out, [int(i) for i in invalid]
+
+def compute_chunk(task):
+    """Fingerprint one chunk of SMILES; runs in a worker process"""
+    name, backend, config, start, smiles = task
+    if backend == 'rdkit':
+        values, invalid = _rdkit_chunk(name, smiles)
+    else:
+        values, invalid = _padel_chunk(name, config, smiles)
+    return start, values, invalid
+
+def smiles_digest(smiles):
+    digest = hashlib.sha1()
+    for s in smiles:
+        digest.update(str(s).encode('utf-8') + b'\n')
+    return digest.hexdigest()
+
+def matrix_paths(out_dir, name):
+    return os.path.join(out_dir, f"{name}.u8"), os.path.join(out_dir, f"{name}.json")
+
+def load_matrix(out_dir, name):
+    """Read-only memory map of a stored fingerprint matrix, plus its metadata"""
+    data_path, meta_path = matrix_paths(out_dir, name)
+    with open(meta_path) as f:
+        meta = json.load(f)
+    return np.memmap(data_path, dtype=np.uint8, mode='r', shape=tuple(meta['shape'])), meta
+
+def is_current(out_dir, name, digest, backend):
+    _, meta_path = matrix_paths(out_dir, name)
+    if not os.path.exists(meta_path):
+        return False
+    with open(meta_path) as f:
+        meta = json.load(f)
+    return meta.get('smiles_sha1') == digest and meta.get('backend') == backend
+
+def compute_matrix(smiles, name, config, out_dir, backend='auto', workers=None,
+                   chunk_size=CHUNK_SIZE, executor=None):
+    """Compute one fingerprint for every SMILES into an on-disk uint8 matrix
+
+    Row i of `<out_dir>/<name>.u8` holds the fingerprint of smiles[i] (counts
+    are clipped to 255); `<name>.json` records the shape, the backend, the
+    rows that could not be parsed (left all zero) and a digest of the SMILES
+    list. Chunks are computed on a process pool and written straight into the
+    memory-mapped file. A matrix whose digest and backend still match is not
+    recomputed. Returns the path of the .u8 file. If the backend fails on a
+    chunk the error is raised and no metadata is written, so the matrix is
+    computed again on the next run.
+    """
+    backend = choose_backend(name, backend)
+    digest = smiles_digest(smiles)
+    data_path, meta_path = matrix_paths(out_dir, name)
+    if is_current(out_dir, name, digest, backend):
+        return data_path
+
+    if os.path.exists(meta_path):
+        os.remove(meta_path)   # the matrix is only valid once its metadata is written
+    shape = (len(smiles), PADEL_BITS[name])
+    matrix = np.memmap(data_path, dtype=np.uint8, mode='w+', shape=shape)
+    tasks = [(name, backend, config, start, list(smiles[start:start + chunk_size]))
+             for start in range(0, len(smiles), chunk_size)]
+    invalid = []
+    pool = executor or ProcessPoolExecutor(max_workers=workers)
+    try:
+        for start, values, chunk_invalid in pool.map(compute_chunk, tasks):
+            matrix[start:start + len(values)] = values
+            invalid.extend(start + i for i in chunk_invalid)
+    finally:
+        if executor is None:
+            pool.shutdown()
+    matrix.flush()
+    del matrix
+
+    with open(meta_path, 'w') as f:
+        json.dump({'name': name, 'shape': shape, 'backend': backend, 'config': os.path.basename(config),
+                   'smiles_sha1': digest, 'invalid': sorted(invalid)}, f)
+    return data_path
@@ -0,0 +1,96 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+from metrics import REGISTRY
+
+
+class DriverPool:
+    """Pool of long-lived Selenium drivers shared across page loads
+
+    Drivers are created lazily by `factory` (a callable returning a new
+    webdriver) up to `size` instances. A driver is quit and replaced after it
+    has served `max_pages` pages or raised a WebDriverException (other than a
+    wait timeout), so a crashed or leaking browser never serves the next query.
+    At most `size` drivers are lent out at once; callers usually borrow them
+    from a thread pool of the same size.
+    """
+
+    def __init__(self, factory, size=2, max_pages=200):
+        self.factory = factory
+        self.size = size
+        self.max_pages = max_pages
+        self._idle = queue.Queue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._pages = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @contextmanager
+    def driver(self):
+        """Borrow a driver for the duration of a with-block"""
+        REGISTRY.add('browser_waiting', 1)
+        self._slots.acquire()
+        REGISTRY.add('browser_waiting', -1)
+        try:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                with REGISTRY.timer('browser_start_duration_seconds'):
+                    driver = self.factory()
+            start = time.perf_counter()
+            try:
+                yield driver
+            except TimeoutException:
+                # A slow page is not a broken browser
+                self._release(driver)
+                raise
+            except WebDriverException:
+                REGISTRY.inc('browser_restarts_total', reason='crash')
+                self._discard(driver)
+                raise
+            except BaseException:
+                self._release(driver)
+                raise
+            else:
+                self._release(driver)
+            finally:
+                REGISTRY.observe('browser_page_duration_seconds', time.perf_counter() - start)
+        finally:
+            self._slots.release()
+
+    def _release(self, driver):
+        with self._lock:
+            pages = self._pages.get(id(driver), 0) + 1
+            self._pages[id(driver)] = pages
+        if pages >= self.max_pages or self._closed:
+            if not self._closed:
+                REGISTRY.inc('browser_restarts_total', reason='max_pages')
+            self._discard(driver)
+        else:
+            self._idle.put(driver)
+
+    def _discard(self, driver):
+        with self._lock:
+            self._pages.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
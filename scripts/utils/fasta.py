@@ -0,0 +1,277 @@
+import os
+import sqlite3
+
+
+def read_fasta(lines):
+    """Yield (header, sequence) for each record in an iterable of FASTA lines
+
+    The header is returned without the leading '>'; sequence lines are
+    concatenated with surrounding whitespace removed.
+    """
+    header = None
+    chunks = []
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        line = line.strip()
+        if line.startswith('>'):
+            if header is not None:
+                yield header, ''.join(chunks)
+            header = line[1:]
+            chunks = []
+        elif header is not None:
+            chunks.append(line)
+    if header is not None:
+        yield header, ''.join(chunks)
+
+
+def record_name(header):
+    """Index name of a FASTA header: first word without a trailing ':' (e.g. '1ajx_A')"""
+    return header.split(None, 1)[0].rstrip(':') if header.strip() else header
+
+
+class PackedFastaWriter:
+    """Append FASTA records to a single file and keep a samtools-style .fai index
+
+    The index has one tab-separated line per record: name, sequence length,
+    byte offset of the first base, bases per line and bytes per line. Opening
+    an existing file continues appending to it, skipping names that are
+    already indexed.
+    """
+
+    def __init__(self, path, line_width=60):
+        self.path = path
+        self.index_path = path + '.fai'
+        self.line_width = line_width
+        self.names = set()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                self.names = {line.split('\t', 1)[0] for line in f if line.strip()}
+        self._fasta = open(path, 'ab')
+        self._index = open(self.index_path, 'a', encoding='utf-8')
+
+    def __contains__(self, name):
+        return name in self.names
+
+    def add(self, header, sequence):
+        """Append one record; returns its index name"""
+        name = record_name(header)
+        if name in self.names:
+            return name
+        header_bytes = f'>{header}\n'.encode('utf-8')
+        offset = self._fasta.tell() + len(header_bytes)
+        lines = [sequence[i:i + self.line_width] for i in range(0, len(sequence), self.line_width)]
+        self._fasta.write(header_bytes + ''.join(line + '\n' for line in lines).encode('ascii'))
+        self._index.write(f'{name}\t{len(sequence)}\t{offset}\t{self.line_width}\t{self.line_width + 1}\n')
+        self.names.add(name)
+        return name
+
+    def flush(self):
+        self._fasta.flush()
+        self._index.flush()
+
+    def close(self):
+        self._fasta.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_fasta_file(path):
+    """Stream (header, sequence) records from a FASTA file without loading it whole"""
+    with open(path, 'r', encoding='utf-8') as f:
+        yield from read_fasta(f)
+
+
+def split_pdbj_header(header):
+    """Split a PDBj header such as '1ajx_A: HIV-1 PROTEASE' into ('1ajx_A', 'HIV-1 PROTEASE')"""
+    seq_code, _, seq_title = header.partition(':')
+    return seq_code.strip(), seq_title.strip()
+
+
+SEQUENCE_COLUMNS = ['query', 'title', 'seq_code', 'seq_title', 'seq']
+
+
+class SequenceStore:
+    """On-disk table of PDBj chains (query, title, seq_code, seq_title, seq)
+
+    Backed by a single SQLite file with an index on seq_code, so single
+    chains can be looked up without loading the table, and filters or column
+    subsets can be read into pandas without holding every sequence in memory.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sequences ("
+            " query TEXT, title TEXT, seq_code TEXT PRIMARY KEY, seq_title TEXT, seq TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sequences_query ON sequences (query)")
+        self._conn.commit()
+
+    def __len__(self):
+        return self._conn.execute("SELECT COUNT(*) FROM sequences").fetchone()[0]
+
+    def __contains__(self, seq_code):
+        return self.get(seq_code) is not None
+
+    def add(self, rows, batch_size=1000):
+        """Insert (query, title, seq_code, seq_title, seq) tuples in batches; returns the row count"""
+        count = 0
+        batch = []
+        for row in rows:
+            batch.append(tuple(row))
+            if len(batch) >= batch_size:
+                count += self._insert(batch)
+                batch = []
+        count += self._insert(batch)
+        return count
+
+    def _insert(self, batch):
+        if batch:
+            self._conn.executemany("INSERT OR REPLACE INTO sequences VALUES (?, ?, ?, ?, ?)", batch)
+            self._conn.commit()
+        return len(batch)
+
+    def get(self, seq_code):
+        row = self._conn.execute(
+            "SELECT * FROM sequences WHERE seq_code = ?", (seq_code,)
+        ).fetchone()
+        return dict(zip(SEQUENCE_COLUMNS, row)) if row else None
+
+    def queries(self):
+        return {row[0] for row in self._conn.execute("SELECT DISTINCT query FROM sequences")}
+
+    def titles(self):
+        """query -> title of the chains stored for it"""
+        return dict(self._conn.execute("SELECT query, title FROM sequences GROUP BY query"))
+
+    def remove(self, queries):
+        """Delete every chain of the given queries; returns the number of chains deleted"""
+        before = self._conn.total_changes
+        self._conn.executemany("DELETE FROM sequences WHERE query = ?", ((query,) for query in queries))
+        self._conn.commit()
+        return self._conn.total_changes - before
+
+    def iter_rows(self, columns=SEQUENCE_COLUMNS):
+        """Stream rows as tuples of the requested columns"""
+        cols = ', '.join(_check_columns(columns))
+        yield from self._conn.execute(f"SELECT {cols} FROM sequences ORDER BY rowid")
+
+    def to_dataframe(self, columns=SEQUENCE_COLUMNS, title_contains=None, queries=None):
+        """Load the requested columns, optionally keeping only seq_titles containing any of the given keywords
+
+        With `queries`, only the chains of those queries are loaded, in the
+        order the queries are given; otherwise every stored chain is.
+        """
+        import pandas as pd
+
+        cols = ', '.join(f"sequences.{c}" for c in _check_columns(columns))
+        sql = f"SELECT {cols} FROM sequences"
+        order = " ORDER BY sequences.rowid"
+        conditions = []
+        params = []
+        if queries is not None:
+            # A temporary table rather than IN (?, ...), which is limited in the number of parameters
+            self._conn.execute("DROP TABLE IF EXISTS temp.wanted")
+            self._conn.execute("CREATE TEMP TABLE wanted (query TEXT PRIMARY KEY, position INTEGER)")
+            self._conn.executemany("INSERT OR IGNORE INTO wanted VALUES (?, ?)",
+                                   ((query, i) for i, query in enumerate(queries)))
+            sql += " JOIN wanted ON wanted.query = sequences.query"
+            order = " ORDER BY wanted.position, sequences.rowid"
+        if title_contains:
+            conditions.append("(" + " OR ".join("seq_title LIKE ?" for _ in title_contains) + ")")
+            params = [f"%{keyword}%" for keyword in title_contains]
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        return pd.read_sql_query(sql + order, self._conn, params=params)
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _check_columns(columns):
+    unknown = set(columns) - set(SEQUENCE_COLUMNS)
+    if unknown:
+        raise ValueError(f"Unknown sequence columns: {sorted(unknown)}")
+    return list(columns)
+
+
+def iter_chains(entries, fasta_dir):
+    """Yield (query, title, seq_code, seq_title, seq) for every chain of every (query, title) entry
+
+    Reads `{query}.tsv` files from fasta_dir, as written by 10_pdbj-fasta.py.
+    """
+    for query, title in entries:
+        for header, seq in iter_fasta_file(os.path.join(fasta_dir, f"{query}.tsv")):
+            seq_code, seq_title = split_pdbj_header(header)
+            yield query, title, seq_code, seq_title, seq
+
+
+def iter_packed_chains(entries, packed_path, record_queries):
+    """Like iter_chains, but reading a packed FASTA file written by 10_pdbj-fasta.py --packed
+
+    record_queries maps each record name to the query it was downloaded for
+    (see packed_record_queries).
+    """
+    titles = dict(entries)
+    for header, seq in iter_fasta_file(packed_path):
+        seq_code, seq_title = split_pdbj_header(header)
+        query = record_queries.get(record_name(header))
+        if query in titles:
+            yield query, titles[query], seq_code, seq_title, seq
+
+
+def packed_record_queries(journal_file):
+    """Record name -> query mapping from the 10_pdbj-fasta.py download journal"""
+    from run_journal import RunJournal
+
+    journal = RunJournal(journal_file)
+    return {name: query for query, entry in journal.items() for name in entry['records']}
+
+
+def _same_title(stored, title):
+    # Missing titles come back from SQLite as None but may be NaN in the table
+    missing = lambda value: value is None or value != value
+    return stored == title or missing(stored) and missing(title)
+
+
+def build_sequence_store(path, entries, fasta_dir=None, packed_path=None, record_queries=None,
+                         skip_existing=True):
+    """Stream the chains of every (query, title) entry into a SequenceStore at path
+
+    Chains are read from per-query files in fasta_dir, or from packed_path
+    together with record_queries. Queries already stored with the same title
+    are skipped, so the store can be extended incrementally; queries whose
+    title has changed are reloaded. Chains of queries that are no longer in
+    `entries` stay in the store, so read with to_dataframe(queries=...).
+    Returns the open store.
+    """
+    store = SequenceStore(path)
+    entries = list(entries)
+    if skip_existing:
+        stored = store.titles()
+        entries = [(query, title) for query, title in entries
+                   if query not in stored or not _same_title(stored[query], title)]
+        store.remove(query for query, _ in entries if query in stored)
+    if packed_path is not None:
+        store.add(iter_packed_chains(entries, packed_path, record_queries))
+    else:
+        store.add(iter_chains(entries, fasta_dir))
+    return store
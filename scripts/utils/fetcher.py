@@ -0,0 +1,324 @@
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from http_cache import CacheMiss, normalize_url
+from metrics import REGISTRY
+
+# Responses worth retrying: throttling and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Responses meaning "slow down"; they also shrink the host's concurrency
+THROTTLE_STATUSES = {429, 503}
+MAX_BACKOFF = 60.0
+
+
+class FetchError(requests.RequestException):
+    """A request that failed for good, classified by `kind`"""
+
+    kind = 'error'
+
+    def __init__(self, message, url=None, status=None, response=None):
+        super().__init__(message, response=response)
+        self.url = url
+        self.status = status
+
+
+class NetworkError(FetchError):
+    kind = 'network'
+
+
+class HTTPStatusError(FetchError, requests.HTTPError):
+    kind = 'http'
+
+
+class ThrottledError(HTTPStatusError):
+    kind = 'throttled'
+
+
+class ServerError(HTTPStatusError):
+    kind = 'server'
+
+
+class ClientError(HTTPStatusError):
+    kind = 'client'
+
+
+def error_kind(exc):
+    """Short error class for reports: a FetchError kind or the exception type name"""
+    return exc.kind if isinstance(exc, FetchError) else type(exc).__name__
+
+
+def raise_for_status(response):
+    """Raise the matching HTTPStatusError subclass for a non-2xx response"""
+    status = response.status_code
+    if status < 400:
+        return
+    if status in THROTTLE_STATUSES:
+        error = ThrottledError
+    elif status >= 500:
+        error = ServerError
+    else:
+        error = ClientError
+    raise error(f"{status} {response.reason} for {response.url}", url=response.url,
+                status=status, response=response)
+
+
+def retry_after(response):
+    """Seconds requested by a Retry-After header (delta or HTTP date), or None"""
+    value = response.headers.get('Retry-After') if response is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Allow `rate` requests per second on average, in bursts of up to `burst`
+
+    A rate of None means unlimited. pause() blocks every caller until the
+    given number of seconds has passed, e.g. to honour Retry-After.
+    """
+
+    def __init__(self, rate=None, burst=1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    delay = self.blocked_until - now
+                elif not self.rate:
+                    return
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+    def pause(self, seconds):
+        with self._lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+
+class AdaptiveLimit:
+    """AIMD limit on requests in flight to one host
+
+    The limit starts at `maximum`, halves whenever the host throttles a
+    request and grows back by about one for every `limit` successful ones.
+    """
+
+    def __init__(self, maximum, minimum=1):
+        self.maximum = maximum
+        self.minimum = minimum
+        self.limit = float(maximum)
+        self.active = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self.active >= max(self.minimum, int(self.limit)):
+                self._cond.wait()
+            self.active += 1
+
+    def release(self, throttled=False):
+        with self._cond:
+            self.active -= 1
+            if throttled:
+                self.limit = max(self.minimum, self.limit / 2)
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+
+class HostLimits:
+    """Token bucket and adaptive concurrency limit of every host, created on first use
+
+    `rate` is a number of requests per second applied to each host, or a
+    {host: rate} dict (hosts missing from it are not rate limited).
+    """
+
+    def __init__(self, rate=None, concurrency=8, burst=1):
+        self.rate = rate
+        self.concurrency = concurrency
+        self.burst = burst
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _rate(self, host):
+        return self.rate.get(host) if isinstance(self.rate, dict) else self.rate
+
+    def get(self, host):
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = (TokenBucket(self._rate(host), self.burst), AdaptiveLimit(self.concurrency))
+            return self._hosts[host]
+
+
+class Fetcher:
+    """Pooled keep-alive HTTP session with per-host rate and concurrency limits
+
+    `workers` caps the number of requests in flight. Each host gets a token
+    bucket of `rate` requests per second (a number, a {host: rate} dict or
+    None for unlimited) and an AIMD concurrency limit that halves when the
+    host answers 429/503 and slowly grows back to `workers`.
+    If an HttpCache is given, get_text/get_content serve successful responses
+    from it and only go to the network on a miss. Connection errors and
+    RETRY_STATUSES responses are retried up to `retries` times after a
+    jittered exponential backoff (or the server's Retry-After). Outcomes are
+    counted per (host, kind) in `stats`; latency, bytes, retries and queue
+    depth are recorded in the shared metrics REGISTRY.
+    """
+
+    def __init__(self, workers=8, rate=None, timeout=60, cache=None, retries=3, backoff=1.0,
+                 max_backoff=MAX_BACKOFF):
+        self.workers = workers
+        self.timeout = timeout
+        self.cache = cache
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.limits = HostLimits(rate, concurrency=workers)
+        self.stats = Counter()
+        self._stats_lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+
+    def _count(self, host, kind):
+        with self._stats_lock:
+            self.stats[host, kind] += 1
+        if kind == 'retry':
+            REGISTRY.inc('http_retries_total', host=host)
+        else:
+            REGISTRY.inc('http_requests_total', host=host, outcome=kind)
+
+    def _delay(self, attempt, response):
+        # Full jitter keeps retrying workers from hitting the host in lockstep
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+        requested = retry_after(response)
+        return max(delay, requested) if requested is not None else delay
+
+    def get(self, url, params=None, **kwargs):
+        """GET with retries; returns the last response, raises NetworkError if none arrived"""
+        kwargs.setdefault('timeout', self.timeout)
+        host = urlsplit(url).netloc
+        bucket, concurrency = self.limits.get(host)
+        for attempt in range(self.retries + 1):
+            last_attempt = attempt == self.retries
+            REGISTRY.add('http_waiting_requests', 1, host=host)
+            bucket.acquire()
+            concurrency.acquire()
+            REGISTRY.add('http_waiting_requests', -1, host=host)
+            REGISTRY.add('http_in_flight', 1, host=host)
+            response = None
+            start = time.perf_counter()
+            try:
+                response = self.session.get(url, params=params, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._count(host, 'network')
+                if last_attempt:
+                    raise NetworkError(f"{type(e).__name__} for {url}: {e}", url=url) from e
+            finally:
+                concurrency.release(throttled=response is not None and response.status_code in THROTTLE_STATUSES)
+                REGISTRY.add('http_in_flight', -1, host=host)
+                REGISTRY.set('http_concurrency_limit', round(concurrency.limit, 2), host=host)
+                REGISTRY.observe('http_request_duration_seconds', time.perf_counter() - start, host=host)
+            if response is not None:
+                REGISTRY.inc('http_response_bytes_total', len(response.content), host=host)
+                if response.status_code not in RETRY_STATUSES:
+                    self._count(host, 'ok' if response.ok else 'client')
+                    return response
+                self._count(host, 'throttled' if response.status_code in THROTTLE_STATUSES else 'server')
+                if last_attempt:
+                    return response
+            self._count(host, 'retry')
+            delay = self._delay(attempt, response)
+            if response is not None and response.status_code in THROTTLE_STATUSES:
+                bucket.pause(delay)
+            time.sleep(delay)
+
+    def summary(self):
+        """Request outcomes per host, e.g. 'pdbj.org: ok=120 retry=3 throttled=3'"""
+        hosts = {}
+        for (host, kind), count in sorted(self.stats.items()):
+            hosts.setdefault(host, []).append(f"{kind}={count}")
+        return '; '.join(f"{host}: {' '.join(parts)}" for host, parts in hosts.items())
+
+    def get_content(self, url, params=None):
+        """Body of a successful response as bytes; raises an HTTPStatusError otherwise"""
+        body = self._cached(url, params)
+        if body is not None:
+            return body
+        response = self.get(url, params=params)
+        raise_for_status(response)
+        if self.cache is not None:
+            self.cache.put(url, response.content, params)
+        return response.content
+
+    def get_text(self, url, params=None):
+        """Body of a successful response as text; raises an HTTPStatusError otherwise"""
+        body = self._cached(url, params)
+        if body is not None:
+            return body.decode('utf-8')
+        response = self.get(url, params=params)
+        raise_for_status(response)
+        if self.cache is not None:
+            self.cache.put(url, response.text, params)
+        return response.text
+
+    def _cached(self, url, params):
+        if self.cache is None:
+            return None
+        body = self.cache.get(url, params)
+        if body is None and self.cache.offline:
+            raise CacheMiss(normalize_url(url, params))
+        return body
+
+    def map(self, func, items):
+        """Apply func to every item on the worker pool, yielding results in input order"""
+        items = list(items)
+        REGISTRY.add('fetch_queue_depth', len(items))
+
+        def run(item):
+            REGISTRY.add('fetch_queue_depth', -1)
+            return func(item)
+
+        return self._executor.map(run, items)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.session.close()
+        if self.cache is not None:
+            self.cache.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,182 @@
+import os
+import site
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+except ImportError:  # lxml is optional; BeautifulSoup remains the reference parser
+    etree = None
+
+BACKENDS = ('bs4', 'lxml')
+DEFAULT_BACKEND = 'lxml' if etree is not None else 'bs4'
+
+# Text of these elements is not page text (BeautifulSoup's get_text skips it too)
+SKIP_TEXT = {'script', 'style', 'template'}
+
+
+def resolve_backend(backend=None):
+    """'bs4' or 'lxml' for a backend name (None or 'auto' picks lxml when installed)"""
+    if backend in (None, 'auto'):
+        return DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown parser backend {backend!r}; choose one of {BACKENDS}")
+    if backend == 'lxml' and etree is None:
+        raise ImportError("The lxml parser backend needs lxml (pip install lxml)")
+    return backend
+
+
+def parse_pool(workers=None):
+    """Process pool for page parsing, kept apart from the I/O threads
+
+    Workers add this directory to sys.path first, so parse functions of the
+    utils modules can be sent to them under the spawn start method too.
+    """
+    return ProcessPoolExecutor(max_workers=workers, initializer=site.addsitedir,
+                               initargs=(os.path.dirname(os.path.abspath(__file__)),))
+
+
+def parse_document(html):
+    if isinstance(html, bytes):
+        html = html.decode('utf-8')
+    return lxml_html.document_fromstring(html or '<html></html>')
+
+
+def text_of(element):
+    """Concatenated text of an element and its descendants, like BeautifulSoup's get_text()"""
+    parts = []
+
+    def walk(node):
+        if node.text:
+            parts.append(node.text)
+        for child in node:
+            # Comments and processing instructions have a non-string tag
+            if isinstance(child.tag, str) and child.tag not in SKIP_TEXT:
+                walk(child)
+            if child.tail:
+                parts.append(child.tail)
+
+    if element.tag not in SKIP_TEXT:
+        walk(element)
+    return ''.join(parts)
+
+
+def stripped_text_of(element):
+    """Like BeautifulSoup's get_text(strip=True): every text piece stripped, then joined"""
+    pieces = []
+
+    def walk(node):
+        if node.text and node.text.strip():
+            pieces.append(node.text.strip())
+        for child in node:
+            if isinstance(child.tag, str) and child.tag not in SKIP_TEXT:
+                walk(child)
+            if child.tail and child.tail.strip():
+                pieces.append(child.tail.strip())
+
+    walk(element)
+    return ''.join(pieces)
+
+
+def _single_string(element):
+    # BeautifulSoup's .string: the only text child, looking through single-child tags
+    while True:
+        children = [child for child in element if isinstance(child.tag, str)]
+        if not children:
+            return element.text if not any(child.tail for child in element) else None
+        if len(children) > 1 or element.text or children[0].tail:
+            return None
+        element = children[0]
+
+
+def _has_class(element, name):
+    return element is not None and name in (element.get('class') or '').split()
+
+
+def _present(element):
+    # A BeautifulSoup tag is truthy even when it is empty, so a match is present
+    return element is not None
+
+
+def _next(element, tag, cls=None):
+    # Adjacent-sibling step of a CSS selector: the next element, if it matches
+    sibling = element.getnext() if element is not None else None
+    while sibling is not None and not isinstance(sibling.tag, str):
+        sibling = sibling.getnext()
+    if sibling is None or sibling.tag != tag or (cls and not _has_class(sibling, cls)):
+        return None
+    return sibling
+
+
+if etree is not None:
+    _LINKS = etree.XPath('//a[@href]')
+    _TABLE_ROWS = etree.XPath('//tr')
+    _FIRST_TH = etree.XPath('(.//th)[1]')
+    _FIRST_TD = etree.XPath('(.//td)[1]')
+    _BODY = etree.XPath('//body')
+    # `.index_table > div`
+    _RESULT_ROWS = etree.XPath("//*[contains(concat(' ', normalize-space(@class), ' '), ' index_table ')]/div")
+    # `span.header` inside one result row
+    _HEADERS = etree.XPath(".//span[contains(concat(' ', normalize-space(@class), ' '), ' header ')]")
+
+
+def knapsack_cids(html):
+    """lxml version of knapsack_scraper.parse_cids"""
+    cids = []
+    for link in _LINKS(parse_document(html)):
+        text = _single_string(link)
+        if text and text.startswith('C'):
+            cids.append(link.get('href').split('=')[-1])
+    return cids
+
+
+def knapsack_details(html, keys):
+    """lxml version of knapsack_scraper.parse_details"""
+    details = dict.fromkeys(keys)
+    for tr in _TABLE_ROWS(parse_document(html)):
+        th = _FIRST_TH(tr)
+        td = _FIRST_TD(tr)
+        if th and td and _present(th[0]) and _present(td[0]):
+            key = stripped_text_of(th[0])
+            if key in details:
+                details[key] = stripped_text_of(td[0])
+    return details
+
+
+def _row_fields(row):
+    # One pass over the row's span.header elements, evaluating the five
+    # selectors of bdb_scraper.parse_rows on each and keeping the first match
+    target = species = bdb_id = smiles = pdb_link = None
+    for header in _HEADERS(row):
+        first = _next(header, 'a')
+        big = first if _has_class(first, 'big') else None
+        if target is None and big is not None:
+            target = big
+        if species is None and big is not None:
+            species = _next(_next(big, 'span'), 'span')
+        second = _next(first, 'a', 'big')
+        if bdb_id is None and second is not None:
+            bdb_id = second
+        if smiles is None:
+            button = _next(second, 'button')
+            if button is not None:
+                smiles = button
+        if pdb_link is None and first is not None and (first.get('href') or '').startswith('https://www.rcsb.org'):
+            pdb_link = first
+        if None not in (target, species, bdb_id, smiles, pdb_link):
+            break
+    return (
+        text_of(target).strip() if _present(target) else "NaN",
+        text_of(species).strip() if _present(species) else "NaN",
+        text_of(bdb_id).strip() if _present(bdb_id) else "NaN",
+        smiles.get('onclick').split("'")[1] if _present(smiles) and smiles.get('onclick') is not None else "NaN",
+        pdb_link.get('href') if _present(pdb_link) else "NaN",
+    )
+
+
+def bindingdb_page(html):
+    """lxml version of bdb_scraper's page parsing: (body text, result row tuples)"""
+    doc = parse_document(html)
+    body = _BODY(doc)
+    text = text_of(body[0]) if body else ""
+    return text, [_row_fields(row) for row in _RESULT_ROWS(doc)]
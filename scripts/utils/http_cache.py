@@ -0,0 +1,132 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from metrics import REGISTRY
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "ayurvedic-hiv", "http-cache.sqlite")
+
+
+class CacheMiss(Exception):
+    """Raised in cache-only mode when a URL has no cached response"""
+
+
+def normalize_url(url, params=None):
+    """Canonical form of url + params: lower-cased scheme/host and sorted query parameters"""
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    if params:
+        query.extend((str(k), str(v)) for k, v in params.items())
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/',
+                       urlencode(sorted(query)), ''))
+
+
+def cache_key(url, params=None):
+    return hashlib.sha256(normalize_url(url, params).encode('utf-8')).hexdigest()
+
+
+class HttpCache:
+    """Content-addressed response cache stored in a single SQLite file
+
+    Entries older than `ttl` seconds are treated as missing (None keeps them
+    forever). When the stored bodies exceed `max_bytes` the least recently
+    used entries are evicted. With `offline=True` stale entries are still
+    served and a miss raises CacheMiss instead of going to the network.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=None, max_bytes=None, offline=False):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, url TEXT, body BLOB, size INTEGER,"
+            " fetched_at REAL, accessed_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed_at)")
+        self._conn.commit()
+
+    def get(self, url, params=None):
+        """Return the cached body as bytes, or None if missing or expired"""
+        key = cache_key(url, params)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, fetched_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                REGISTRY.inc('http_cache_lookups_total', result='miss')
+                return None
+            body, fetched_at = row
+            if self.ttl is not None and now - fetched_at > self.ttl and not self.offline:
+                REGISTRY.inc('http_cache_lookups_total', result='miss')
+                return None
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        REGISTRY.inc('http_cache_lookups_total', result='hit')
+        return body
+
+    def put(self, url, body, params=None):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                (cache_key(url, params), normalize_url(url, params), body, len(body), now, now)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        if self.max_bytes is None:
+            return
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at"
+        ).fetchall():
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            excess -= size
+            if excess <= 0:
+                break
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def add_cache_arguments(parser):
+    """Register the shared --cache* options on an argparse parser"""
+    parser.add_argument('--cache', default=DEFAULT_CACHE_PATH,
+                        help='Path to the HTTP response cache (SQLite file)')
+    parser.add_argument('--no-cache', action='store_true', help='Disable the HTTP response cache')
+    parser.add_argument('--cache-ttl', type=float, default=None,
+                        help='Maximum age of cached responses in days (default: never expire)')
+    parser.add_argument('--cache-max-mb', type=float, default=None,
+                        help='Evict least recently used responses above this size in MB')
+    parser.add_argument('--cache-only', action='store_true',
+                        help='Offline mode: serve only cached responses, never touch the network')
+
+
+def cache_from_args(args):
+    if args.no_cache:
+        return None
+    return HttpCache(
+        args.cache,
+        ttl=args.cache_ttl * 86400 if args.cache_ttl is not None else None,
+        max_bytes=int(args.cache_max_mb * 1024 * 1024) if args.cache_max_mb is not None else None,
+        offline=args.cache_only,
+    )
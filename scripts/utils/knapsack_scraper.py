@@ -0,0 +1,64 @@
+from bs4 import BeautifulSoup
+
+import html_parsers
+from metrics import REGISTRY
+
+BASE_URL = "http://www.knapsackfamily.com/knapsack_core"
+
+DETAIL_KEYS = ["Name", "Formula", "Mw", "CAS RN", "C_ID", "InChIKey", "InChICode", "SMILES"]
+
+# Columns appended to each plant row in the KNApSAcK output
+METABOLITE_COLUMNS = ["Metabolite Name", "Formula", "Mw", "CAS RN", "C_ID", "InChIKey", "InChICode", "SMILES"]
+
+
+def parse_cids(html, backend=None):
+    """Extract the C_IDs listed on a KNApSAcK search result page"""
+    if html_parsers.resolve_backend(backend) == 'lxml':
+        return html_parsers.knapsack_cids(html)
+    soup = BeautifulSoup(html, 'html.parser')
+    cid_links = soup.find_all('a', href=True, string=lambda t: t and t.startswith('C'))
+    return [cid_link['href'].split('=')[-1] for cid_link in cid_links]
+
+
+def parse_details(html, backend=None):
+    """Map the <th>/<td> rows of a KNApSAcK detail page onto DETAIL_KEYS"""
+    if html_parsers.resolve_backend(backend) == 'lxml':
+        return html_parsers.knapsack_details(html, DETAIL_KEYS)
+    soup = BeautifulSoup(html, 'html.parser')
+    details = dict.fromkeys(DETAIL_KEYS)
+    for tr in soup.find_all('tr'):
+        th = tr.find('th')
+        td = tr.find('td')
+        if th and td:
+            key = th.get_text(strip=True)
+            value = td.get_text(strip=True)
+            if key in details:
+                details[key] = value
+    return details
+
+
+def _parse(func, html, backend, parse_pool):
+    # Parsing is CPU-bound, so it can be handed to a process pool while the
+    # calling I/O thread waits for the result
+    with REGISTRY.timer('parse_duration_seconds', parser=func.__name__):
+        if parse_pool is None:
+            return func(html, backend)
+        return parse_pool.submit(func, html, backend).result()
+
+
+def search_knapsack(fetcher, scientific_name, base_url=BASE_URL, backend=None, parse_pool=None):
+    params = {"sname": "all", "word": scientific_name}
+    html = fetcher.get_text(f"{base_url}/result.php", params=params)
+    return _parse(parse_cids, html, backend, parse_pool)
+
+
+def fetch_knapsack_details(fetcher, cid, base_url=BASE_URL, backend=None, parse_pool=None):
+    html = fetcher.get_text(f"{base_url}/information.php?word={cid}")
+    return _parse(parse_details, html, backend, parse_pool)
+
+
+def metabolite_record(details):
+    """Turn a parsed detail page into the metabolite columns of the output table"""
+    record = dict(zip(METABOLITE_COLUMNS, (details[key] for key in DETAIL_KEYS)))
+    record["C_ID"] = details["C_ID"].replace(',', '') if details["C_ID"] else None  # Remove comma from C_ID
+    return record
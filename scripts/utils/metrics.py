@@ -0,0 +1,298 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Upper bounds in seconds, from a cached lookup to a slow browser page
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+HELP = {
+    'http_request_duration_seconds': 'Latency of each HTTP request attempt',
+    'http_requests_total': 'HTTP request attempts by outcome',
+    'http_retries_total': 'HTTP requests retried after a backoff',
+    'http_response_bytes_total': 'Bytes of HTTP response bodies received',
+    'http_in_flight': 'HTTP requests currently on the wire',
+    'http_waiting_requests': 'HTTP requests waiting for a rate or concurrency slot',
+    'http_concurrency_limit': 'Current adaptive concurrency limit',
+    'fetch_queue_depth': 'Items submitted to Fetcher.map that have not started',
+    'http_cache_lookups_total': 'HTTP cache lookups by result (hit or miss)',
+    'parse_duration_seconds': 'Time to parse one page, including the hand-off to a parse process',
+    'browser_start_duration_seconds': 'Time to start a browser',
+    'browser_page_duration_seconds': 'Time a browser was borrowed for one page',
+    'browser_restarts_total': 'Browsers quit and replaced, by reason',
+    'browser_waiting': 'Callers waiting for a free browser',
+    'step_duration_seconds': 'Time spent in a named processing step (e.g. pandas work)',
+}
+
+
+class Histogram:
+    """Counts of observations per bucket, plus their count and sum"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.bounds = tuple(buckets)
+        self.counts = [0] * (len(self.bounds) + 1)   # the last bucket is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile, capped at the largest value (None when empty)"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+def _key(name, labels):
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _series(name, labels, extra=(), quote=True):
+    # Prometheus quotes label values; the JSON keys stay readable without
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return name
+    joined = ','.join(f'{k}="{v}"' if quote else f'{k}={v}' for k, v in pairs)
+    return f"{name}{{{joined}}}"
+
+
+class Metrics:
+    """Thread-safe registry of counters, gauges and histograms
+
+    Every metric is identified by a name plus keyword labels, e.g.
+    `metrics.inc('http_requests_total', host='pdbj.org', outcome='ok')`.
+    Scrapers and utils modules record into the shared REGISTRY; a
+    MetricsExporter writes it out while a script runs.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+
+    def inc(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self.gauges[_key(name, labels)] = value
+
+    def add(self, name, value, **labels):
+        """Move a gauge up or down by value"""
+        key = _key(name, labels)
+        with self._lock:
+            self.gauges[key] = self.gauges.get(key, 0) + value
+
+    def observe(self, name, value, buckets=DEFAULT_BUCKETS, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Observe the duration of a with-block in the histogram `name`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+
+    def snapshot(self):
+        """Current values as a JSON-serializable dict keyed by series name"""
+        with self._lock:
+            histograms = {}
+            for (name, labels), h in self.histograms.items():
+                histograms[_series(name, labels, quote=False)] = {
+                    'count': h.count,
+                    'sum': round(h.sum, 6),
+                    'p50': h.quantile(0.5),
+                    'p95': h.quantile(0.95),
+                    'p99': h.quantile(0.99),
+                    'max': round(h.max, 6),
+                }
+            counters = {_series(n, l, quote=False): v for (n, l), v in sorted(self.counters.items())}
+            gauges = {_series(n, l, quote=False): v for (n, l), v in sorted(self.gauges.items())}
+        return {
+            'time': round(time.time(), 3),
+            'cache_hit_ratio': self.cache_hit_ratio(),
+            'counters': counters,
+            'gauges': gauges,
+            'histograms': dict(sorted(histograms.items())),
+        }
+
+    def prometheus(self):
+        """Current values in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for kind, series in (('counter', self.counters), ('gauge', self.gauges)):
+                for name in sorted({n for n, _ in series}):
+                    lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                    lines.append(f"# TYPE {name} {kind}")
+                    for (n, labels), value in sorted(series.items()):
+                        if n == name:
+                            lines.append(f"{_series(name, labels)} {value}")
+            for name in sorted({n for n, _ in self.histograms}):
+                lines.append(f"# HELP {name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {name} histogram")
+                for (n, labels), h in sorted(self.histograms.items()):
+                    if n != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(h.bounds + (float('inf'),), h.counts):
+                        cumulative += count
+                        le = '+Inf' if bound == float('inf') else repr(bound)
+                        lines.append(f"{_series(name + '_bucket', labels, [('le', le)])} {cumulative}")
+                    lines.append(f"{_series(name + '_sum', labels)} {h.sum}")
+                    lines.append(f"{_series(name + '_count', labels)} {h.count}")
+        return '\n'.join(lines) + '\n'
+
+    def cache_hit_ratio(self):
+        """Share of HTTP cache lookups that were hits (None before the first lookup)"""
+        with self._lock:
+            hits = self.counters.get(_key('http_cache_lookups_total', {'result': 'hit'}), 0)
+            misses = self.counters.get(_key('http_cache_lookups_total', {'result': 'miss'}), 0)
+        return hits / (hits + misses) if hits + misses else None
+
+
+# Shared by every module of a script run
+REGISTRY = Metrics()
+
+
+def timed(step):
+    """Time a named processing step, e.g. `with timed('join'):`"""
+    return REGISTRY.timer('step_duration_seconds', step=step)
+
+
+class MetricsExporter:
+    """Write a Metrics registry to `path` every `interval` seconds while running
+
+    A path ending in .prom is rewritten atomically in the Prometheus text
+    format (for node_exporter's textfile collector); any other path gets
+    one JSON line appended per interval. A final write happens on stop().
+    With path None the exporter does nothing, so scripts can always use it
+    as a context manager.
+    """
+
+    def __init__(self, path=None, interval=10.0, metrics=None):
+        self.path = path
+        self.interval = interval
+        self.metrics = metrics or REGISTRY
+        self._stop = threading.Event()
+        self._thread = None
+
+    def write(self):
+        if self.path is None:
+            return
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        if self.path.endswith('.prom'):
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, 'w') as f:
+                f.write(self.metrics.prometheus())
+            os.replace(tmp, self.path)
+        else:
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(self.metrics.snapshot()) + '\n')
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def start(self):
+        if self.path is not None and self.interval and self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.write()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class SampledLog:
+    """Print the first `first` messages of each kind, then only one in `every`
+
+    Replaces per-row prints in tight loops. Suppressed messages are counted
+    and close() reports how many of each kind were not printed.
+    """
+
+    def __init__(self, first=10, every=100, write=print):
+        self.first = first
+        self.every = max(1, every)
+        self.write = write
+        self.seen = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, message, kind='info'):
+        with self._lock:
+            n = self.seen[kind] = self.seen.get(kind, 0) + 1
+        if n <= self.first or (n - self.first) % self.every == 0:
+            self.write(message)
+
+    def suppressed(self, kind='info'):
+        n = self.seen.get(kind, 0)
+        return max(0, n - self.first) - max(0, n - self.first) // self.every
+
+    def close(self):
+        for kind in sorted(self.seen):
+            if self.suppressed(kind):
+                self.write(f"({self.suppressed(kind)} of {self.seen[kind]} {kind} messages not shown)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def add_metrics_arguments(parser):
+    """Register the shared --metrics and --log-every options on an argparse parser"""
+    parser.add_argument('--metrics', default=None,
+                        help='Write run metrics here: a .prom Prometheus textfile, otherwise JSON lines')
+    parser.add_argument('--metrics-interval', type=float, default=10.0,
+                        help='Seconds between metric writes (default: 10)')
+    parser.add_argument('--log-every', type=int, default=100,
+                        help='After the first 10 per-row messages of a kind, print only one in this many '
+                             '(1 prints them all)')
+
+
+def exporter_from_args(args):
+    return MetricsExporter(args.metrics, interval=args.metrics_interval)
+
+
+def log_from_args(args):
+    return SampledLog(every=args.log_every)
@@ -0,0 +1,90 @@
+import json
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+from selenium.common.exceptions import StaleElementReferenceException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+
+from fetcher import error_kind
+from http_cache import CacheMiss
+
+SQL_URL = 'https://pdbj.org/rest/newweb/search/sql'
+STRUCTURE_URL = 'https://pdbj.org/mine/structural_details/{}'
+TITLE_SELECTOR = '#PDBExplorerPlane h2'
+QUERY_SELECTOR = "input[type='text'][placeholder='Enter one or more search terms.']"
+# Query-string parameters that carry the PDB IDs of a BindingDB structure link
+QUERY_PARAMS = ('structureIdList', 'structureId', 'idList', 'query', 'q')
+BATCH_SIZE = 200
+WAIT_TIMEOUT = 30
+
+def link_query(link):
+    """Search terms carried in a structure link's query string, or None if it has none"""
+    params = parse_qs(urlsplit(link).query)
+    for name in QUERY_PARAMS:
+        values = [value.strip() for value in params.get(name, []) if value.strip()]
+        if values:
+            return ','.join(values)
+    return None
+
+def title_sql(codes):
+    """mine2 SQL selecting the title of every PDB ID in codes (IDs must be alphanumeric)"""
+    ids = ', '.join(f"'{code.lower()}'" for code in codes)
+    return f"SELECT pdbid, title FROM brief_summary WHERE pdbid IN ({ids})"
+
+def parse_sql_result(body):
+    """{pdbid: title} from a mine2 SQL JSON response (resultset records or a list of objects)"""
+    data = json.loads(body)
+    if isinstance(data, dict):
+        resultset = data.get('resultset', data)
+        columns = resultset.get('columns', [])
+        rows = [dict(zip(columns, record)) for record in resultset.get('records', [])]
+    else:
+        rows = data
+    return {str(row['pdbid']).lower(): row['title'] for row in rows if row.get('title')}
+
+def fetch_titles(fetcher, codes, api_url=SQL_URL, batch_size=BATCH_SIZE):
+    """Titles for many PDB IDs with one SQL request per batch, run on the fetcher's pool
+
+    Returns ({code: title}, {code: error}). IDs the service does not know, and
+    IDs that are not plain alphanumerics, appear in neither dict so the caller
+    can fall back to the structure page for them.
+    """
+    codes = [code for code in dict.fromkeys(codes) if isinstance(code, str) and code.isalnum()]
+    batches = [codes[i:i + batch_size] for i in range(0, len(codes), batch_size)]
+
+    def fetch(batch):
+        try:
+            body = fetcher.get_content(api_url, params={'q': title_sql(batch), 'format': 'json'})
+            found = parse_sql_result(body)
+        except (requests.RequestException, CacheMiss, ValueError, KeyError, AttributeError) as e:
+            return {}, {code: f"[{error_kind(e)}] {e}" for code in batch}
+        return {code: found[code.lower()] for code in batch if code.lower() in found}, {}
+
+    titles, errors = {}, {}
+    for batch_titles, batch_errors in fetcher.map(fetch, batches):
+        titles.update(batch_titles)
+        errors.update(batch_errors)
+    return titles, errors
+
+def _wait_for(driver, selector, read, timeout):
+    def ready(d):
+        elements = d.find_elements(By.CSS_SELECTOR, selector)
+        if not elements or not elements[0].is_displayed():
+            return False
+        return (read(elements[0]) or '').strip() or False
+    wait = WebDriverWait(driver, timeout, poll_frequency=0.2,
+                         ignored_exceptions=(StaleElementReferenceException,))
+    return wait.until(ready)
+
+def browser_title(pool, code, timeout=WAIT_TIMEOUT):
+    """Title of a structure page, returned as soon as the heading has rendered"""
+    with pool.driver() as driver:
+        driver.get(STRUCTURE_URL.format(code))
+        return _wait_for(driver, TITLE_SELECTOR, lambda element: element.text, timeout)
+
+def browser_query(pool, link, timeout=WAIT_TIMEOUT):
+    """Value of the search box on a structure link, returned as soon as the page fills it"""
+    with pool.driver() as driver:
+        driver.get(link)
+        return _wait_for(driver, QUERY_SELECTOR, lambda element: element.get_attribute('value'), timeout)
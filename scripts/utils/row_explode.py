@@ -1,65 +1,49 @@
 import pandas as pd
 import numpy as np
 
-def explode_rows(df, index):
-    split_target_name = df.loc[index, 'target_name'].split(', ')
-    split_species = df.loc[index, 'species'].split(', ')
-    split_bdb_id = df.loc[index, 'bdb_id'].split(', ')
-    split_ligand_smiles = df.loc[index, 'ligand_smiles'].split(', ')
-    pdb_link_value = df.loc[index, 'pdb_link']
-    
-    if pd.isna(pdb_link_value):
-        split_pdb_link = [np.nan]
-    else:
-        split_pdb_link = pdb_link_value.split(', ')
+# BindingDB hit columns holding ', '-joined lists (see bdb_scraper.scrape_bindingdb)
+LIST_COLUMNS = ['target_name', 'species', 'bdb_id', 'ligand_smiles', 'pdb_link']
+
+def _split_cell(value, sep):
+    if isinstance(value, str):
+        return value.split(sep)
+    if isinstance(value, list):
+        # An empty list (a search without hits) is missing, as Series.explode() treats it
+        return value if value else [np.nan]
+    return np.nan
+
+def process_dataframe(df, list_columns=LIST_COLUMNS, sep=', '):
+    """Explode the joined BindingDB hit columns into one row per hit
+
+    Every list column is split on `sep` and each row is truncated to its
+    shortest list. Cells that already hold lists (tables read from Parquet)
+    are used as they are. A missing value or an empty list counts as a
+    single-element list holding NaN.
+    All other columns are repeated for each hit, in their original order, and
+    the list columns come last.
+    """
+    other_columns = [c for c in df.columns if c not in list_columns]
 
-    # Check the lengths of the lists
-    lengths = [len(split_target_name), len(split_species), len(split_bdb_id), len(split_ligand_smiles), len(split_pdb_link)]
-    
-    # Ensure all lists have the same length
-    min_length = min(lengths)
-    split_target_name = split_target_name[:min_length]
-    split_species = split_species[:min_length]
-    split_bdb_id = split_bdb_id[:min_length]
-    split_ligand_smiles = split_ligand_smiles[:min_length]
-    split_pdb_link = split_pdb_link[:min_length]
-    
-    new_rows = pd.DataFrame({
-        'C_ID': [df.loc[index, 'C_ID']] * min_length,
-        'Code': [df.loc[index, 'Code']] * min_length,
-        'FSM_Code': [df.loc[index, 'FSM_Code']] * min_length,
-        'Name': [df.loc[index, 'Name']] * min_length,
-        'Common Name': [df.loc[index, 'Common Name']] * min_length,
-        'Scientific Name': [df.loc[index, 'Scientific Name']] * min_length,
-        'Quantity': [df.loc[index, 'Quantity']] * min_length,
-        'Non plant ingredient': [df.loc[index, 'Non plant ingredient']] * min_length,
-        'Action': [df.loc[index, 'Action']] * min_length,
-        'Application': [df.loc[index, 'Application']] * min_length,
-        'Comments': [df.loc[index, 'Comments']] * min_length,
-        'Bacteria': [df.loc[index, 'Bacteria']] * min_length,
-        'Metabolite Name': [df.loc[index, 'Metabolite Name']] * min_length,
-        'Formula': [df.loc[index, 'Formula']] * min_length,
-        'Mw': [df.loc[index, 'Mw']] * min_length,
-        'CAS RN': [df.loc[index, 'CAS RN']] * min_length,
-        'InChIKey': [df.loc[index, 'InChIKey']] * min_length,
-        'InChICode': [df.loc[index, 'InChICode']] * min_length,
-        'SMILES': [df.loc[index, 'SMILES']] * min_length,
-        'target_name': split_target_name,
-        'species': split_species,
-        'bdb_id': split_bdb_id,
-        'ligand_smiles': split_ligand_smiles,
-        'pdb_link': split_pdb_link
-    })
-    
-    return new_rows
+    splits = {c: df[c].map(lambda v: _split_cell(v, sep)) for c in list_columns}
+    lengths = np.array([
+        [len(v) if isinstance(v, list) else 1 for v in splits[c]] for c in list_columns
+    ], dtype=np.int64).reshape(len(list_columns), len(df)).T
+    min_length = lengths.min(axis=1, initial=np.iinfo(np.int64).max)
 
-def process_dataframe(df):
-    all_new_rows = []
-    for i in range(len(df)):
-        print(f"Processing row {i}")
-        new_rows = explode_rows(df, i)
-        all_new_rows.append(new_rows)
-    
-    all_new_rows_df = pd.concat(all_new_rows, ignore_index=True)
-    return all_new_rows_df
-    
\ No newline at end of file
+    # Repeat the scalar columns once per kept hit
+    rows = np.repeat(np.arange(len(df)), min_length)
+    result = df[other_columns].iloc[rows].reset_index(drop=True)
+
+    for i, c in enumerate(list_columns):
+        values = splits[c].explode().to_numpy()
+        # Position of each element within its own list; keep the first min_length
+        starts = np.repeat(np.cumsum(lengths[:, i]) - lengths[:, i], lengths[:, i])
+        position = np.arange(len(values)) - starts
+        keep = position < np.repeat(min_length, lengths[:, i])
+        result[c] = values[keep]
+
+    return result
+
+def explode_rows(df, index):
+    """Explode a single row (by index label) of df; see process_dataframe"""
+    return process_dataframe(df.loc[[index]]).reset_index(drop=True)
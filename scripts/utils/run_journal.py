@@ -0,0 +1,134 @@
+import json
+import os
+import threading
+import time
+
+
+class RunJournal:
+    """Append-only JSON-lines journal of completed work, keyed by a string key
+
+    Each completed key is appended as {"key": ..., "value": ..., "at": ...};
+    writes are buffered and flushed every `batch_size` records (and on close),
+    so a crash loses at most one batch. Reopening the journal reloads every
+    completed key, letting a restarted run skip work that is already done.
+    Later records for the same key win.
+
+    The journal doubles as the stage's manifest of resolved keys: "at" is the
+    fetch time, so a refresh can re-fetch keys older than a maximum age
+    (records written before times were kept count as stale).
+    """
+
+    def __init__(self, path, batch_size=50):
+        self.path = path
+        self.batch_size = batch_size
+        self._done = {}
+        self._at = {}
+        self._pending = []
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # partially written last line of an interrupted run
+                    self._done[entry['key']] = entry['value']
+                    self._at[entry['key']] = entry.get('at')
+
+    def __contains__(self, key):
+        return key in self._done
+
+    def __len__(self):
+        return len(self._done)
+
+    def get(self, key, default=None):
+        return self._done.get(key, default)
+
+    def items(self):
+        return self._done.items()
+
+    def fetched_at(self, key):
+        """When key was recorded, in seconds since the epoch (None if missing or not known)"""
+        return self._at.get(key)
+
+    def is_stale(self, key, max_age, now=None):
+        """Whether a recorded key is older than max_age seconds (never, with max_age None)"""
+        if max_age is None or key not in self._done:
+            return False
+        at = self._at.get(key)
+        return at is None or (now or time.time()) - at > max_age
+
+    def needs(self, key, max_age=None):
+        """Whether key still has to be fetched: not recorded yet, or stale"""
+        return key not in self._done or self.is_stale(key, max_age)
+
+    def pending(self, keys, max_age=None):
+        """Distinct keys from `keys` that are not in the journal yet (or are stale), in first-seen order"""
+        return [key for key in dict.fromkeys(keys) if self.needs(key, max_age)]
+
+    def delta(self, keys, max_age=None):
+        """(new, stale, up to date) counts of the distinct keys in `keys`"""
+        keys = list(dict.fromkeys(keys))
+        new = sum(key not in self._done for key in keys)
+        stale = sum(self.is_stale(key, max_age) for key in keys)
+        return new, stale, len(keys) - new - stale
+
+    def record(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._done[key] = value
+            self._at[key] = now
+            self._pending.append(json.dumps({'key': key, 'value': value, 'at': round(now, 3)}, default=str))
+            if len(self._pending) >= self.batch_size:
+                self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if not self._pending:
+            return
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write('\n'.join(self._pending) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self._pending = []
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def add_refresh_arguments(parser):
+    """Register the shared --refresh option on an argparse parser"""
+    parser.add_argument('--refresh', type=float, default=None, metavar='DAYS',
+                        help='Besides new keys, re-fetch keys resolved more than DAYS ago (or before fetch '
+                             'times were journaled) and merge them into the output; cached responses that '
+                             'old are bypassed')
+
+
+def refresh_from_args(args):
+    """Maximum journal age in seconds for --refresh (None without it)
+
+    Also caps --cache-ttl (in days) at the refresh age, so a refreshed key is
+    not served its old response from the HTTP cache.
+    """
+    if args.refresh is None:
+        return None
+    if hasattr(args, 'cache_ttl'):
+        args.cache_ttl = args.refresh if args.cache_ttl is None else min(args.cache_ttl, args.refresh)
+    return args.refresh * 86400
+
+
+def journal_path(output_file):
+    """Default journal location next to a stage's output file"""
+    return os.path.splitext(output_file)[0] + '.journal.jsonl'
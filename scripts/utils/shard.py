@@ -0,0 +1,260 @@
+import hashlib
+import os
+import socket
+import sqlite3
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+# Column added to shard outputs: position of the row's input row, restored by merge_shards.py
+ROW_COLUMN = '_row'
+
+
+def parse_shard(text):
+    """'i/N' -> (i, N), with shards numbered 0 .. N-1"""
+    try:
+        index, count = (int(part) for part in text.split('/'))
+    except ValueError:
+        raise ValueError(f"Shard must look like i/N, got {text!r}") from None
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Shard index must be in 0..{count - 1}, got {text!r}")
+    return index, count
+
+
+def shard_of(key, count):
+    """Shard of a key; a stable hash, so every process and machine agrees (unlike hash())"""
+    digest = hashlib.blake2b(str(key).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big') % count
+
+
+def in_shard(key, shard):
+    index, count = shard
+    return shard_of(key, count) == index
+
+
+def shard_path(path, label):
+    """Per-shard variant of an output path: results.csv -> results.shard-0-of-4.csv"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{label}{ext}"
+
+
+def default_worker():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class WorkQueue:
+    """Lease table of keys in a SQLite file, shared by the worker processes of one run
+
+    Every key is a task. A worker leases a batch of pending keys, or keys
+    whose lease ran out because their worker died, and then marks them done
+    or releases them for a retry; a key released `max_attempts` times is
+    marked failed. Leases are taken in an IMMEDIATE transaction, so two
+    workers never hold the same key. SQLite locking needs a local disk (or
+    a network filesystem with working locks); to split a run across
+    machines without shared storage, use --shard instead.
+    """
+
+    def __init__(self, path, lease=600.0, max_attempts=3):
+        self.path = path
+        self.lease_seconds = lease
+        self.max_attempts = max_attempts
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Autocommit mode; transactions are opened explicitly where they matter
+        self._conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tasks ("
+            " key TEXT PRIMARY KEY, state TEXT NOT NULL DEFAULT 'pending', owner TEXT,"
+            " lease_until REAL, attempts INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+
+    def add(self, keys, worker):
+        """Register keys (known ones are ignored); returns how many were new
+
+        The first worker to register becomes the coordinator of the run.
+        """
+        with self._transaction():
+            before = self._conn.total_changes
+            self._conn.executemany("INSERT OR IGNORE INTO tasks (key) VALUES (?)", ((key,) for key in keys))
+            added = self._conn.total_changes - before
+            self._conn.execute("INSERT OR IGNORE INTO meta VALUES ('coordinator', ?)", (worker,))
+        return added
+
+    def coordinator(self):
+        row = self._conn.execute("SELECT value FROM meta WHERE name = 'coordinator'").fetchone()
+        return row[0] if row else None
+
+    def lease(self, worker, limit):
+        """Lease up to `limit` keys to `worker`, in the order they were added"""
+        now = time.time()
+        with self._transaction():
+            keys = [key for key, in self._conn.execute(
+                "SELECT key FROM tasks WHERE state = 'pending' OR (state = 'leased' AND lease_until < ?)"
+                " ORDER BY rowid LIMIT ?", (now, limit)
+            )]
+            self._conn.executemany(
+                "UPDATE tasks SET state = 'leased', owner = ?, lease_until = ? WHERE key = ?",
+                ((worker, now + self.lease_seconds, key) for key in keys)
+            )
+        return keys
+
+    def done(self, keys, worker):
+        """Mark keys finished; keys whose lease has passed to another worker are left alone"""
+        with self._transaction():
+            self._conn.executemany(
+                "UPDATE tasks SET state = 'done' WHERE key = ? AND owner = ? AND state = 'leased'",
+                ((key, worker) for key in keys)
+            )
+
+    def release(self, keys, worker):
+        """Give keys back after a failure, or mark them failed after max_attempts"""
+        with self._transaction():
+            self._conn.executemany(
+                "UPDATE tasks SET attempts = attempts + 1,"
+                " state = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE 'pending' END"
+                " WHERE key = ? AND owner = ? AND state = 'leased'",
+                ((self.max_attempts, key, worker) for key in keys)
+            )
+
+    def owned(self, worker):
+        """Keys that `worker` finished (done or failed for good)"""
+        return {key for key, in self._conn.execute(
+            "SELECT key FROM tasks WHERE owner = ? AND state IN ('done', 'failed')", (worker,)
+        )}
+
+    def counts(self):
+        """{state: number of keys}"""
+        return dict(self._conn.execute("SELECT state, COUNT(*) FROM tasks GROUP BY state").fetchall())
+
+    def remaining(self):
+        """Keys not finished yet, including ones leased to other workers"""
+        counts = self.counts()
+        return counts.get('pending', 0) + counts.get('leased', 0)
+
+    def drain(self, worker, limit, poll=5.0):
+        """Yield leased batches until every key is finished
+
+        When the only unfinished keys are leased to other workers, waits for
+        them (and takes over any whose lease runs out).
+        """
+        while True:
+            keys = self.lease(worker, limit)
+            if keys:
+                yield keys
+            elif self.remaining():
+                time.sleep(poll)
+            else:
+                return
+
+    @contextmanager
+    def _transaction(self):
+        # BEGIN IMMEDIATE takes the write lock up front, so concurrent leases serialize
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Sharding:
+    """How one process takes part in a run: every key, one --shard, or a --queue worker
+
+    Scripts ask it for the batches of keys to process, report each batch
+    back with finish(), and keep only the output rows it selects with
+    rows(). Without --shard or --queue this is a single batch of all keys
+    and the outputs are unchanged.
+    """
+
+    def __init__(self, shard=None, queue=None, worker=None, lease=600.0):
+        self.shard = shard
+        self.worker = worker or default_worker()
+        self.queue = WorkQueue(queue, lease=lease) if queue else None
+        if shard is not None:
+            self.label = f"shard-{shard[0]}-of-{shard[1]}"
+        elif self.queue is not None:
+            self.label = f"worker-{self.worker}"
+        else:
+            self.label = None
+
+    @property
+    def active(self):
+        return self.label is not None
+
+    def path(self, path):
+        """Output, journal or error file of this process"""
+        return shard_path(path, self.label) if self.active else path
+
+    def batches(self, keys, limit):
+        """Yield the keys this process should work on, in batches of about `limit` for a queue"""
+        keys = list(dict.fromkeys(keys))
+        if self.queue is not None:
+            self.queue.add(keys, self.worker)
+            yield from self.queue.drain(self.worker, limit)
+        elif self.shard is not None:
+            yield [key for key in keys if in_shard(key, self.shard)]
+        else:
+            yield keys
+
+    def finish(self, done, failed=()):
+        """Report a batch back to the queue: `failed` keys are retried, by any worker"""
+        if self.queue is not None:
+            self.queue.done(done, self.worker)
+            self.queue.release(failed, self.worker)
+
+    def rows(self, keys):
+        """Mask of the output rows this process writes, given the key of every row
+
+        Rows without a key go to shard 0, or to the queue's coordinator.
+        """
+        if self.shard is not None:
+            return keys.map(lambda key: in_shard('' if pd.isna(key) else key, self.shard)).astype(bool)
+        if self.queue is not None:
+            owned = self.queue.owned(self.worker)
+            coordinator = self.queue.coordinator() == self.worker
+            return keys.map(lambda key: coordinator if pd.isna(key) else key in owned).astype(bool)
+        return pd.Series(True, index=keys.index)
+
+    def close(self):
+        if self.queue is not None:
+            self.queue.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def sharding_from_args(args):
+    return Sharding(args.shard, args.queue, worker=args.worker, lease=args.lease_seconds)
+
+
+def add_shard_arguments(parser):
+    """Register the shared --shard / --queue options on an argparse parser"""
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--shard', type=parse_shard, default=None, metavar='i/N',
+                       help='Process only the keys that hash to shard i of N (0-based) and write a shard '
+                            'output; run every shard, e.g. on separate machines, then merge_shards.py')
+    group.add_argument('--queue', default=None,
+                       help='SQLite work queue shared by several worker processes; each worker leases '
+                            'batches of keys and writes its own output for merge_shards.py')
+    parser.add_argument('--worker', default=None,
+                        help='Worker name for --queue (default: host-pid); reuse it to resume a worker')
+    parser.add_argument('--lease-seconds', type=float, default=600.0,
+                        help='Seconds a queue worker may hold a batch before others take it over')
@@ -0,0 +1,151 @@
+import re
+import zlib
+
+import numpy as np
+
+try:
+    from rdkit import Chem, RDLogger
+    from rdkit.Chem import rdFingerprintGenerator
+    RDLogger.DisableLog('rdApp.*')
+except ImportError:  # RDKit is optional; fall back to hashed SMILES n-grams
+    Chem = None
+
+N_BITS = 2048
+MORGAN_RADIUS = 2
+
+# Atoms (bracket atoms, two-letter halogens, organic subset), bonds, branches and ring closures
+SMILES_TOKEN = re.compile(r"\[[^\]]+\]|Br|Cl|%\d\d|[A-Za-z]|\d|[=#$/\\()+\-.@:*~]")
+
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+def popcount(bits):
+    """Number of set bits along the last axis of a packed uint8 array"""
+    if bits.shape[-1] % 8 == 0 and bits.flags.c_contiguous:
+        bits = bits.view(np.uint64)   # 8x fewer elements to count and sum
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(bits).sum(axis=-1, dtype=np.int32)
+    return _POPCOUNT[bits.view(np.uint8)].sum(axis=-1, dtype=np.int32)
+
+MORGAN_KIND = f"morgan{MORGAN_RADIUS}"
+
+def fingerprint_kind():
+    return MORGAN_KIND if Chem is not None else 'smiles-ngram'
+
+def _ngram_bits(smiles, n_bits, max_n=4):
+    tokens = SMILES_TOKEN.findall(smiles)
+    bits = set()
+    for n in range(1, max_n + 1):
+        for i in range(len(tokens) - n + 1):
+            bits.add(zlib.crc32(''.join(tokens[i:i + n]).encode()) % n_bits)
+    return bits
+
+def fingerprint(smiles, n_bits=N_BITS):
+    """Packed uint8 fingerprint of one SMILES, or None if it cannot be parsed
+
+    Uses an RDKit Morgan fingerprint when RDKit is installed, otherwise a
+    hashed fingerprint of SMILES token n-grams. The latter is a rough look-up
+    only: it scores different compounds written alike as identical (palmitic
+    and stearic acid both come out at 1.0), so nothing should be inferred
+    from its scores.
+    """
+    if not isinstance(smiles, str) or not smiles.strip():
+        return None
+    dense = np.zeros(n_bits, dtype=np.uint8)
+    if Chem is not None:
+        mol = Chem.MolFromSmiles(smiles)
+        if mol is None:
+            return None
+        generator = rdFingerprintGenerator.GetMorganGenerator(radius=MORGAN_RADIUS, fpSize=n_bits)
+        dense[:] = generator.GetFingerprintAsNumPy(mol)
+    else:
+        dense[list(_ngram_bits(smiles.strip(), n_bits))] = 1
+    return np.packbits(dense)
+
+def tanimoto(query, bits, counts=None):
+    """Tanimoto similarity of one packed fingerprint against every row of `bits`"""
+    if counts is None:
+        counts = popcount(bits)
+    common = popcount(np.bitwise_and(bits, query))
+    union = counts + popcount(query) - common
+    return np.divide(common, union, out=np.zeros(len(bits)), where=union > 0)
+
+class SimilarityIndex:
+    """In-memory Tanimoto index over packed bit-vector fingerprints
+
+    Fingerprints are kept as rows of one (n, n_bits / 8) uint8 matrix together
+    with their popcounts, so a query is a handful of vectorized numpy operations
+    over the whole matrix. Each SMILES is stored once; SMILES that cannot be
+    fingerprinted are skipped. Indexes are saved as .npz files.
+    """
+
+    def __init__(self, n_bits=N_BITS, kind=None):
+        self.n_bits = n_bits
+        self.kind = kind or fingerprint_kind()
+        self.smiles = []
+        self._positions = {}
+        self._bits = np.zeros((1024, n_bits // 8), dtype=np.uint8)
+        self._counts = np.zeros(1024, dtype=np.int32)
+
+    def __len__(self):
+        return len(self.smiles)
+
+    def __contains__(self, smiles):
+        return smiles in self._positions
+
+    def add(self, smiles):
+        """Add one SMILES; returns False if it is a duplicate or cannot be parsed"""
+        if smiles in self._positions:
+            return False
+        fp = fingerprint(smiles, self.n_bits)
+        if fp is None:
+            return False
+        row = len(self.smiles)
+        if row == len(self._bits):
+            # Grow by doubling so adding n fingerprints copies O(n) bytes
+            self._bits = np.concatenate([self._bits, np.zeros_like(self._bits)])
+            self._counts = np.concatenate([self._counts, np.zeros_like(self._counts)])
+        self._bits[row] = fp
+        self._counts[row] = popcount(fp)
+        self._positions[smiles] = row
+        self.smiles.append(smiles)
+        return True
+
+    def update(self, smiles_list):
+        return sum(self.add(smiles) for smiles in smiles_list)
+
+    def _matrix(self):
+        return self._bits[:len(self.smiles)], self._counts[:len(self.smiles)]
+
+    def search(self, smiles, threshold=0.8, limit=None):
+        """Indexed SMILES at least `threshold` similar to `smiles`, best first, as (smiles, score)"""
+        fp = fingerprint(smiles, self.n_bits)
+        bits, counts = self._matrix()
+        if fp is None or not len(bits):
+            return []
+        scores = tanimoto(fp, bits, counts)
+        hits = np.flatnonzero(scores >= threshold)
+        hits = hits[np.argsort(-scores[hits], kind='stable')][:limit]
+        return [(self.smiles[i], float(scores[i])) for i in hits]
+
+    def best(self, smiles):
+        """(smiles, score) of the most similar indexed SMILES, or None"""
+        hits = self.search(smiles, threshold=0.0, limit=1)
+        return hits[0] if hits else None
+
+    def save(self, path):
+        bits, counts = self._matrix()
+        np.savez_compressed(path, smiles=np.array(self.smiles, dtype=str), bits=bits,
+                            n_bits=self.n_bits, kind=self.kind)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        index = cls(int(data['n_bits']), str(data['kind']))
+        if index.kind != fingerprint_kind():
+            raise ValueError(f"{path} holds {index.kind} fingerprints, "
+                             f"but this environment computes {fingerprint_kind()}")
+        index.smiles = [str(smiles) for smiles in data['smiles']]
+        index._positions = {smiles: i for i, smiles in enumerate(index.smiles)}
+        index._bits = np.ascontiguousarray(data['bits'])
+        index._counts = popcount(index._bits)
+        return index
@@ -0,0 +1,178 @@
+import ast
+import os
+
+import pandas as pd
+
+# Comma-joined BindingDB hit columns (scalar again once 05 explodes them)
+BINDINGDB_LIST_COLUMNS = ['target_name', 'species', 'bdb_id', 'ligand_smiles', 'pdb_link']
+
+# Repeated strings stored as categoricals (dictionary-encoded in Parquet)
+CATEGORICAL_COLUMNS = ['Scientific Name', 'Common Name', 'Name', 'Code', 'species', 'Bacteria']
+
+LIST_SEP = ', '
+
+# Rows per chunk for streamed reads
+CHUNK_SIZE = 500_000
+
+
+def to_list(value, sep=LIST_SEP):
+    """Parse one list cell: a list, a stringified Python list or a sep-joined string"""
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    if not isinstance(value, str):
+        return None
+    text = value.strip()
+    if text.startswith('[') and text.endswith(']'):
+        try:
+            return [str(item) for item in ast.literal_eval(text)]
+        except (ValueError, SyntaxError):
+            # A malformed list repr: its items are separated by bare commas
+            text, sep = text[1:-1], ','
+    # Names may contain a bare comma ("2,4-dienoyl-CoA reductase"), so only sep splits
+    return [item.strip().strip("'\"") for item in text.split(sep) if item.strip()]
+
+
+def from_list(value, sep=LIST_SEP):
+    """Inverse of to_list for CSV output: join a list cell back into a string"""
+    if isinstance(value, (list, tuple)) or hasattr(value, 'tolist'):
+        return sep.join(str(item) for item in list(value))
+    return value
+
+
+def is_parquet(path):
+    return os.path.splitext(path)[1].lower() in ('.parquet', '.pq')
+
+
+def _is_text(series):
+    # object columns, or the str dtype pandas 3 gives text by default
+    return pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)
+
+
+def _is_scalar_column(series):
+    # Categoricals (read back from Parquet) map to categoricals, which cannot any(); test the values
+    return not any(isinstance(v, (list, tuple)) for v in series.to_numpy(dtype=object))
+
+
+def write_table(df, path, index=False, list_columns=(), categorical_columns=CATEGORICAL_COLUMNS):
+    """Write a stage output; the format follows the file extension
+
+    Parquet files get real list-typed columns (cells that already hold lists,
+    plus the sep-joined strings in `list_columns`) and dictionary-encoded
+    categoricals. CSV files keep the legacy layout with ', '-joined lists.
+    """
+    df = df.copy()
+    list_columns = [c for c in list_columns if c in df.columns]
+    if is_parquet(path):
+        for c in list_columns:
+            df[c] = df[c].map(to_list)
+        for c in categorical_columns:
+            if c in df.columns and _is_text(df[c]) and _is_scalar_column(df[c]):
+                df[c] = df[c].astype('category')
+        df.to_parquet(path, index=index)
+    else:
+        for c in list_columns:
+            df[c] = df[c].map(from_list)
+        df.to_csv(path, index=index)
+
+
+def _restore_lists(df):
+    # Parquet list cells arrive as numpy arrays
+    for c in df.columns:
+        if _is_text(df[c]):
+            df[c] = df[c].map(lambda v: v.tolist() if hasattr(v, 'tolist') else v)
+    return df
+
+
+def read_table(path, columns=None, index_col=None, list_columns=()):
+    """Read a stage output written by write_table (or a legacy CSV)
+
+    Only `columns` are loaded from Parquet files, list-typed columns come
+    back as Python lists and the saved index is restored (`index_col` only
+    applies to CSV). For CSV files the `list_columns` given are parsed
+    into lists so both formats look the same to the caller.
+    """
+    if is_parquet(path):
+        return _restore_lists(pd.read_parquet(path, columns=columns))
+    usecols = None
+    if columns is not None:
+        wanted = set(columns)
+        usecols = lambda c: c in wanted or c == '' or c.startswith('Unnamed: 0')
+    df = pd.read_csv(path, usecols=usecols, index_col=index_col)
+    for c in list_columns:
+        if c in df.columns:
+            df[c] = df[c].map(to_list)
+    return df
+
+
+def iter_table(path, chunksize=CHUNK_SIZE, columns=None, as_text=False):
+    """Yield a table in DataFrames of at most `chunksize` rows
+
+    Parquet files are read batch by batch with their stored types. CSV
+    files are read as text when `as_text` is set, so every chunk has the
+    same (string) columns and values are written back exactly as read.
+    """
+    if is_parquet(path):
+        import pyarrow.parquet as pq
+
+        with pq.ParquetFile(path) as f:
+            for batch in f.iter_batches(batch_size=chunksize, columns=columns):
+                yield _restore_lists(batch.to_pandas())
+        return
+    with pd.read_csv(path, chunksize=chunksize, usecols=columns,
+                     dtype=str if as_text else None) as reader:
+        yield from reader
+
+
+class TableWriter:
+    """Write a table chunk by chunk; the format follows the file extension
+
+    CSV chunks are appended below a single header. Parquet chunks become
+    row groups of one file whose schema is taken from the first chunk
+    (text and all-missing columns are stored as strings, dictionary-encoded
+    for `categorical_columns`).
+    """
+
+    def __init__(self, path, categorical_columns=CATEGORICAL_COLUMNS):
+        self.path = path
+        self.categorical_columns = categorical_columns
+        self.rows = 0
+        self._writer = None
+        self._schema = None
+
+    def write(self, df):
+        if is_parquet(self.path):
+            self._write_parquet(df)
+        else:
+            df.to_csv(self.path, mode='w' if self.rows == 0 else 'a', header=self.rows == 0, index=False)
+        self.rows += len(df)
+
+    def _write_parquet(self, df):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self._schema is None:
+            fields = []
+            for c in df.columns:
+                if _is_text(df[c]) and _is_scalar_column(df[c]) or df[c].isna().all():
+                    text = pa.dictionary(pa.int32(), pa.string()) if c in self.categorical_columns else pa.string()
+                    fields.append(pa.field(c, text))
+                else:
+                    fields.append(pa.Schema.from_pandas(df[[c]], preserve_index=False).field(c))
+            self._schema = pa.schema(fields)
+            self._writer = pq.ParquetWriter(self.path, self._schema)
+        self._writer.write_table(pa.Table.from_pandas(df, schema=self._schema, preserve_index=False))
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+        elif self.rows == 0 and not os.path.exists(self.path):
+            # An empty result still leaves a (header-less) file behind
+            open(self.path, 'w').close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,263 @@
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # pyarrow is optional here; pandas' str.contains is the fallback
+    pc = None
+
+from row_explode import LIST_COLUMNS, process_dataframe
+from table_io import CHUNK_SIZE, TableWriter, from_list, is_parquet, iter_table, write_table
+
+# Same marker as bdb_scraper.NO_MATCHES (importing bdb_scraper would pull in Selenium)
+NO_MATCHES = 'No Similarity Matches'
+
+# Notebook 03: columns that must be present, and how each column is aggregated per C_ID
+KNAPSACK_REQUIRED_COLUMNS = ['Formula', 'CAS RN', 'InChIKey', 'InChICode', 'SMILES']
+KNAPSACK_JOIN_COLUMNS = ['Code', 'FSM_Code', 'Name', 'Common Name', 'Scientific Name', 'Quantity',
+                         'Non plant ingredient', 'Action', 'Application', 'Comments']
+KNAPSACK_SORTED_COLUMNS = ['Bacteria']
+KNAPSACK_FIRST_COLUMNS = ['Metabolite Name', 'Formula', 'Mw', 'CAS RN', 'InChIKey', 'InChICode', 'SMILES']
+
+# Notebook 06: BindingDB species and target name patterns
+HIV_SPECIES = r'Human immunodeficiency virus type 1|HIV-1'
+HIV_TARGETS = ['protease', 'transcriptase', 'integrase', 'glycoprotein']
+
+PARTITIONS = 16
+
+
+def contains(series, pattern, case=True):
+    """Vectorized str.contains(pattern, case=case, na=False), in Arrow when pyarrow is installed
+
+    Arrow uses RE2 syntax, which covers the literal alternations used here.
+    """
+    if pc is None:
+        return series.str.contains(pattern, case=case, na=False)
+    values = pa.array(series.to_numpy(dtype=object), type=pa.string(), from_pandas=True)
+    matches = pc.match_substring_regex(values, pattern, ignore_case=not case)
+    return pd.Series(matches.fill_null(False).to_numpy(zero_copy_only=False), index=series.index)
+
+
+def join_unique(df, key, column, sort=False, sep=', '):
+    """sep-joined distinct non-missing values of `column` per `key`, without a Python lambda per group
+
+    Values keep their order of first appearance, or ascending order with
+    `sort`. Keys whose values are all missing get an empty string.
+    """
+    pairs = df[[key, column]].dropna()
+    if isinstance(pairs[column].dtype, pd.CategoricalDtype):
+        # Categoricals read from Parquet would sort by category order, not by value
+        pairs[column] = pairs[column].astype(pairs[column].cat.categories.dtype)
+    if sort:
+        pairs = pairs.drop_duplicates().sort_values(column, kind='stable')
+        pairs[column] = pairs[column].astype(str)
+    else:
+        pairs = pairs.astype({column: str}).drop_duplicates()
+    joined = pairs.groupby(key, sort=False)[column].agg(sep.join)
+    keys = df[key].dropna().unique()
+    return joined.reindex(keys, fill_value='')
+
+
+def group_compounds(df, key='C_ID', join_columns=KNAPSACK_JOIN_COLUMNS, sorted_columns=KNAPSACK_SORTED_COLUMNS,
+                    first_columns=KNAPSACK_FIRST_COLUMNS):
+    """One row per compound, as the groupby/agg of notebook 03
+
+    Join columns hold the distinct values of the group in order of first
+    appearance, sorted columns the distinct values in ascending order and
+    the remaining columns their first non-missing value. Columns missing
+    from df are skipped.
+    """
+    first = [c for c in first_columns if c in df.columns]
+    result = df.groupby(key)[first].first() if first else pd.DataFrame(index=df[key].dropna().unique())
+    result = result.sort_index()
+    joined = {c: join_unique(df, key, c) for c in join_columns if c in df.columns}
+    joined.update({c: join_unique(df, key, c, sort=True) for c in sorted_columns if c in df.columns})
+    columns = [c for c in join_columns + sorted_columns if c in joined] + first
+    for c, values in joined.items():
+        result[c] = values.reindex(result.index)
+    result.index.name = key
+    return result[columns].reset_index()
+
+
+def clean_knapsack(df, start=1, required=KNAPSACK_REQUIRED_COLUMNS):
+    """Drop rows missing a required column and number the rest AyKn000001, ... from `start`"""
+    df = df.dropna(subset=[c for c in required if c in df.columns])
+    codes = [f"AyKn{i:06d}" for i in range(start, start + len(df))]
+    df = df.assign(FSM_Code=codes)
+    columns = [c for c in df.columns if c != 'FSM_Code']
+    columns.insert(1, 'FSM_Code')
+    return df[columns]
+
+
+def _holds_lists(series):
+    first = series.first_valid_index()
+    return first is not None and isinstance(series.loc[first], list)
+
+
+def clean_bindingdb(df, list_columns=LIST_COLUMNS):
+    """Keep compounds with BindingDB hits: no missing hit column and no NO_MATCHES marker"""
+    df = df.dropna(subset=list_columns)
+    text = pd.DataFrame({c: df[c].map(from_list) if _holds_lists(df[c]) else df[c] for c in list_columns})
+    return df[~text.isin([NO_MATCHES]).any(axis=1)]
+
+
+def explode_hits(df, list_columns=LIST_COLUMNS):
+    """One row per hit (see row_explode.process_dataframe), without hits lacking a PDB link"""
+    exploded = process_dataframe(df.reset_index(drop=True), list_columns)
+    return exploded[~contains(exploded['pdb_link'], 'NaN')].reset_index(drop=True)
+
+
+class DuplicateFilter:
+    """Drop rows already seen in earlier chunks of a stream (or earlier in the same chunk)
+
+    Rows are compared by a 64-bit hash of their values, kept in a sorted
+    array: 8 bytes per distinct row instead of the rows themselves.
+    """
+
+    def __init__(self):
+        self.seen = np.empty(0, dtype=np.uint64)
+
+    def __call__(self, df):
+        hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+        first = ~pd.Series(hashes).duplicated().to_numpy()
+        known = np.zeros(len(hashes), dtype=bool)
+        if len(self.seen):
+            position = np.minimum(np.searchsorted(self.seen, hashes), len(self.seen) - 1)
+            known = self.seen[position] == hashes
+        keep = first & ~known
+        self.seen = np.union1d(self.seen, hashes[keep])
+        return df[keep]
+
+
+def partition_by_key(chunks, key, directory, partitions=PARTITIONS):
+    """Spread the rows of a chunk stream over CSV files by a hash of `key`; returns their paths
+
+    All rows of one key land in the same file, in stream order.
+    """
+    paths = [os.path.join(directory, f"part-{i:03d}.csv") for i in range(partitions)]
+    written = set()
+    for chunk in chunks:
+        part = pd.util.hash_array(chunk[key].astype(str).to_numpy(dtype=object)) % partitions
+        for i, rows in chunk.groupby(part, sort=False):
+            rows.to_csv(paths[i], mode='a', header=i not in written, index=False)
+            written.add(i)
+    return [paths[i] for i in sorted(written)]
+
+
+def _column_type(series):
+    """Type read_csv would give a column: 'int64', 'float64' or str (text)"""
+    if pd.api.types.is_integer_dtype(series):
+        return 'int64'
+    if pd.api.types.is_float_dtype(series):
+        return 'float64'
+    values = series.dropna().astype(str)
+    if not pd.to_numeric(values, errors='coerce').notna().all():
+        return str
+    # Integers with a missing value anywhere become floats
+    if len(values) == len(series) and values.str.fullmatch(r'\s*[+-]?\d+\s*').all():
+        return 'int64'
+    return 'float64'
+
+
+# From narrowest to widest; a column takes the widest type seen in any chunk
+COLUMN_TYPES = ['int64', 'float64', str]
+
+
+def _chunks(path, chunksize):
+    # CSV inputs are streamed as text; the index column of older CSVs is dropped
+    for chunk in iter_table(path, chunksize, as_text=not is_parquet(path)):
+        yield chunk.drop(columns=['Unnamed: 0'], errors='ignore')
+
+
+def stream_group_compounds(source, output, cleaned=None, key='C_ID', chunksize=CHUNK_SIZE,
+                           partitions=PARTITIONS, tmp_dir=None):
+    """Notebook 03 (clean, number, group per C_ID) over a table of any length
+
+    The input is streamed in chunks and hash-partitioned by key into
+    temporary files, so only one partition is in memory at a time; the
+    grouped table (one row per compound) is collected and written sorted
+    by key. The partitions are read back with the types read_csv gives
+    the whole input, so numeric columns are sorted and joined as numbers,
+    as in the notebook. `cleaned`, if given, receives the numbered rows
+    (the notebook's 04 table). Returns the number of compounds.
+    """
+    types = {}
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as tmp:
+        writer = TableWriter(cleaned) if cleaned else None
+
+        def numbered():
+            start = 1
+            for chunk in _chunks(source, chunksize):
+                for c in chunk.columns:
+                    if c != key:
+                        seen = [types.get(c, COLUMN_TYPES[0]), _column_type(chunk[c])]
+                        types[c] = max(seen, key=COLUMN_TYPES.index)
+                chunk = clean_knapsack(chunk, start)
+                start += len(chunk)
+                if writer is not None:
+                    writer.write(chunk)
+                yield chunk
+
+        try:
+            paths = partition_by_key(numbered(), key, tmp, partitions)
+        finally:
+            if writer is not None:
+                writer.close()
+
+        groups = []
+        for path in paths:
+            part = pd.read_csv(path, dtype={key: str, **types})
+            groups.append(group_compounds(part, key))
+    grouped = pd.concat(groups, ignore_index=True) if groups else group_compounds(pd.DataFrame(columns=[key]), key)
+    grouped = grouped.sort_values(key, kind='stable').reset_index(drop=True)
+    write_table(grouped, output)
+    return len(grouped)
+
+
+def stream_explode(source, output, cleaned=None, chunksize=CHUNK_SIZE):
+    """Notebook 05 (drop compounds without hits, one row per hit with a PDB link) chunk by chunk
+
+    Every step works row by row, so memory is bounded by the chunk size.
+    `cleaned`, if given, receives the compounds kept before exploding.
+    Returns the number of exploded rows.
+    """
+    with TableWriter(output) as out, (TableWriter(cleaned) if cleaned else _NullWriter()) as kept:
+        for chunk in _chunks(source, chunksize):
+            chunk = clean_bindingdb(chunk)
+            kept.write(chunk)
+            out.write(explode_hits(chunk))
+        return out.rows
+
+
+def stream_hiv(source, output, targets=None, species=HIV_SPECIES, keywords=HIV_TARGETS, chunksize=CHUNK_SIZE):
+    """Notebook 06 (HIV-1 hits without duplicates, then the main HIV-1 targets) chunk by chunk
+
+    Duplicates are removed across the whole stream (see DuplicateFilter).
+    `targets`, if given, receives the rows whose target name matches one
+    of `keywords` (case-insensitive). Returns the number of HIV-1 rows.
+    """
+    unique = DuplicateFilter()
+    pattern = '|'.join(keywords)
+    with TableWriter(output) as out, (TableWriter(targets) if targets else _NullWriter()) as matched:
+        for chunk in _chunks(source, chunksize):
+            hiv = unique(chunk[contains(chunk['species'], species)])
+            out.write(hiv)
+            matched.write(hiv[contains(hiv['target_name'], pattern, case=False)])
+        return out.rows
+
+
+class _NullWriter:
+    rows = 0
+
+    def write(self, df):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass